@@ -0,0 +1,63 @@
+import numpy as np
+from analytics.columnas import US_POR_DIA, US_POR_HORA, dias_a_fechas
+
+PERIODOS = ("hora", "dia", "semana", "mes")
+
+# 1970-01-01 fue jueves: sumando 3 días, las semanas empiezan en lunes
+_DESPLAZAMIENTO_LUNES = 3
+
+
+def claves_periodo(ts, periodo):
+    """
+    Clave entera del período de cada fila (ts en microsegundos desde epoch):
+    - hora:   horas desde 1970-01-01 00:00
+    - dia:    días desde 1970-01-01
+    - semana: semanas (de lunes a domingo) desde la que contiene a 1970-01-01
+    - mes:    meses desde 1970-01
+    """
+    ts = np.asarray(ts, dtype=np.int64)
+    if periodo == "hora":
+        return ts // US_POR_HORA
+    if periodo == "dia":
+        return ts // US_POR_DIA
+    if periodo == "semana":
+        return (ts // US_POR_DIA + _DESPLAZAMIENTO_LUNES) // 7
+    if periodo == "mes":
+        return ts.astype("datetime64[us]").astype("datetime64[M]").astype(np.int64)
+    raise ValueError(f"Período inválido: {periodo} (usar uno de {', '.join(PERIODOS)})")
+
+
+def etiquetas_periodo(claves, periodo):
+    """
+    Claves de claves_periodo → valores para mostrar:
+    - hora: datetime del inicio de la hora
+    - dia: date
+    - semana: date del lunes
+    - mes: date del día 1
+    """
+    claves = np.asarray(claves, dtype=np.int64)
+    if periodo == "hora":
+        return claves.astype("datetime64[h]").tolist()
+    if periodo == "dia":
+        return dias_a_fechas(claves)
+    if periodo == "semana":
+        return dias_a_fechas(claves * 7 - _DESPLAZAMIENTO_LUNES)
+    if periodo == "mes":
+        return claves.astype("datetime64[M]").astype("datetime64[D]").tolist()
+    raise ValueError(f"Período inválido: {periodo} (usar uno de {', '.join(PERIODOS)})")
+
+
+def agrupar(claves, **pesos):
+    """
+    Group-by en una pasada: np.unique(return_inverse) numera los grupos y
+    np.bincount suma por grupo. `pesos` son arreglos alineados con claves.
+
+    Devuelve (claves únicas ordenadas, conteo por grupo, {nombre: suma por grupo}).
+    """
+    unicas, grupo = np.unique(claves, return_inverse=True)
+    conteos = np.bincount(grupo, minlength=len(unicas))
+    sumas = {
+        nombre: np.bincount(grupo, weights=valores, minlength=len(unicas))
+        for nombre, valores in pesos.items()
+    }
+    return unicas, conteos, sumas
@@ -1,17 +1,49 @@
 import numpy as np
-from datetime import datetime
+from itertools import islice
+from analytics.columnas import Columnas, US_POR_HORA, fechas_a_ts
 from repositories.transaccion_repo import TransaccionRepo
 
+# Filas por bloque al recorrer el repositorio en streaming
+TAMANO_BLOQUE = 65536
+
+
+def _bloques(filas, tamano=TAMANO_BLOQUE):
+    filas = iter(filas)
+    while True:
+        bloque = list(islice(filas, tamano))
+        if not bloque:
+            return
+        yield bloque
+
+
 class AnomaliasDetector:
-    def __init__(self):
-        self.repo = TransaccionRepo()
-        self.transacciones = self.repo.obtener_todas()
+    """
+    Detecta movimientos sospechosos leyendo las transacciones en streaming
+    (TransaccionRepo.iter_todas), sin cargarlas todas en memoria: se leen de a
+    bloques y cada bloque se analiza con NumPy (fechas como enteros, sin
+    parsear fila por fila).
+
+    Si se pasa un AlmacenColumnar, los cálculos se hacen directo sobre los
+    arreglos memory-mapped y solo se leen del CSV las filas detectadas.
+    """
+
+    def __init__(self, repo=None, almacen=None):
+        self.repo = repo or TransaccionRepo()
+        self.almacen = almacen
+
+    @property
+    def transacciones(self):
+        return self.repo.obtener_todas()
 
     def z_score_outliers(self, threshold=3.0):
         """
         Detecta transacciones cuyo monto es un outlier según Z-score.
+        Primera pasada: solo los montos (un float por fila). Segunda pasada: el filtro.
         """
-        montos = np.array([t["monto"] for t in self.transacciones])
+        if self.almacen is not None:
+            return self._z_score_columnas(threshold)
+
+        montos = np.fromiter((t["monto"] for t in self.repo.iter_todas()), dtype=float)
         if len(montos) == 0:
             return []
         media = np.mean(montos)
@@ -19,37 +51,90 @@ class AnomaliasDetector:
         if std == 0:
             return []
 
-        return [ t for t in self.transacciones if std > 0 and abs(t["monto"] - media) / std > threshold]
+        return [t for t in self.repo.iter_todas() if abs(t["monto"] - media) / std > threshold]
+
+    def _z_score_columnas(self, threshold):
+        montos = self.almacen.columnas().monto
+        if len(montos) == 0:
+            return []
+        media = np.mean(montos)
+        std = np.std(montos)
+        if std == 0:
+            return []
+
+        indices = np.flatnonzero(np.abs(montos - media) / std > threshold)
+        return list(self.almacen.filas(indices))
 
     def structuring(self, ventana_minutos=30, umbral_monto=100):
         """
         Detecta depósitos pequeños repetidos en una ventana corta de tiempo.
+
+        El log normalmente ya está en orden cronológico, así que se recorre en
+        streaming comparando cada fila con la anterior. Si aparece una fila
+        fuera de orden, se vuelve a leer y se ordena como antes.
         """
-        trans = sorted(self.transacciones, key=lambda t: t["fecha"])
+        if self.almacen is not None:
+            cols = self.almacen.columnas()
+            orden = np.argsort(cols.ts, kind="stable")
+            indices = self._indices_structuring(cols.seleccionar(orden), ventana_minutos, umbral_monto)
+            filas = list(self.almacen.filas(np.stack([orden[indices], orden[indices + 1]], axis=1).ravel()))
+            return list(zip(filas[0::2], filas[1::2]))
+
         resultado = []
-        for i in range(len(trans) - 1):
-            t1 = trans[i]
-            t2 = trans[i + 1]
-            if t1["tipo"] == "deposito" and t2["tipo"] == "deposito":
-                f1 = datetime.fromisoformat(t1["fecha"])
-                f2 = datetime.fromisoformat(t2["fecha"])
-                if (
-                    t1["cuenta_id"] == t2["cuenta_id"]
-                    and (f2 - f1).total_seconds() / 60 < ventana_minutos
-                    and t1["monto"] < umbral_monto
-                    and t2["monto"] < umbral_monto
-                ):
-                    resultado.append((t1, t2))
+        anterior = None
+        for bloque in _bloques(self.repo.iter_todas()):
+            # La última fila del bloque anterior se compara con la primera de este
+            if anterior is not None:
+                bloque.insert(0, anterior)
+            cols = Columnas.desde_transacciones(bloque)
+
+            if np.any(cols.ts[1:] < cols.ts[:-1]):
+                trans = list(self.repo.iter_todas())
+                cols = Columnas.desde_transacciones(trans)
+                orden = np.argsort(cols.ts, kind="stable")
+                indices = self._indices_structuring(cols.seleccionar(orden), ventana_minutos, umbral_monto)
+                return [(trans[orden[i]], trans[orden[i + 1]]) for i in indices]
+
+            for i in self._indices_structuring(cols, ventana_minutos, umbral_monto):
+                resultado.append((bloque[i], bloque[i + 1]))
+            anterior = bloque[-1]
         return resultado
 
-    def actividad_nocturna(self):
+    @staticmethod
+    def _indices_structuring(cols, ventana_minutos, umbral_monto):
+        """
+        Posiciones i tales que las filas i e i+1 (ya en orden cronológico)
+        forman un par de structuring.
+        """
+        if len(cols) < 2:
+            return np.empty(0, dtype=np.intp)
+
+        candidata = cols.mascara_tipo("deposito") & (cols.monto < umbral_monto)
+        cuenta = np.asarray(cols.cuenta)
+        ts = np.asarray(cols.ts)
+        pares = (
+            candidata[:-1] & candidata[1:]
+            & (cuenta[:-1] == cuenta[1:])
+            & ((ts[1:] - ts[:-1]) < ventana_minutos * 60_000_000)
+        )
+        return np.flatnonzero(pares)
+
+    def actividad_nocturna(self, desde=None, hasta=None):
         """
         Detecta transacciones realizadas entre las 00:00 y las 04:00.
+        desde/hasta limitan la búsqueda a una ventana de fechas (con el repositorio
+        particionado solo se leen los segmentos de esa ventana).
         """
-        return [
-            t for t in self.transacciones
-            if 0 <= datetime.fromisoformat(t["fecha"]).hour < 4
-        ]
+        if self.almacen is not None:
+            cols = self.almacen.columnas()
+            mascara = (cols.hora < 4) & cols.en_rango(desde, hasta)
+            return list(self.almacen.filas(np.flatnonzero(mascara)))
+
+        resultado = []
+        for bloque in _bloques(self.repo.iter_todas(desde=desde, hasta=hasta)):
+            horas = (fechas_a_ts([t["fecha"] for t in bloque]) // US_POR_HORA) % 24
+            resultado.extend(bloque[i] for i in np.flatnonzero(horas < 4))
+        return resultado
 
 # ============================================================
 # PRUEBA RÁPIDA
@@ -0,0 +1,194 @@
+import numpy as np
+
+US_POR_HORA = 3_600_000_000
+US_POR_DIA = 24 * US_POR_HORA
+
+
+class Columnas:
+    """
+    Transacciones en formato columnar: un arreglo NumPy por campo en vez de
+    una lista de diccionarios.
+
+    - monto:  float64
+    - ts:     int64, microsegundos desde 1970-01-01 (la fecha ISO tal cual, sin zona)
+    - cuenta: int32, código de cuenta (índice en `cuentas`)
+    - tipo:   int8, código de tipo (índice en `tipos`)
+    - offset: int64, posición de la fila en el CSV de origen (-1 si no aplica)
+
+    Los arreglos pueden ser np.memmap (ver AlmacenColumnar), así que se leen
+    sin copiar nada a memoria.
+    """
+
+    def __init__(self, monto, ts, cuenta, tipo, cuentas, tipos, offset=None):
+        self.monto = monto
+        self.ts = ts
+        self.cuenta = cuenta
+        self.tipo = tipo
+        self.cuentas = list(cuentas)
+        self.tipos = list(tipos)
+        self.offset = offset if offset is not None else np.full(len(monto), -1, dtype=np.int64)
+        self._dia = None
+        self._hora = None
+
+    def __len__(self):
+        return len(self.monto)
+
+    # -----------------------------
+    # ÍNDICE DE TIEMPO
+    # -----------------------------
+
+    @property
+    def dia(self):
+        """
+        Día de cada fila como días desde 1970-01-01 (int64). Se calcula una
+        vez; agrupar por día es agrupar estos enteros.
+        """
+        if self._dia is None:
+            self._dia = self.ts // US_POR_DIA
+        return self._dia
+
+    @property
+    def hora(self):
+        """
+        Hora del día (0-23) de cada fila.
+        """
+        if self._hora is None:
+            self._hora = (self.ts // US_POR_HORA) % 24
+        return self._hora
+
+    def en_rango(self, desde=None, hasta=None):
+        """
+        Arreglo booleano con las filas en [desde, hasta). Acepta date,
+        datetime o texto ISO, igual que los filtros de los repositorios.
+        """
+        mascara = np.ones(len(self), dtype=bool)
+        if desde is not None:
+            mascara &= self.ts >= fecha_a_ts(desde)
+        if hasta is not None:
+            mascara &= self.ts < fecha_a_ts(hasta)
+        return mascara
+
+    def seleccionar(self, indices):
+        """
+        Nuevo Columnas con las filas dadas (arreglo de índices o booleano).
+        """
+        return Columnas(
+            monto=self.monto[indices],
+            ts=self.ts[indices],
+            cuenta=self.cuenta[indices],
+            tipo=self.tipo[indices],
+            cuentas=self.cuentas,
+            tipos=self.tipos,
+            offset=self.offset[indices],
+        )
+
+    @classmethod
+    def desde_transacciones(cls, transacciones):
+        """
+        Convierte una lista (o iterable) de diccionarios de transacción.
+        """
+        montos, fechas, codigos_cuenta, codigos_tipo = [], [], [], []
+        # Códigos en orden de aparición: un diccionario, sin ordenar los textos
+        cuentas, tipos = {}, {}
+        for t in transacciones:
+            montos.append(t["monto"])
+            fechas.append(t["fecha"])
+            codigos_cuenta.append(cuentas.setdefault(t["cuenta_id"], len(cuentas)))
+            codigos_tipo.append(tipos.setdefault(t["tipo"], len(tipos)))
+
+        return cls(
+            monto=np.array(montos, dtype=np.float64),
+            ts=fechas_a_ts(fechas),
+            cuenta=np.array(codigos_cuenta, dtype=np.int32),
+            tipo=np.array(codigos_tipo, dtype=np.int8),
+            cuentas=list(cuentas),
+            tipos=list(tipos),
+        )
+
+    def mascara_tipo(self, tipo):
+        """
+        Arreglo booleano con True en las filas de ese tipo.
+        """
+        if tipo not in self.tipos:
+            return np.zeros(len(self), dtype=bool)
+        return self.tipo == self.tipos.index(tipo)
+
+    def mascara_cuenta(self, cuenta_id):
+        """
+        Arreglo booleano con True en las filas de esa cuenta.
+        """
+        if cuenta_id not in self.cuentas:
+            return np.zeros(len(self), dtype=bool)
+        return self.cuenta == self.cuentas.index(cuenta_id)
+
+    def contar_tipo(self, tipo):
+        return int(np.count_nonzero(self.mascara_tipo(tipo)))
+
+
+def fechas_a_ts(fechas):
+    """
+    Convierte fechas ISO (texto) a microsegundos desde epoch, todo en NumPy.
+    """
+    if len(fechas) == 0:
+        return np.empty(0, dtype=np.int64)
+    return np.array(fechas, dtype="datetime64[us]").astype(np.int64)
+
+
+def fecha_a_ts(fecha):
+    """
+    date, datetime o texto ISO → microsegundos desde epoch.
+    """
+    if not isinstance(fecha, str):
+        fecha = fecha.isoformat()
+    return int(np.datetime64(fecha, "us").astype(np.int64))
+
+
+def dias_a_fechas(dias):
+    """
+    Días desde 1970-01-01 (ver Columnas.dia) → lista de datetime.date.
+    """
+    return np.asarray(dias, dtype=np.int64).astype("datetime64[D]").tolist()
+
+
+class TotalesDiarios:
+    """
+    Totales por día de todas las cuentas, tal como salen del resumen diario
+    (ver repositories/resumen_diario.py): un arreglo por campo, una posición
+    por día, ordenados por día.
+
+    - dia: int64, días desde 1970-01-01 (como Columnas.dia)
+    - cantidad: int64
+    - depositos, retiros, transferencias_entrada, transferencias_salida: float64
+    - minimo, maximo: float64 (NaN en días sin transacciones)
+    """
+
+    CAMPOS = ["cantidad", "depositos", "retiros", "transferencias_entrada",
+              "transferencias_salida", "minimo", "maximo"]
+
+    def __init__(self, dia, **campos):
+        self.dia = dia
+        for campo in self.CAMPOS:
+            setattr(self, campo, campos[campo])
+
+    def __len__(self):
+        return len(self.dia)
+
+    def seleccionar(self, indices):
+        """
+        Nuevo TotalesDiarios con los días dados (arreglo de índices o booleano).
+        """
+        return TotalesDiarios(self.dia[indices], **{c: getattr(self, c)[indices] for c in self.CAMPOS})
+
+    @classmethod
+    def desde_filas(cls, filas):
+        """
+        Filas del resumen ({"dia": "AAAA-MM-DD", "cantidad": ..., ...}), una por día.
+        """
+        filas = list(filas)
+        campos = {
+            campo: np.array([np.nan if f[campo] is None else f[campo] for f in filas], dtype=np.float64)
+            for campo in cls.CAMPOS
+        }
+        campos["cantidad"] = campos["cantidad"].astype(np.int64)
+        dias = np.array([f["dia"] for f in filas], dtype="datetime64[D]").astype(np.int64)
+        return cls(dias, **campos)
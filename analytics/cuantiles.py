@@ -0,0 +1,261 @@
+import math
+import random
+
+PERCENTILES = {"p50": 0.50, "p90": 0.90, "p99": 0.99}
+
+
+class _Compactador(list):
+    """
+    Un nivel del sketch: cada valor guardado acá representa 2**nivel valores originales.
+    """
+
+    def compactar(self):
+        """
+        Ordena el nivel y se queda con uno de cada dos valores (los pares o los
+        impares, al azar), que pasan al nivel siguiente con el doble de peso.
+        Si la cantidad es impar, un valor queda en este nivel.
+        """
+        self.sort()
+        impar = len(self) % 2
+        salida = self[impar + random.getrandbits(1)::2]
+        del self[impar:]
+        return salida
+
+
+class SketchCuantiles:
+    """
+    Sketch de cuantiles KLL: estima percentiles de un flujo de montos con
+    memoria acotada, sin guardar todos los valores.
+
+    - El error es de rango: con k=200, el percentil 90 estimado está entre
+      los percentiles ~88,5 y ~91,5 reales. La memoria no depende de la
+      cantidad de valores (unos 3*k).
+    - Modo exacto: mientras se vieron como mucho `exacto_hasta` valores se
+      guardan todos y cuantil() da lo mismo que np.percentile.
+    - fusionar() combina dos sketches (de distintas cuentas, segmentos de
+      tiempo o shards) en uno que resume la unión de los datos.
+    - to_dict() / desde_dict() lo pasan a un diccionario apto para JSON.
+    """
+
+    def __init__(self, k=200, exacto_hasta=None):
+        self.k = k
+        self.exacto_hasta = exacto_hasta if exacto_hasta is not None else k
+        self.n = 0
+        self.minimo = None
+        self.maximo = None
+        self._compactadores = [_Compactador()]
+        self._tamano = 0
+        self._capacidades = self._calcular_capacidades()
+
+    # -----------------------------
+    # CAPACIDAD
+    # -----------------------------
+
+    def _calcular_capacidades(self):
+        # Los niveles bajos (más recientes y de menos peso) tienen menos lugar
+        altura = len(self._compactadores)
+        return [int(math.ceil((2 / 3) ** (altura - nivel - 1) * self.k)) + 1 for nivel in range(altura)]
+
+    def _agregar_nivel(self):
+        self._compactadores.append(_Compactador())
+        self._capacidades = self._calcular_capacidades()
+
+    def _capacidad_total(self):
+        return sum(self._capacidades)
+
+    def _comprimir(self):
+        while self._tamano > self.exacto_hasta and self._tamano >= self._capacidad_total():
+            for nivel, compactador in enumerate(self._compactadores):
+                if len(compactador) >= self._capacidades[nivel]:
+                    if nivel + 1 == len(self._compactadores):
+                        self._agregar_nivel()
+                    self._compactadores[nivel + 1].extend(compactador.compactar())
+                    break
+            self._tamano = sum(len(c) for c in self._compactadores)
+
+    @property
+    def exacto(self):
+        """
+        True si todavía guarda todos los valores (nunca compactó).
+        """
+        return len(self._compactadores) == 1
+
+    # -----------------------------
+    # ACTUALIZACIÓN
+    # -----------------------------
+
+    def agregar(self, valor):
+        valor = float(valor)
+        self.n += 1
+        self.minimo = valor if self.minimo is None else min(self.minimo, valor)
+        self.maximo = valor if self.maximo is None else max(self.maximo, valor)
+
+        self._compactadores[0].append(valor)
+        self._tamano += 1
+        if self._tamano >= self._capacidad_total():
+            self._comprimir()
+
+    def agregar_varios(self, valores):
+        """
+        Igual que llamar agregar() con cada valor, pero llena el nivel 0 por
+        tramos y comprime una vez por tramo.
+        """
+        valores = [float(v) for v in valores]
+        if not valores:
+            return
+        self.n += len(valores)
+        self.minimo = min(valores) if self.minimo is None else min(self.minimo, min(valores))
+        self.maximo = max(valores) if self.maximo is None else max(self.maximo, max(valores))
+
+        i = 0
+        while i < len(valores):
+            lugar = max(self._capacidad_total(), self.exacto_hasta + 1) - self._tamano
+            tramo = valores[i:i + max(lugar, 1)]
+            self._compactadores[0].extend(tramo)
+            self._tamano += len(tramo)
+            i += len(tramo)
+            self._comprimir()
+
+    def fusionar(self, otro):
+        """
+        Agrega a este sketch los datos resumidos en `otro` (que no se modifica).
+        """
+        if otro.n == 0:
+            return self
+
+        self.n += otro.n
+        self.minimo = otro.minimo if self.minimo is None else min(self.minimo, otro.minimo)
+        self.maximo = otro.maximo if self.maximo is None else max(self.maximo, otro.maximo)
+
+        while len(self._compactadores) < len(otro._compactadores):
+            self._agregar_nivel()
+        for nivel, compactador in enumerate(otro._compactadores):
+            self._compactadores[nivel].extend(compactador)
+
+        self._tamano = sum(len(c) for c in self._compactadores)
+        self._comprimir()
+        return self
+
+    # -----------------------------
+    # CONSULTA
+    # -----------------------------
+
+    def cuantil(self, q):
+        """
+        Valor aproximado del cuantil q (entre 0 y 1). En modo exacto, igual a
+        np.percentile(valores, q * 100). Sin datos devuelve 0.
+        """
+        if self.n == 0:
+            return 0
+
+        if self.exacto:
+            valores = sorted(self._compactadores[0])
+            posicion = q * (len(valores) - 1)
+            abajo = int(math.floor(posicion))
+            arriba = min(abajo + 1, len(valores) - 1)
+            return valores[abajo] + (valores[arriba] - valores[abajo]) * (posicion - abajo)
+
+        pesados = sorted(
+            (valor, 1 << nivel)
+            for nivel, compactador in enumerate(self._compactadores)
+            for valor in compactador
+        )
+        total = sum(peso for _, peso in pesados)
+        objetivo = q * total
+        acumulado = 0
+        for valor, peso in pesados:
+            acumulado += peso
+            if acumulado >= objetivo:
+                return min(max(valor, self.minimo), self.maximo)
+        return self.maximo
+
+    def percentiles(self):
+        """
+        {"p50": ..., "p90": ..., "p99": ...}, igual que Estadisticas.percentiles.
+        """
+        return {nombre: self.cuantil(q) for nombre, q in PERCENTILES.items()}
+
+    # -----------------------------
+    # SERIALIZACIÓN
+    # -----------------------------
+
+    def to_dict(self):
+        return {
+            "k": self.k,
+            "exacto_hasta": self.exacto_hasta,
+            "n": self.n,
+            "minimo": self.minimo,
+            "maximo": self.maximo,
+            "niveles": [list(c) for c in self._compactadores],
+        }
+
+    @classmethod
+    def desde_dict(cls, datos):
+        sketch = cls(k=datos["k"], exacto_hasta=datos["exacto_hasta"])
+        sketch.n = datos["n"]
+        sketch.minimo = datos["minimo"]
+        sketch.maximo = datos["maximo"]
+        sketch._compactadores = [_Compactador(nivel) for nivel in datos["niveles"]]
+        sketch._tamano = sum(len(c) for c in sketch._compactadores)
+        sketch._capacidades = sketch._calcular_capacidades()
+        return sketch
+
+
+class SketchesPorCuenta:
+    """
+    Un SketchCuantiles por cuenta más uno global, armados en una sola pasada
+    sobre las transacciones (sirve para historiales que no entran en memoria).
+    Se puede fusionar con otro (por ejemplo, el de otro shard o de otro
+    segmento de tiempo) y serializar.
+    """
+
+    def __init__(self, k=200):
+        self.k = k
+        self.por_cuenta = {}
+        self.global_ = SketchCuantiles(k)
+
+    @classmethod
+    def desde_transacciones(cls, transacciones, k=200):
+        sketches = cls(k)
+        for t in transacciones:
+            sketches.agregar(t["cuenta_id"], t["monto"])
+        return sketches
+
+    def agregar(self, cuenta_id, monto):
+        sketch = self.por_cuenta.get(cuenta_id)
+        if sketch is None:
+            sketch = self.por_cuenta[cuenta_id] = SketchCuantiles(self.k)
+        sketch.agregar(monto)
+        self.global_.agregar(monto)
+
+    def fusionar(self, otro):
+        for cuenta_id, sketch in otro.por_cuenta.items():
+            propio = self.por_cuenta.get(cuenta_id)
+            if propio is None:
+                propio = self.por_cuenta[cuenta_id] = SketchCuantiles(self.k)
+            propio.fusionar(sketch)
+        self.global_.fusionar(otro.global_)
+        return self
+
+    def percentiles(self, cuenta_id=None):
+        """
+        Percentiles de una cuenta, o globales si cuenta_id es None.
+        """
+        if cuenta_id is None:
+            return self.global_.percentiles()
+        sketch = self.por_cuenta.get(cuenta_id)
+        return sketch.percentiles() if sketch is not None else SketchCuantiles(self.k).percentiles()
+
+    def to_dict(self):
+        return {
+            "k": self.k,
+            "global": self.global_.to_dict(),
+            "por_cuenta": {c: s.to_dict() for c, s in self.por_cuenta.items()},
+        }
+
+    @classmethod
+    def desde_dict(cls, datos):
+        sketches = cls(datos["k"])
+        sketches.global_ = SketchCuantiles.desde_dict(datos["global"])
+        sketches.por_cuenta = {c: SketchCuantiles.desde_dict(s) for c, s in datos["por_cuenta"].items()}
+        return sketches
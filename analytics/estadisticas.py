@@ -1,10 +1,22 @@
 import numpy as np
-from datetime import datetime
+from analytics.agrupacion import agrupar, claves_periodo, etiquetas_periodo
+from analytics.columnas import Columnas, TotalesDiarios, US_POR_DIA, fechas_a_ts
+
+_SIGNO_TIPO = {"deposito": 1, "retiro": -1}
 
 
 class Estadisticas:
     """
     Funciones vectorizadas para análisis estadístico de transacciones.
+    Aceptan una lista o cualquier iterable (por ejemplo TransaccionRepo.iter_todas()).
+    estadisticas_generales, promedio_diario, transacciones_por_dia,
+    total_diario y resumen_todas_cuentas también aceptan un objeto Columnas
+    (ver AlmacenColumnar). transacciones_por_dia y total_diario aceptan además
+    un TotalesDiarios (ver ResumenDiario), para períodos de un día o más.
+
+    Las fechas se convierten todas juntas a enteros (microsegundos desde
+    epoch, ver fechas_a_ts) y se agrupan por día con aritmética de NumPy, sin
+    parsear fila por fila.
     Cada transacción debe venir como diccionario:
     {
         "id": "...",
@@ -19,6 +31,40 @@ class Estadisticas:
     # FILTROS BÁSICOS
     # ============================================================
 
+    @staticmethod
+    def _como_lista(transacciones):
+        return transacciones if isinstance(transacciones, list) else list(transacciones)
+
+    @staticmethod
+    def _timestamps(transacciones):
+        if isinstance(transacciones, Columnas):
+            return transacciones.ts
+        return fechas_a_ts([t["fecha"] for t in transacciones])
+
+    @staticmethod
+    def _arreglos(transacciones):
+        """
+        Pasa las transacciones (o un Columnas) a arreglos en un solo recorrido:
+        (montos, es_deposito, es_retiro, ts).
+        """
+        if isinstance(transacciones, Columnas):
+            return (
+                np.asarray(transacciones.monto, dtype=float),
+                transacciones.mascara_tipo("deposito"),
+                transacciones.mascara_tipo("retiro"),
+                np.asarray(transacciones.ts),
+            )
+
+        # 1 = depósito, -1 = retiro, 0 = otro tipo
+        montos, signos, fechas = [], [], []
+        for t in transacciones:
+            montos.append(t["monto"])
+            signos.append(_SIGNO_TIPO.get(t["tipo"], 0))
+            fechas.append(t["fecha"])
+
+        signos = np.array(signos, dtype=np.int8)
+        return np.array(montos, dtype=float), signos == 1, signos == -1, fechas_a_ts(fechas)
+
     @staticmethod
     def _filtrar_por_tipo(transacciones, tipo):
         return np.array([t["monto"] for t in transacciones if t["tipo"] == tipo], dtype=float)
@@ -39,6 +85,7 @@ class Estadisticas:
 
     @staticmethod
     def ratio_dep_gastos(transacciones):
+        transacciones = Estadisticas._como_lista(transacciones)
         dep = Estadisticas.total_depositos(transacciones)
         gas = Estadisticas.total_gastos(transacciones)
         return dep / gas if gas > 0 else float("inf")
@@ -62,17 +109,14 @@ class Estadisticas:
 
     @staticmethod
     def promedio_diario(transacciones):
-        if not transacciones:
-            return 0.0
+        dias = Estadisticas._timestamps(transacciones) // US_POR_DIA
 
-        fechas = np.array([
-            datetime.fromisoformat(t["fecha"]).date()
-            for t in transacciones
-        ])
+        if dias.size == 0:
+            return 0.0
 
-        dias_unicos = np.unique(fechas)
+        dias_unicos = np.unique(dias)
 
-        return len(transacciones) / len(dias_unicos)
+        return dias.size / len(dias_unicos)
 
     # ============================================================
     # RESUMEN COMPLETO POR CUENTA
@@ -80,52 +124,163 @@ class Estadisticas:
 
     @staticmethod
     def resumen_por_cuenta(transacciones):
+        """
+        Todas las métricas de una cuenta en una sola pasada: los datos se
+        pasan una vez a arreglos (monto, tipo, día) y cada métrica es una
+        operación de NumPy sobre ellos. Acepta también un objeto Columnas.
+        """
+        montos, es_deposito, es_retiro, ts = Estadisticas._arreglos(transacciones)
+        return Estadisticas._resumen_arreglos(montos, es_deposito, es_retiro, ts // US_POR_DIA)
+
+    @staticmethod
+    def _resumen_arreglos(montos, es_deposito, es_retiro, dias):
+        """
+        Mismo diccionario (y mismos tipos de valores) que devolvían las
+        métricas por separado.
+        """
+        if montos.size == 0:
+            return {
+                "total_depositos": 0.0,
+                "total_gastos": 0.0,
+                "ratio_dep_gastos": float("inf"),
+                "promedio_diario": 0.0,
+                "desviacion_estandar": 0.0,
+                "percentiles": {"p50": 0, "p90": 0, "p99": 0},
+            }
+
+        dep = np.sum(montos[es_deposito]) if es_deposito.any() else 0.0
+        gas = np.sum(montos[es_retiro]) if es_retiro.any() else 0.0
+        p50, p90, p99 = np.percentile(montos, [50, 90, 99])
+
         return {
-            "total_depositos": Estadisticas.total_depositos(transacciones),
-            "total_gastos": Estadisticas.total_gastos(transacciones),
-            "ratio_dep_gastos": Estadisticas.ratio_dep_gastos(transacciones),
-            "promedio_diario": Estadisticas.promedio_diario(transacciones),
-            "desviacion_estandar": Estadisticas.desviacion_estandar(transacciones),
-            "percentiles": Estadisticas.percentiles(transacciones)
+            "total_depositos": dep,
+            "total_gastos": gas,
+            "ratio_dep_gastos": dep / gas if gas > 0 else float("inf"),
+            "promedio_diario": montos.size / len(np.unique(dias)),
+            "desviacion_estandar": np.std(montos),
+            "percentiles": {"p50": p50, "p90": p90, "p99": p99},
         }
 
     # ============================================================
-    # MÉTRICAS GLOBALES DEL BANCO
+    # RESUMEN DE TODAS LAS CUENTAS
     # ============================================================
 
     @staticmethod
-    def transacciones_por_dia(transacciones):
-        fechas = np.array([
-            datetime.fromisoformat(t["fecha"]).date()
-            for t in transacciones
-        ])
+    def resumen_todas_cuentas(transacciones):
+        """
+        {cuenta_id: resumen} con el mismo resumen que resumen_por_cuenta, para
+        todas las cuentas con movimientos, leyendo los datos una sola vez.
+        """
+        return dict(Estadisticas.iter_resumen_todas_cuentas(transacciones))
+
+    @staticmethod
+    def iter_resumen_todas_cuentas(transacciones):
+        """
+        Genera (cuenta_id, resumen) por cuenta. Los datos se pasan una vez a
+        columnas y se agrupan por código de cuenta: las sumas salen de
+        np.bincount y los percentiles de un único ordenamiento por
+        (cuenta, monto), sin volver a recorrer las filas de cada cuenta.
+        """
+        cols = transacciones if isinstance(transacciones, Columnas) else Columnas.desde_transacciones(transacciones)
+        if len(cols) == 0:
+            return
+
+        montos = np.asarray(cols.monto, dtype=float)
+        cuenta = np.asarray(cols.cuenta, dtype=np.int64)
+        grupos = len(cols.cuentas)
+
+        conteos = np.bincount(cuenta, minlength=grupos)
+        depositos = np.bincount(cuenta, weights=np.where(cols.mascara_tipo("deposito"), montos, 0.0), minlength=grupos)
+        gastos = np.bincount(cuenta, weights=np.where(cols.mascara_tipo("retiro"), montos, 0.0), minlength=grupos)
 
-        unicas, conteos = np.unique(fechas, return_counts=True)
+        # Desviación estándar en dos pasadas (como np.std): primero la media
+        con_filas = conteos > 0
+        medias = np.zeros(grupos)
+        medias[con_filas] = np.bincount(cuenta, weights=montos, minlength=grupos)[con_filas] / conteos[con_filas]
+        cuadrados = np.bincount(cuenta, weights=(montos - medias[cuenta]) ** 2, minlength=grupos)
+        desviaciones = np.zeros(grupos)
+        desviaciones[con_filas] = np.sqrt(cuadrados[con_filas] / conteos[con_filas])
 
-        return dict(zip(unicas, conteos))
+        # Días distintos por cuenta: pares (cuenta, día) únicos como un solo entero
+        dias = np.asarray(cols.dia)
+        dia_min = dias.min()
+        rango = dias.max() - dia_min + 1
+        pares = np.unique(cuenta * rango + (dias - dia_min))
+        dias_distintos = np.bincount(pares // rango, minlength=grupos)
+
+        # Percentiles: montos ordenados por cuenta y, dentro de cada cuenta, de menor a mayor
+        ordenados = montos[np.lexsort((montos, cuenta))]
+        inicios = np.concatenate(([0], np.cumsum(conteos)[:-1]))
+        percentiles = {}
+        for nombre, q in (("p50", 0.50), ("p90", 0.90), ("p99", 0.99)):
+            # Interpolación lineal con la misma fórmula que np.percentile
+            posicion = q * (np.maximum(conteos, 1) - 1)
+            abajo = np.floor(posicion).astype(np.int64)
+            arriba = np.minimum(abajo + 1, np.maximum(conteos, 1) - 1)
+            v_abajo = ordenados[np.minimum(inicios + abajo, len(ordenados) - 1)]
+            v_arriba = ordenados[np.minimum(inicios + arriba, len(ordenados) - 1)]
+            fraccion = posicion - abajo
+            percentiles[nombre] = np.where(
+                fraccion >= 0.5,
+                v_arriba - (v_arriba - v_abajo) * (1 - fraccion),
+                v_abajo + (v_arriba - v_abajo) * fraccion,
+            )
+
+        for codigo in np.flatnonzero(con_filas):
+            dep = depositos[codigo]
+            gas = gastos[codigo]
+            yield cols.cuentas[codigo], {
+                "total_depositos": dep,
+                "total_gastos": gas,
+                "ratio_dep_gastos": dep / gas if gas > 0 else float("inf"),
+                "promedio_diario": int(conteos[codigo]) / int(dias_distintos[codigo]),
+                "desviacion_estandar": desviaciones[codigo],
+                "percentiles": {nombre: valores[codigo] for nombre, valores in percentiles.items()},
+            }
+
+    # ============================================================
+    # MÉTRICAS GLOBALES DEL BANCO
+    # ============================================================
 
     @staticmethod
-    def total_diario(transacciones):
-        fechas = np.array([
-            datetime.fromisoformat(t["fecha"]).date()
-            for t in transacciones
-        ])
+    def transacciones_por_dia(transacciones, periodo="dia"):
+        """
+        Cantidad de transacciones por período ("hora", "dia", "semana" o "mes").
+        """
+        if isinstance(transacciones, TotalesDiarios):
+            claves, totales = Estadisticas._claves_totales(transacciones, periodo)
+            unicas, _, sumas = agrupar(claves, cantidad=totales.cantidad)
+            return dict(zip(etiquetas_periodo(unicas, periodo), sumas["cantidad"].astype(np.int64)))
 
-        montos = np.array([t["monto"] for t in transacciones])
-        tipos = np.array([t["tipo"] for t in transacciones])
+        claves = claves_periodo(Estadisticas._timestamps(transacciones), periodo)
 
-        dias = np.unique(fechas)
-        resultado = {}
+        unicas, conteos = np.unique(claves, return_counts=True)
 
-        for dia in dias:
-            mask = fechas == dia
-            montos_dia = montos[mask]
-            tipos_dia = tipos[mask]
+        return dict(zip(etiquetas_periodo(unicas, periodo), conteos))
 
-            dep = np.sum(montos_dia[tipos_dia == "deposito"])
-            gas = np.sum(montos_dia[tipos_dia == "retiro"])
+    @staticmethod
+    def total_diario(transacciones, periodo="dia"):
+        """
+        Depósitos, gastos y neto por período ("hora", "dia", "semana" o
+        "mes"), en una sola pasada: np.unique numera los períodos y
+        np.bincount suma los montos de cada uno.
+        """
+        if isinstance(transacciones, TotalesDiarios):
+            claves, totales = Estadisticas._claves_totales(transacciones, periodo)
+            unicas, _, sumas = agrupar(claves, depositos=totales.depositos, gastos=totales.retiros)
+        else:
+            montos, es_deposito, es_retiro, ts = Estadisticas._arreglos(transacciones)
+            unicas, _, sumas = agrupar(
+                claves_periodo(ts, periodo),
+                depositos=np.where(es_deposito, montos, 0.0),
+                gastos=np.where(es_retiro, montos, 0.0),
+            )
 
-            resultado[dia] = {
+        resultado = {}
+        for i, etiqueta in enumerate(etiquetas_periodo(unicas, periodo)):
+            dep = sumas["depositos"][i]
+            gas = sumas["gastos"][i]
+            resultado[etiqueta] = {
                 "depositos": dep,
                 "gastos": gas,
                 "neto": dep - gas
@@ -133,17 +288,40 @@ class Estadisticas:
 
         return resultado
 
+    @staticmethod
+    def _claves_totales(totales, periodo):
+        """
+        Claves de período de los días de un TotalesDiarios. Se usan solo los
+        días con transacciones (los que tienen únicamente transferencias no
+        aparecerían agrupando las filas), así que devuelve (claves, totales).
+        """
+        if periodo == "hora":
+            raise ValueError("El resumen diario no tiene detalle por hora")
+        totales = totales.seleccionar(totales.cantidad > 0)
+        return claves_periodo(totales.dia * US_POR_DIA, periodo), totales
+
     # ============================================================
     # MÉTRICAS GLOBALES PARA EL MENÚ ADMIN
     # ============================================================
 
     @staticmethod
     def estadisticas_generales(trans):
-        total = len(trans)
-        depositos = len([t for t in trans if t["tipo"] == "deposito"])
-        retiros = len([t for t in trans if t["tipo"] == "retiro"])
-        transferencias = len([t for t in trans if t["tipo"] == "transferencia"])
-        monto_total = sum(float(t["monto"]) for t in trans) if total > 0 else 0
+        if isinstance(trans, Columnas):
+            return Estadisticas._estadisticas_generales_columnas(trans)
+
+        # Una sola pasada: sirve igual para una lista o para un generador
+        total = depositos = retiros = transferencias = 0
+        monto_total = 0
+        for t in trans:
+            total += 1
+            if t["tipo"] == "deposito":
+                depositos += 1
+            elif t["tipo"] == "retiro":
+                retiros += 1
+            elif t["tipo"] == "transferencia":
+                transferencias += 1
+            monto_total += float(t["monto"])
+
         monto_promedio = monto_total / total if total > 0 else 0
 
         return {
@@ -154,3 +332,18 @@ class Estadisticas:
             "monto_total": monto_total,
             "monto_promedio": monto_promedio
         }
+
+    @staticmethod
+    def _estadisticas_generales_columnas(cols):
+        total = len(cols)
+        monto_total = float(np.sum(cols.monto)) if total > 0 else 0
+        monto_promedio = monto_total / total if total > 0 else 0
+
+        return {
+            "total_transacciones": total,
+            "total_depositos": cols.contar_tipo("deposito"),
+            "total_retiros": cols.contar_tipo("retiro"),
+            "total_transferencias": cols.contar_tipo("transferencia"),
+            "monto_total": monto_total,
+            "monto_promedio": monto_promedio
+        }
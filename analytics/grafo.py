@@ -2,10 +2,12 @@ import os
 import pandas as pd
 import networkx as nx
 import matplotlib.pyplot as plt
+from repositories.cache_archivos import cache_global
 
 class GrafoTransacciones:
     def __init__(self):
-        self.df = pd.read_csv("data/transferencias.csv")
+        # El DataFrame del cache es compartido: se trabaja sobre una copia
+        self.df = cache_global.leer("data/transferencias.csv", pd.read_csv).copy()
         self.G = nx.DiGraph()
         os.makedirs("outputs/plots", exist_ok=True)
 
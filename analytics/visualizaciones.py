@@ -3,25 +3,47 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import pandas as pd
 from collections import defaultdict
+from analytics.columnas import dias_a_fechas
+from repositories.cache_archivos import cache_global
 
 class Visualizador:
-    def __init__(self):
-        self.df = pd.read_csv("data/transferencias.csv")
+    def __init__(self, resumen_diario=None):
+        # Con un ResumenDiario, serie_temporal usa sus totales por día
+        self.resumen_diario = resumen_diario
+        # El DataFrame del cache es compartido: se trabaja sobre una copia
+        self.df = cache_global.leer("data/transferencias.csv", pd.read_csv).copy()
         self.df["fecha"] = pd.to_datetime(self.df["fecha"])
         self.df["hora"] = self.df["fecha"].dt.hour
         self.df["dia_semana"] = self.df["fecha"].dt.day_name()
 
         os.makedirs("outputs/plots", exist_ok=True)
 
-    def serie_temporal(self):
-        datos = self.df.groupby(self.df["fecha"].dt.date)["monto"].sum()
-        if datos.empty:
+    def serie_temporal(self, desde=None, hasta=None):
+        """
+        Monto total por día. desde/hasta (inclusivo/exclusivo) limitan la ventana.
+        Si hay resumen diario (y desde/hasta caen al comienzo de un día), los
+        montos salen de ahí en vez de agrupar todas las transferencias.
+        """
+        if self.resumen_diario is not None and self.resumen_diario.cubre(desde, hasta):
+            totales = self.resumen_diario.totales(desde, hasta)
+            con_datos = totales.transferencias_salida > 0
+            fechas = dias_a_fechas(totales.dia[con_datos])
+            netos = totales.transferencias_salida[con_datos]
+        else:
+            df = self.df
+            if desde is not None:
+                df = df[df["fecha"] >= pd.Timestamp(desde)]
+            if hasta is not None:
+                df = df[df["fecha"] < pd.Timestamp(hasta)]
+
+            datos = df.groupby(df["fecha"].dt.date)["monto"].sum()
+            fechas = datos.index
+            netos = datos.values
+
+        if len(netos) == 0:
             print("⚠️ No hay datos para la serie temporal.")
             return
 
-        fechas = datos.index
-        netos = datos.values
-
         plt.figure(figsize=(10, 5))
         plt.plot(fechas, netos, marker="o")
         plt.title("Serie temporal del banco")
@@ -65,7 +87,7 @@ class Visualizador:
 
     def scatter_depositos_vs_gastos(self):
         try:
-            df_trans = pd.read_csv("data/transacciones.csv", header=0)
+            df_trans = cache_global.leer("data/transacciones.csv", pd.read_csv).copy()
             df_trans["fecha"] = pd.to_datetime(df_trans["fecha"], errors="coerce")
 
             cuentas = defaultdict(lambda: {"depositos": 0, "gastos": 0})
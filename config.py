@@ -0,0 +1,50 @@
+# ============================================================
+# CONFIGURACIÓN DEL SISTEMA
+# ============================================================
+# Los valores se pueden sobrescribir con variables de entorno.
+
+import os
+
+# Backend de almacenamiento: "csv" o "sqlite"
+BACKEND = os.environ.get("BANCO_BACKEND", "csv")
+
+# Ruta de la base de datos cuando BACKEND == "sqlite"
+SQLITE_PATH = os.environ.get("BANCO_SQLITE_PATH", "data/banco.db")
+
+# Escritura en grupo de transacciones y transferencias (solo backend "csv").
+# Las filas se acumulan y se escriben juntas; ver repositories/escritor_buffer.py
+BUFFER_ESCRITURAS = os.environ.get("BANCO_BUFFER_ESCRITURAS", "0") == "1"
+
+# Política de fsync del buffer: "siempre", "al_cerrar" o "nunca"
+BUFFER_FSYNC = os.environ.get("BANCO_BUFFER_FSYNC", "nunca")
+
+# Índice por cuenta_id al lado de transacciones.csv (solo backend "csv").
+# Las consultas de una cuenta leen solo sus filas; ver repositories/indice_cuentas.py
+INDICE_TRANSACCIONES = os.environ.get("BANCO_INDICE_TRANSACCIONES", "1") == "1"
+
+# Particionado de transacciones por tiempo (solo backend "csv"): "", "dia" o "mes".
+# Con "dia"/"mes" las transacciones van a data/transacciones/<segmento>.csv;
+# para migrar: python -m repositories.transaccion_repo_particionado mes
+PARTICIONES_TRANSACCIONES = os.environ.get("BANCO_PARTICIONES_TRANSACCIONES", "")
+
+# Copia columnar binaria de transacciones.csv para análisis con NumPy (solo backend "csv").
+# Ver repositories/almacen_columnar.py
+ALMACEN_COLUMNAR = os.environ.get("BANCO_ALMACEN_COLUMNAR", "0") == "1"
+
+# Estadísticas globales mantenidas al día con cada escritura (solo backend "csv"),
+# para que el menú admin no relea todas las transacciones.
+# Ver repositories/agregados_globales.py
+AGREGADOS_GLOBALES = os.environ.get("BANCO_AGREGADOS_GLOBALES", "1") == "1"
+
+# Totales por día y por cuenta mantenidos al día con cada escritura (solo backend "csv"),
+# para los reportes por día sin releer todo el historial.
+# Ver repositories/resumen_diario.py
+RESUMEN_DIARIO = os.environ.get("BANCO_RESUMEN_DIARIO", "1") == "1"
+
+# Memoria máxima (en MB) del cache compartido de archivos parseados.
+# Ver repositories/cache_archivos.py
+CACHE_MB = int(os.environ.get("BANCO_CACHE_MB", "256"))
+
+# Registro de intenciones (redo log): cada operación de BankService se confirma
+# como una sola unidad atómica ante caídas. Ver repositories/registro_redo.py
+REGISTRO_REDO = os.environ.get("BANCO_REGISTRO_REDO", "1") == "1"
@@ -0,0 +1,358 @@
+"""
+Versiones compactas de los objetos del dominio, para tener millones en memoria.
+
+- Usan __slots__ (sin un __dict__ por objeto).
+- El dinero se guarda en millonésimas (int, ver ESCALA): sumar y restar es
+  exacto, sin la deriva de los float después de millones de operaciones.
+- Las fechas se guardan como microsegundos desde 1970-01-01 (int).
+- Los ids UUID se guardan como sus 16 bytes.
+
+Cada clase convierte desde y hacia el formato de to_dict() de los CSV
+(desde_dict / to_dict) y hacia el objeto normal (a_objeto). Los montos se
+redondean a la millonésima: Cuenta no redondea al centavo (acepta 0.004 o
+guarda 10.129), así que una escala en centavos perdería esos montos. Solo se
+pierde el ruido de los float por debajo de la millonésima.
+"""
+import sys
+import uuid
+from datetime import datetime, timedelta
+from domain.administrador import Administrador
+from domain.cliente import Cliente
+from domain.cuenta import Cuenta
+from domain.identificadores import nuevo_id
+from domain.transaccion import Transaccion
+from domain.transferencia import Transferencia
+
+# Unidades enteras por unidad de moneda con que se guardan los montos
+ESCALA = 1_000_000
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSEGUNDO = timedelta(microseconds=1)
+
+
+# ============================================================
+# CONVERSIONES
+# ============================================================
+
+def a_unidades(monto):
+    """
+    95.5 o "95.5" → 95500000 (millonésimas).
+    """
+    return round(float(monto) * ESCALA)
+
+
+def a_monto(unidades):
+    """
+    95500000 → 95.5 (el float que se escribe en el CSV).
+    """
+    return unidades / ESCALA
+
+
+def _monto_operacion(monto):
+    """
+    Millonésimas de un monto a depositar o retirar, con las mismas
+    validaciones que Cuenta.
+    """
+    if monto <= 0:
+        raise ValueError("El monto debe ser mayor a 0")
+    unidades = a_unidades(monto)
+    if unidades <= 0:
+        raise ValueError(f"El monto es menor que la precisión ({1 / ESCALA})")
+    return unidades
+
+
+def a_epoch_us(fecha):
+    """
+    datetime o texto ISO → microsegundos desde 1970-01-01.
+    Las fechas del banco son locales y sin zona horaria: se cuentan tal cual.
+    """
+    if isinstance(fecha, str):
+        fecha = datetime.fromisoformat(fecha)
+    return (fecha - _EPOCH) // _MICROSEGUNDO
+
+
+def a_fecha(epoch_us):
+    return _EPOCH + timedelta(microseconds=epoch_us)
+
+
+def id_a_bytes(id_texto):
+    """
+    UUID en texto → 16 bytes. Un id que no es un UUID canónico (por ejemplo,
+    cargado a mano) se deja como texto para no perderlo.
+    """
+    try:
+        valor = uuid.UUID(id_texto)
+    except (ValueError, TypeError, AttributeError):
+        return id_texto
+    return valor.bytes if str(valor) == id_texto else id_texto
+
+
+def bytes_a_id(valor):
+    if isinstance(valor, bytes):
+        return str(uuid.UUID(bytes=valor))
+    return valor
+
+
+def _como_bool(valor):
+    # En el CSV los booleanos se guardan como texto
+    return valor if isinstance(valor, bool) else valor == "True"
+
+
+# ============================================================
+# CUENTA
+# ============================================================
+
+class CuentaCompacta:
+    """
+    Cuenta con el saldo en millonésimas. Mismas operaciones que Cuenta.
+    """
+
+    __slots__ = ("numero", "cliente_id", "tipo", "saldo_unidades", "activa")
+
+    def __init__(self, numero, cliente_id, tipo, saldo_unidades=0, activa=True):
+        self.numero = numero
+        self.cliente_id = cliente_id
+        self.tipo = sys.intern(tipo)
+        self.saldo_unidades = saldo_unidades
+        self.activa = activa
+
+    @property
+    def saldo(self):
+        return a_monto(self.saldo_unidades)
+
+    # -----------------------------
+    # OPERACIONES
+    # -----------------------------
+
+    def depositar(self, monto):
+        if not self.activa:
+            raise Exception("La cuenta está bloqueada")
+
+        unidades = _monto_operacion(monto)
+        self.saldo_unidades += unidades
+        return TransaccionCompacta.nueva(self.numero, "deposito", unidades)
+
+    def retirar(self, monto):
+        if not self.activa:
+            raise Exception("La cuenta está bloqueada")
+
+        unidades = _monto_operacion(monto)
+        if unidades > self.saldo_unidades:
+            raise Exception("Saldo insuficiente")
+
+        self.saldo_unidades -= unidades
+        return TransaccionCompacta.nueva(self.numero, "retiro", unidades)
+
+    def bloquear(self):
+        self.activa = False
+
+    def activar(self):
+        self.activa = True
+
+    # -----------------------------
+    # CONVERSIÓN
+    # -----------------------------
+
+    @classmethod
+    def desde_dict(cls, fila):
+        return cls(
+            fila["numero"], fila["cliente_id"], fila["tipo"],
+            a_unidades(fila["saldo"]), _como_bool(fila["activa"])
+        )
+
+    @classmethod
+    def desde_objeto(cls, cuenta):
+        return cls(cuenta.numero, cuenta.cliente_id, cuenta.tipo, a_unidades(cuenta.saldo), cuenta.activa)
+
+    def a_objeto(self):
+        return Cuenta(self.numero, self.cliente_id, self.tipo, self.saldo, self.activa)
+
+    def to_dict(self):
+        return {
+            "numero": self.numero,
+            "cliente_id": self.cliente_id,
+            "tipo": self.tipo,
+            "saldo": self.saldo,
+            "activa": self.activa
+        }
+
+
+# ============================================================
+# TRANSACCIÓN
+# ============================================================
+
+class TransaccionCompacta:
+    """
+    Transacción con monto en millonésimas, fecha en microsegundos e id en 16 bytes.
+    """
+
+    __slots__ = ("id", "cuenta_id", "tipo", "monto_unidades", "fecha_us")
+
+    def __init__(self, id, cuenta_id, tipo, monto_unidades, fecha_us):
+        self.id = id
+        self.cuenta_id = cuenta_id
+        self.tipo = sys.intern(tipo)
+        self.monto_unidades = monto_unidades
+        self.fecha_us = fecha_us
+
+    @classmethod
+    def nueva(cls, cuenta_id, tipo, monto_unidades):
+        """
+        Igual que Transaccion(...): id nuevo y fecha actual.
+        """
+        if monto_unidades <= 0:
+            raise ValueError("El monto debe ser mayor a 0")
+        return cls(uuid.UUID(nuevo_id()).bytes, cuenta_id, tipo, monto_unidades, a_epoch_us(datetime.now()))
+
+    @property
+    def monto(self):
+        return a_monto(self.monto_unidades)
+
+    @property
+    def fecha(self):
+        return a_fecha(self.fecha_us)
+
+    # -----------------------------
+    # CONVERSIÓN
+    # -----------------------------
+
+    @classmethod
+    def desde_dict(cls, fila):
+        return cls(
+            id_a_bytes(fila["id"]), fila["cuenta_id"], fila["tipo"],
+            a_unidades(fila["monto"]), a_epoch_us(fila["fecha"])
+        )
+
+    @classmethod
+    def desde_objeto(cls, transaccion):
+        return cls(
+            id_a_bytes(transaccion.id), transaccion.cuenta_id, transaccion.tipo,
+            a_unidades(transaccion.monto), a_epoch_us(transaccion.fecha)
+        )
+
+    def a_objeto(self):
+        transaccion = Transaccion(self.cuenta_id, self.tipo, self.monto)
+        transaccion.id = bytes_a_id(self.id)
+        transaccion.fecha = self.fecha
+        return transaccion
+
+    def to_dict(self):
+        return {
+            "id": bytes_a_id(self.id),
+            "cuenta_id": self.cuenta_id,
+            "tipo": self.tipo,
+            "monto": self.monto,
+            "fecha": self.fecha.isoformat()
+        }
+
+
+# ============================================================
+# TRANSFERENCIA
+# ============================================================
+
+class TransferenciaCompacta:
+    """
+    Transferencia con monto en millonésimas, fecha en microsegundos e id en 16 bytes.
+    """
+
+    __slots__ = ("id", "cuenta_origen", "cuenta_destino", "tipo_cuenta",
+                 "tipo_transaccion", "monto_unidades", "fecha_us")
+
+    def __init__(self, id, cuenta_origen, cuenta_destino, tipo_cuenta, tipo_transaccion,
+                 monto_unidades, fecha_us):
+        self.id = id
+        self.cuenta_origen = cuenta_origen
+        self.cuenta_destino = cuenta_destino
+        self.tipo_cuenta = sys.intern(tipo_cuenta)
+        self.tipo_transaccion = sys.intern(tipo_transaccion)
+        self.monto_unidades = monto_unidades
+        self.fecha_us = fecha_us
+
+    @property
+    def monto(self):
+        return a_monto(self.monto_unidades)
+
+    @property
+    def fecha(self):
+        return a_fecha(self.fecha_us)
+
+    # -----------------------------
+    # CONVERSIÓN
+    # -----------------------------
+
+    @classmethod
+    def desde_dict(cls, fila):
+        return cls(
+            id_a_bytes(fila["id"]), fila["cuenta_origen"], fila["cuenta_destino"],
+            fila["tipo_cuenta"], fila["tipo_transaccion"],
+            a_unidades(fila["monto"]), a_epoch_us(fila["fecha"])
+        )
+
+    @classmethod
+    def desde_objeto(cls, transferencia):
+        return cls(
+            id_a_bytes(transferencia.id), transferencia.cuenta_origen, transferencia.cuenta_destino,
+            transferencia.tipo_cuenta, transferencia.tipo_transaccion,
+            a_unidades(transferencia.monto), a_epoch_us(transferencia.fecha)
+        )
+
+    def a_objeto(self):
+        transferencia = Transferencia(
+            self.cuenta_origen, self.cuenta_destino, self.tipo_cuenta, self.tipo_transaccion, self.monto
+        )
+        transferencia.id = bytes_a_id(self.id)
+        transferencia.fecha = self.fecha
+        return transferencia
+
+    def to_dict(self):
+        return {
+            "id": bytes_a_id(self.id),
+            "cuenta_origen": self.cuenta_origen,
+            "cuenta_destino": self.cuenta_destino,
+            "tipo_cuenta": self.tipo_cuenta,
+            "tipo_transaccion": self.tipo_transaccion,
+            "monto": self.monto,
+            "fecha": self.fecha.isoformat()
+        }
+
+
+# ============================================================
+# USUARIOS
+# ============================================================
+
+class UsuarioCompacto:
+    """
+    Cliente o administrador con __slots__. `dui` guarda el username en el
+    caso de los administradores, igual que en Administrador.
+    """
+
+    __slots__ = ("nombres", "apellidos", "dui", "pin", "rol")
+
+    def __init__(self, nombres, apellidos, dui, pin, rol):
+        self.nombres = nombres
+        self.apellidos = apellidos
+        self.dui = dui
+        self.pin = pin
+        self.rol = sys.intern(rol)
+
+    @classmethod
+    def desde_dict(cls, fila):
+        return cls(fila["nombres"], fila["apellidos"], fila["dui"], fila["pin"], fila["rol"])
+
+    @classmethod
+    def desde_objeto(cls, usuario):
+        return cls(usuario.nombres, usuario.apellidos, usuario.dui, usuario.pin, usuario.rol)
+
+    def a_objeto(self):
+        if self.rol == "admin":
+            return Administrador(self.nombres, self.apellidos, self.dui, self.pin)
+        return Cliente(self.nombres, self.apellidos, self.dui, self.pin)
+
+    def to_dict(self):
+        return {
+            "nombres": self.nombres,
+            "apellidos": self.apellidos,
+            "dui": self.dui,
+            "pin": self.pin,
+            "rol": self.rol
+        }
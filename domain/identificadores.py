@@ -0,0 +1,84 @@
+"""
+Ids de transacciones y transferencias ordenables por tiempo (formato UUIDv7).
+
+Los primeros 48 bits son los milisegundos desde 1970 (UTC), así que los ids
+nuevos se ordenan como texto en el mismo orden en que se crearon y el instante
+se puede leer del id sin tocar la columna fecha. Siguen siendo UUID válidos,
+así que conviven con los uuid4 de los datos viejos y con domain.compacto.
+"""
+import os
+import threading
+import time
+import uuid
+
+_lock = threading.Lock()
+_ultimo_ms = 0
+_secuencia = 0
+
+_MAX_SECUENCIA = 0xFFF   # 12 bits (rand_a en UUIDv7)
+
+# Pausa mientras se espera el próximo milisegundo (contador agotado)
+_ESPERA_S = 0.0001
+
+
+def nuevo_id():
+    """
+    Id nuevo, estrictamente creciente dentro del proceso: si dos ids caen en
+    el mismo milisegundo, un contador de 12 bits los ordena. Entre procesos
+    la unicidad la dan los 62 bits aleatorios del final. Si en un milisegundo
+    se piden más ids que los que entran en el contador, se espera al
+    siguiente; si el reloj fue para atrás, se usa el milisegundo siguiente
+    al último id en vez de esperar a que el reloj lo alcance.
+    """
+    global _ultimo_ms, _secuencia
+
+    with _lock:
+        ms = time.time_ns() // 1_000_000
+        if ms > _ultimo_ms:
+            _ultimo_ms = ms
+            _secuencia = 0
+        else:
+            # Mismo milisegundo (o el reloj fue para atrás): se sigue desde el último
+            _secuencia += 1
+            if _secuencia > _MAX_SECUENCIA:
+                if ms == _ultimo_ms:
+                    # Se acabó el contador de este milisegundo: se espera al
+                    # siguiente (menos de un milisegundo) en vez de adelantar
+                    # el id respecto del reloj
+                    while ms <= _ultimo_ms:
+                        time.sleep(_ESPERA_S)
+                        ms = time.time_ns() // 1_000_000
+                    _ultimo_ms = ms
+                else:
+                    # El reloj fue para atrás: esperar a que vuelva a alcanzar
+                    # al último id puede llevar minutos con el bloqueo tomado.
+                    # Se toma prestado el milisegundo siguiente (lo permite
+                    # RFC 9562); el id queda adelante del reloj a lo sumo lo
+                    # que el reloj retrocedió.
+                    _ultimo_ms += 1
+                _secuencia = 0
+        ms, secuencia = _ultimo_ms, _secuencia
+
+    aleatorio = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+    valor = (
+        (ms & ((1 << 48) - 1)) << 80
+        | 0x7 << 76                 # versión 7
+        | secuencia << 64
+        | 0b10 << 62                # variante RFC 4122
+        | aleatorio
+    )
+    return str(uuid.UUID(int=valor))
+
+
+def ms_de_id(id_texto):
+    """
+    Milisegundos desde 1970 de un id creado con nuevo_id(), o None si el id no
+    es de ese tipo (uuid4 de datos viejos, ids cargados a mano, ...).
+    """
+    # Formato fijo xxxxxxxx-xxxx-7xxx-...: no hace falta parsear el UUID entero
+    if len(id_texto) != 36 or id_texto[14] != "7" or id_texto[8] != "-":
+        return None
+    try:
+        return int(id_texto[:8] + id_texto[9:13], 16)
+    except ValueError:
+        return None
@@ -1,6 +1,6 @@
 
 from datetime import datetime
-import uuid
+from domain.identificadores import nuevo_id
 
 
 class Transaccion:
@@ -21,7 +21,7 @@ class Transaccion:
         if monto <= 0:
             raise ValueError("El monto debe ser mayor a 0")
 
-        self.id = str(uuid.uuid4())
+        self.id = nuevo_id()
         self.cuenta_id = cuenta_id
         self.tipo = tipo
         self.monto = monto
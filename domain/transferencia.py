@@ -1,6 +1,6 @@
 
 from datetime import datetime
-import uuid
+from domain.identificadores import nuevo_id
 
 
 class Transferencia:
@@ -12,7 +12,7 @@ class Transferencia:
         if monto <= 0:
             raise ValueError("El monto debe ser mayor a 0")
 
-        self.id = str(uuid.uuid4())
+        self.id = nuevo_id()
         self.cuenta_origen = cuenta_origen
         self.cuenta_destino = cuenta_destino
         self.tipo_cuenta = tipo_cuenta
@@ -2,17 +2,31 @@
 # IMPORTACIÓN DE REPOSITORIOS Y SERVICIOS
 # ============================================================
 
-from repositories.usuario_repo import UsuarioRepo
-from repositories.cuenta_repo import CuentaRepo
+import config
+
+from repositories.usuario_repo_indexado import UsuarioRepoIndexado
+from repositories.cuenta_repo_journal import CuentaRepoJournal
 from repositories.transaccion_repo import TransaccionRepo
+from repositories.transaccion_repo_particionado import TransaccionRepoParticionado
 from repositories.transferencia_repo import TransferenciaRepo
+from repositories.cache_archivos import cache_global
+from repositories.bloqueos import BloqueoCuentas
+from repositories.registro_redo import RegistroRedo
+from repositories.sqlite_repo import (
+    conectar,
+    SQLiteUsuarioRepo,
+    SQLiteCuentaRepo,
+    SQLiteTransaccionRepo,
+    SQLiteTransferenciaRepo,
+)
 
 from services.admin_service import AdminService
 from services.bank_service import BankService
 from services.analytics_service import AnalyticsService
-from analytics.anomalias import AnomaliasDetector
-from analytics.grafo import GrafoTransacciones
-from analytics.visualizaciones import Visualizador
+
+# Los módulos de analytics (pandas, networkx, matplotlib, seaborn, NumPy) se
+# importan recién cuando se elige la opción del menú que los usa: la mayoría
+# de las sesiones son depósitos y retiros que nunca los necesitan.
 
 
 # ============================================================
@@ -22,14 +36,43 @@ from analytics.visualizaciones import Visualizador
 def inicializar_servicios():
     """
     Crea repositorios y servicios principales del sistema.
+    El backend de almacenamiento se elige en config.BACKEND ("csv" o "sqlite").
     """
-    usuario_repo = UsuarioRepo()
-    cuenta_repo = CuentaRepo()
-    transaccion_repo = TransaccionRepo()
-    transferencia_repo = TransferenciaRepo()
-
-    admin_service = AdminService(usuario_repo, cuenta_repo)
-    bank_service = BankService(cuenta_repo, transaccion_repo, transferencia_repo)
+    if config.BACKEND == "sqlite":
+        conn = conectar(config.SQLITE_PATH)
+        usuario_repo = SQLiteUsuarioRepo(conn)
+        cuenta_repo = SQLiteCuentaRepo(conn)
+        transaccion_repo = SQLiteTransaccionRepo(conn)
+        transferencia_repo = SQLiteTransferenciaRepo(conn)
+    elif config.BACKEND == "csv":
+        cache_global.presupuesto_bytes = config.CACHE_MB * 1024 * 1024
+        usuario_repo = UsuarioRepoIndexado()
+        cuenta_repo = CuentaRepoJournal()
+        if config.PARTICIONES_TRANSACCIONES:
+            transaccion_repo = TransaccionRepoParticionado(granularidad=config.PARTICIONES_TRANSACCIONES)
+        else:
+            transaccion_repo = TransaccionRepo(
+                buffer=config.BUFFER_ESCRITURAS,
+                indice=config.INDICE_TRANSACCIONES,
+                columnar=config.ALMACEN_COLUMNAR,
+                agregados=config.AGREGADOS_GLOBALES,
+                resumen_diario=config.RESUMEN_DIARIO,
+                fsync=config.BUFFER_FSYNC
+            )
+        transferencia_repo = TransferenciaRepo(buffer=config.BUFFER_ESCRITURAS, fsync=config.BUFFER_FSYNC)
+    else:
+        raise ValueError(f"Backend de almacenamiento desconocido: {config.BACKEND}")
+
+    # Un solo BloqueoCuentas para el registro y los dos servicios
+    bloqueos = BloqueoCuentas()
+
+    registro = None
+    if config.REGISTRO_REDO:
+        registro = RegistroRedo(cuenta_repo, transaccion_repo, transferencia_repo, bloqueos=bloqueos)
+        registro.recuperar()
+
+    admin_service = AdminService(usuario_repo, cuenta_repo, bloqueos=bloqueos, registro=registro)
+    bank_service = BankService(cuenta_repo, transaccion_repo, transferencia_repo, bloqueos=bloqueos, registro=registro)
     analytics_service = AnalyticsService(transaccion_repo)
 
     return admin_service, bank_service, analytics_service, usuario_repo, cuenta_repo, transaccion_repo
@@ -139,9 +182,7 @@ def menu_cliente(cliente, cuenta_repo, bank_service, transaccion_repo):
 
 def ver_mis_cuentas(cliente, cuenta_repo):
     print("\n--- Mis Cuentas ---")
-    cuentas = cuenta_repo.cargar_todas()
-
-    cuentas_cliente = [c for c in cuentas if c.cliente_id == cliente.dui]
+    cuentas_cliente = cuenta_repo.obtener_por_cliente(cliente.dui)
 
     if not cuentas_cliente:
         print("No tienes cuentas registradas.")
@@ -216,24 +257,21 @@ def transferir_cliente(cliente, cuenta_repo, bank_service):
 
 
 def obtener_cuentas_cliente(cliente, cuenta_repo):
-    cuentas = cuenta_repo.cargar_todas()
-    return [c.numero for c in cuentas if c.cliente_id == cliente.dui]
+    return [c.numero for c in cuenta_repo.obtener_por_cliente(cliente.dui)]
 
 
 def historial_cliente(cliente, cuenta_repo, transaccion_repo):
     print("\n--- Historial de Transacciones ---")
 
     cuentas_cliente = obtener_cuentas_cliente(cliente, cuenta_repo)
-    trans = transaccion_repo.obtener_todas()
 
-    trans_cliente = [t for t in trans if t["cuenta_id"] in cuentas_cliente]
+    hay_transacciones = False
+    for t in transaccion_repo.iter_todas(cuenta_id=cuentas_cliente):
+        hay_transacciones = True
+        print(f"{t['fecha']} | {t['tipo']} | ${t['monto']} | ID: {t['id']}")
 
-    if not trans_cliente:
+    if not hay_transacciones:
         print("No tienes transacciones registradas.")
-        return
-
-    for t in trans_cliente:
-        print(f"{t['fecha']} | {t['tipo']} | ${t['monto']} | ID: {t['id']}")
 
 
 # ============================================================
@@ -279,11 +317,11 @@ def menu_admin(admin_service, bank_service, analytics_service):
             elif opcion == "8":
                 ver_estadisticas(analytics_service)
             elif opcion == "9":
-                generar_visualizaciones()
+                generar_visualizaciones(analytics_service.transaccion_repo)
             elif opcion == "10":
                 generar_grafo()
             elif opcion == "11":
-                detectar_anomalias()
+                detectar_anomalias(analytics_service.transaccion_repo)
             elif opcion == "12":
                 break
             else:
@@ -372,10 +410,14 @@ def ver_estadisticas(analytics_service):
     print(f"Total de transferencias: {stats['total_transferencias']}")
     print(f"Monto total movido: ${stats['monto_total']}")
     print(f"Monto promedio por transacción: ${stats['monto_promedio']}")
+    if "percentiles" in stats:
+        p = stats["percentiles"]
+        print(f"Percentiles de monto (p50 / p90 / p99): ${p['p50']:.2f} / ${p['p90']:.2f} / ${p['p99']:.2f}")
 
-def generar_visualizaciones():
+def generar_visualizaciones(transaccion_repo):
     print("\n--- Generando visualizaciones... ---")
-    vis = Visualizador()
+    from analytics.visualizaciones import Visualizador
+    vis = Visualizador(resumen_diario=getattr(transaccion_repo, "resumen_diario", None))
     vis.serie_temporal()
     vis.heatmap_actividad()
     vis.boxplot_cuentas()
@@ -384,15 +426,17 @@ def generar_visualizaciones():
 
 def generar_grafo():
     print("\n--- Generando grafo de transferencias... ---")
+    from analytics.grafo import GrafoTransacciones
     grafo = GrafoTransacciones()
     grafo.construir_grafo()
     grafo.visualizar_grafo()
     grafo.resumen_metricas()
     print("✅ Grafo guardado en 'outputs/plots/grafo_transferencias.png'.")
 
-def detectar_anomalias():
+def detectar_anomalias(transaccion_repo):
     print("\n--- Detección de Anomalías ---")
-    detector = AnomaliasDetector()
+    from analytics.anomalias import AnomaliasDetector
+    detector = AnomaliasDetector(transaccion_repo, almacen=getattr(transaccion_repo, "columnar", None))
 
     z_outliers = detector.z_score_outliers()
     structuring = detector.structuring()
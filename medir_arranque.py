@@ -0,0 +1,84 @@
+# ============================================================
+# MEDICIÓN DEL TIEMPO DE ARRANQUE
+# ============================================================
+# Uso:
+#   python medir_arranque.py            (5 repeticiones)
+#   python medir_arranque.py 10
+#
+# Mide cuánto tarda en importarse cada subsistema, cada vez en un intérprete
+# nuevo (sin nada en cache de sys.modules), y muestra la mediana. También
+# avisa si al importar main se carga alguna de las librerías pesadas de
+# analytics, que deberían cargarse recién al elegir la opción del menú.
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SUBSISTEMAS = [
+    ("main (menú)", "main"),
+    ("repositorios CSV", "repositories.transaccion_repo"),
+    ("repositorios SQLite", "repositories.sqlite_repo"),
+    ("servicios", "services.bank_service"),
+    ("estadísticas (NumPy)", "analytics.estadisticas"),
+    ("anomalías (NumPy)", "analytics.anomalias"),
+    ("grafo (pandas, networkx, matplotlib)", "analytics.grafo"),
+    ("visualizaciones (pandas, matplotlib, seaborn)", "analytics.visualizaciones"),
+]
+
+LIBRERIAS_PESADAS = ["numpy", "pandas", "matplotlib", "networkx", "seaborn"]
+
+# Corre dentro del intérprete nuevo: importa el módulo y devuelve el tiempo
+# y qué librerías pesadas quedaron cargadas.
+_MEDIR = """
+import json, sys, time
+inicio = time.perf_counter()
+import {modulo}
+fin = time.perf_counter()
+print(json.dumps({{
+    "segundos": fin - inicio,
+    "pesadas": [m for m in {pesadas!r} if m in sys.modules],
+}}))
+"""
+
+
+def medir(modulo):
+    """
+    Importa `modulo` en un proceso nuevo. Devuelve (segundos, librerías
+    pesadas cargadas) o lanza Exception con el error del import.
+    """
+    codigo = _MEDIR.format(modulo=modulo, pesadas=LIBRERIAS_PESADAS)
+    resultado = subprocess.run(
+        [sys.executable, "-c", codigo],
+        capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if resultado.returncode != 0:
+        ultima = resultado.stderr.strip().splitlines()[-1] if resultado.stderr.strip() else "error"
+        raise Exception(ultima)
+
+    datos = json.loads(resultado.stdout.strip().splitlines()[-1])
+    return datos["segundos"], datos["pesadas"]
+
+
+def main(repeticiones):
+    print(f"Tiempo de import por subsistema (mediana de {repeticiones}):\n")
+    for nombre, modulo in SUBSISTEMAS:
+        try:
+            mediciones = [medir(modulo) for _ in range(repeticiones)]
+        except Exception as e:
+            print(f"  {nombre:<48} no disponible ({e})")
+            continue
+
+        mediana = statistics.median(s for s, _ in mediciones)
+        pesadas = mediciones[-1][1]
+        detalle = f"  carga: {', '.join(pesadas)}" if pesadas else ""
+        print(f"  {nombre:<48} {mediana * 1000:8.1f} ms{detalle}")
+
+        if modulo == "main" and pesadas:
+            print("  ⚠️  main está cargando librerías de analytics al arrancar")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
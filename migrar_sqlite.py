@@ -0,0 +1,61 @@
+# ============================================================
+# MIGRACIÓN CSV → SQLITE
+# ============================================================
+# Uso:
+#   python migrar_sqlite.py              (usa config.SQLITE_PATH)
+#   python migrar_sqlite.py ruta/a/banco.db
+#
+# Importa usuarios, cuentas, transacciones y transferencias desde data/*.csv.
+# Se puede correr varias veces: las filas con la misma clave se reemplazan.
+
+import sys
+
+import config
+from repositories.usuario_repo import UsuarioRepo
+from repositories.cuenta_repo_journal import CuentaRepoJournal
+from repositories.transaccion_repo import TransaccionRepo
+from repositories.transferencia_repo import TransferenciaRepo
+from repositories.sqlite_repo import conectar
+
+
+def migrar(db_path):
+    conn = conectar(db_path)
+
+    usuarios = [u.to_dict() for u in UsuarioRepo().cargar_todos()]
+    cuentas = [c.to_dict() for c in CuentaRepoJournal().cargar_todas()]
+    transacciones = TransaccionRepo().obtener_todas()
+    transferencias = TransferenciaRepo().obtener_todas()
+
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO usuarios (nombres, apellidos, dui, pin, rol) "
+            "VALUES (:nombres, :apellidos, :dui, :pin, :rol)",
+            usuarios
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO cuentas (numero, cliente_id, tipo, saldo, activa) "
+            "VALUES (:numero, :cliente_id, :tipo, :saldo, :activa)",
+            cuentas
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO transacciones (id, cuenta_id, tipo, monto, fecha) "
+            "VALUES (:id, :cuenta_id, :tipo, :monto, :fecha)",
+            transacciones
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO transferencias (id, cuenta_origen, cuenta_destino, tipo_cuenta, tipo_transaccion, monto, fecha) "
+            "VALUES (:id, :cuenta_origen, :cuenta_destino, :tipo_cuenta, :tipo_transaccion, :monto, :fecha)",
+            transferencias
+        )
+
+    conn.close()
+
+    print(f"Migración completada en {db_path}:")
+    print(f"  - {len(usuarios)} usuarios")
+    print(f"  - {len(cuentas)} cuentas")
+    print(f"  - {len(transacciones)} transacciones")
+    print(f"  - {len(transferencias)} transferencias")
+
+
+if __name__ == "__main__":
+    migrar(sys.argv[1] if len(sys.argv) > 1 else config.SQLITE_PATH)
@@ -0,0 +1,328 @@
+import csv
+import json
+import math
+import os
+import threading
+import zlib
+from contextlib import contextmanager
+
+from analytics.cuantiles import SketchCuantiles, SketchesPorCuenta
+from repositories.bloqueos import bloqueo_archivo
+
+# En cuántos archivos se reparten los sketches por cuenta (por crc32 del número)
+ARCHIVOS_CUANTILES = 64
+
+
+class AgregadosGlobales:
+    """
+    Estadísticas globales de transacciones mantenidas al día, para que el
+    menú admin no tenga que releer todo transacciones.csv.
+
+    Guarda en data/transacciones.agregados.json:
+    - cantidad y suma de montos por tipo
+    - cantidad total, media y M2 de los montos (algoritmo de Welford, para
+      la varianza sin volver a recorrer los datos)
+    - el sketch de cuantiles global de los montos (analytics.cuantiles),
+      para p50/p90/p99 sin leer el historial
+    - hasta qué byte del CSV ya se contó (`cubierto`)
+
+    Los sketches por cuenta van aparte, repartidos en ARCHIVOS_CUANTILES
+    archivos (data/transacciones.cuantiles/NN.json): el JSON principal queda
+    chico y rápido de leer al arrancar, cada archivo se lee recién cuando se
+    usa una cuenta suya, y al guardar se reescriben solo los que cambiaron.
+    Mientras se guardan los archivos, el principal queda marcado como
+    "guardando": si el programa se corta en el medio, se recalcula todo.
+
+    TransaccionRepo llama a registrar() después de cada escritura (así se
+    actualiza con cada operación confirmada de BankService), pero lo guarda
+    en disco recién en el checkpoint (asegurar_en_disco) o al cerrar: en el
+    camino de escritura solo se actualiza la memoria. Con
+    `filas_por_guardado` se guarda además cada tantas filas nuevas. Si el CSV tiene
+    filas que esta instancia no vio (las escribió otro proceso, o el estado
+    guardado es viejo), se leen solo esas filas desde `cubierto`. Si otro
+    proceso guardó después que esta instancia, se toma lo que quedó en disco
+    antes de seguir. Si el CSV se achicó o se reemplazó, se recalcula todo
+    (reconstruir()).
+    """
+
+    def __init__(self, csv_path="data/transacciones.csv", ruta=None, directorio=None, filas_por_guardado=None):
+        self.csv_path = csv_path
+        self.filas_por_guardado = filas_por_guardado
+        self.ruta = ruta or os.path.splitext(csv_path)[0] + ".agregados.json"
+        self.directorio = directorio or os.path.splitext(csv_path)[0] + ".cuantiles"
+        os.makedirs(self.directorio, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._firma = ()          # del JSON principal que está en memoria (() = nunca se leyó)
+        self._por_archivo = {}    # índice → {cuenta_id: SketchCuantiles} (los ya leídos)
+        self._sucios = set()      # índices con cambios sin guardar
+        self._sin_guardar = 0
+        with self._bloqueado():
+            self._adoptar_disco()
+
+    @contextmanager
+    def _bloqueado(self):
+        # El bloqueo del JSON va siempre después del de la instancia
+        with self._lock, bloqueo_archivo(self.ruta):
+            yield
+
+    # -----------------------------
+    # ESTADO
+    # -----------------------------
+
+    def _estado_vacio(self, generacion=0):
+        for nombre in os.listdir(self.directorio):
+            if nombre.endswith(".json"):
+                os.remove(os.path.join(self.directorio, nombre))
+        with open(self.csv_path, "rb") as f:
+            f.readline()
+            inicio = f.tell()
+        return {
+            "generacion": generacion,
+            "guardando": False,
+            "cubierto": inicio,
+            "inodo": os.stat(self.csv_path).st_ino,
+            "cantidad": 0,
+            "media": 0.0,
+            "m2": 0.0,
+            "por_tipo": {},   # tipo → {"cantidad": n, "suma": s}
+            "cuantiles_global": SketchCuantiles().to_dict(),
+        }
+
+    def _firma_disco(self):
+        try:
+            st = os.stat(self.ruta)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _adoptar_disco(self):
+        """
+        Si el JSON cambió desde que esta instancia lo leyó o lo escribió
+        (otro proceso guardó), descarta lo que hay en memoria y toma el estado
+        de disco; las filas que falten se suman al sincronizar. Sin estado,
+        con el de una versión anterior o con un guardado cortado a la mitad,
+        se cuenta todo de nuevo.
+        """
+        firma = self._firma_disco()
+        if firma == self._firma:
+            return
+
+        estado = None
+        if firma is not None:
+            with open(self.ruta, "r", encoding="utf-8") as f:
+                estado = json.load(f)
+        if estado is None or "generacion" not in estado or estado["guardando"]:
+            estado = self._estado_vacio(estado.get("generacion", 0) if estado else 0)
+
+        self._estado = estado
+        self._global = SketchCuantiles.desde_dict(estado["cuantiles_global"])
+        self._por_archivo = {}
+        self._sucios = set()
+        self._sin_guardar = 0
+        self._firma = firma
+
+    def _ruta_archivo(self, indice):
+        return os.path.join(self.directorio, f"{indice:02d}.json")
+
+    def _archivo_de(self, cuenta_id):
+        """
+        (índice, sketches) del archivo donde va la cuenta.
+        """
+        indice = zlib.crc32(str(cuenta_id).encode("utf-8")) % ARCHIVOS_CUANTILES
+        return indice, self._archivo_de_indice(indice)
+
+    def _archivo_de_indice(self, indice):
+        """
+        {cuenta_id: SketchCuantiles} de un archivo; lo lee si hace falta.
+        """
+        sketches = self._por_archivo.get(indice)
+        if sketches is None:
+            sketches = {}
+            ruta = self._ruta_archivo(indice)
+            if os.path.exists(ruta):
+                with open(ruta, "r", encoding="utf-8") as f:
+                    sketches = {c: SketchCuantiles.desde_dict(d) for c, d in json.load(f).items()}
+            self._por_archivo[indice] = sketches
+        return sketches
+
+    def _escribir_json(self, ruta, datos):
+        tmp = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(datos, f)
+        os.replace(tmp, ruta)
+
+    def guardar(self):
+        """
+        Escribe en disco los sketches por cuenta que cambiaron y el estado
+        (archivo temporal + rename). Si otro proceso guardó después que esta
+        instancia, se parte de lo que quedó en disco y se le suman las filas
+        que falten, así lo guardado siempre corresponde a un mismo punto del CSV.
+        """
+        with self._bloqueado():
+            if self._firma_disco() != self._firma:
+                self._adoptar_disco()
+                self.sincronizar()
+
+            self._estado["guardando"] = True
+            self._escribir_json(self.ruta, self._estado)
+            for indice in sorted(self._sucios):
+                self._escribir_json(self._ruta_archivo(indice), {
+                    c: s.to_dict() for c, s in self._por_archivo[indice].items()
+                })
+            self._estado["guardando"] = False
+            self._estado["generacion"] += 1
+            self._estado["cuantiles_global"] = self._global.to_dict()
+            self._escribir_json(self.ruta, self._estado)
+
+            self._firma = self._firma_disco()
+            self._sucios = set()
+            self._sin_guardar = 0
+
+    def _sumar(self, fila):
+        tipo, monto = fila["tipo"], float(fila["monto"])
+        e = self._estado
+        e["cantidad"] += 1
+        delta = monto - e["media"]
+        e["media"] += delta / e["cantidad"]
+        e["m2"] += delta * (monto - e["media"])
+
+        por_tipo = e["por_tipo"].setdefault(tipo, {"cantidad": 0, "suma": 0.0})
+        por_tipo["cantidad"] += 1
+        por_tipo["suma"] += monto
+
+        indice, sketches = self._archivo_de(fila["cuenta_id"])
+        sketch = sketches.get(fila["cuenta_id"])
+        if sketch is None:
+            sketch = sketches[fila["cuenta_id"]] = SketchCuantiles()
+        sketch.agregar(monto)
+        self._global.agregar(monto)
+        self._sucios.add(indice)
+        self._sin_guardar += 1
+
+    # -----------------------------
+    # ACTUALIZACIÓN
+    # -----------------------------
+
+    def registrar(self, escritas):
+        """
+        Suma filas recién escritas. `escritas` es una lista de (fila, offset,
+        largo), la misma que reciben el índice y el almacén columnar.
+        """
+        with self._bloqueado():
+            if not escritas:
+                return
+            self._adoptar_disco()
+            if escritas[0][1] != self._estado["cubierto"]:
+                # Hay filas antes de estas que no se contaron: se leen del archivo
+                self.sincronizar()
+                return
+
+            for fila, offset, largo in escritas:
+                self._sumar(fila)
+                self._estado["cubierto"] = offset + largo
+
+            self._guardar_si_corresponde()
+
+    def sincronizar(self):
+        """
+        Cuenta las filas del CSV que todavía no están en el estado.
+        """
+        with self._bloqueado():
+            self._adoptar_disco()
+            st = os.stat(self.csv_path)
+            if st.st_size < self._estado["cubierto"] or st.st_ino != self._estado["inodo"]:
+                self.reconstruir()
+                return
+            if st.st_size == self._estado["cubierto"]:
+                return
+
+            with open(self.csv_path, "rb") as f:
+                encabezado = next(csv.reader([f.readline().decode("utf-8")]))
+                f.seek(self._estado["cubierto"])
+                for linea in f:
+                    if not linea.endswith(b"\n"):
+                        break   # fila a medio escribir por otro proceso
+                    texto = linea.decode("utf-8")
+                    if texto.strip():
+                        fila = dict(zip(encabezado, next(csv.reader([texto]))))
+                        self._sumar(fila)
+                    self._estado["cubierto"] += len(linea)
+
+            self._guardar_si_corresponde()
+
+    def _guardar_si_corresponde(self):
+        if self.filas_por_guardado is not None and self._sin_guardar >= self.filas_por_guardado:
+            self.guardar()
+
+    def reconstruir(self):
+        """
+        Vuelve a calcular todo desde el CSV.
+        """
+        with self._bloqueado():
+            # Mientras se recalcula, lo que está en disco queda marcado como
+            # "guardando" (ya no coincide con los sketches por cuenta)
+            self._estado["guardando"] = True
+            self._escribir_json(self.ruta, self._estado)
+            self._firma = self._firma_disco()
+
+            self._estado = self._estado_vacio(self._estado["generacion"])
+            self._global = SketchCuantiles()
+            self._por_archivo = {}
+            self._sucios = set()
+            self._sin_guardar = 0
+            self.sincronizar()
+            self.guardar()
+
+    # -----------------------------
+    # LECTURA
+    # -----------------------------
+
+    def estadisticas(self):
+        """
+        Mismo diccionario que Estadisticas.estadisticas_generales, más la
+        desviación estándar y los percentiles (aproximados) de los montos.
+        """
+        with self._bloqueado():
+            self.sincronizar()
+            e = self._estado
+            por_tipo = e["por_tipo"]
+
+            def cantidad(tipo):
+                return por_tipo.get(tipo, {}).get("cantidad", 0)
+
+            total = e["cantidad"]
+            monto_total = sum(t["suma"] for t in por_tipo.values())
+
+            return {
+                "total_transacciones": total,
+                "total_depositos": cantidad("deposito"),
+                "total_retiros": cantidad("retiro"),
+                "total_transferencias": cantidad("transferencia"),
+                "monto_total": monto_total,
+                "monto_promedio": monto_total / total if total > 0 else 0,
+                "desviacion_estandar": math.sqrt(e["m2"] / total) if total > 0 else 0.0,
+                "percentiles": self._global.percentiles(),
+            }
+
+    def cuantiles(self):
+        """
+        Copia de los sketches de cuantiles (global y por cuenta), al día con
+        el CSV. Lee todos los archivos de sketches por cuenta.
+        """
+        with self._bloqueado():
+            self.sincronizar()
+            sketches = SketchesPorCuenta(self._global.k)
+            sketches.global_ = SketchCuantiles.desde_dict(self._global.to_dict())
+            for indice in range(ARCHIVOS_CUANTILES):
+                for cuenta_id, sketch in self._archivo_de_indice(indice).items():
+                    sketches.por_cuenta[cuenta_id] = SketchCuantiles.desde_dict(sketch.to_dict())
+            return sketches
+
+
+if __name__ == "__main__":
+    agregados = AgregadosGlobales()
+    agregados.reconstruir()
+    print(f"Agregados recalculados en {agregados.ruta}:")
+    for clave, valor in agregados.estadisticas().items():
+        print(f"  - {clave}: {valor}")
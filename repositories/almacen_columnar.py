@@ -0,0 +1,218 @@
+import csv
+import json
+import os
+import threading
+from contextlib import contextmanager
+import numpy as np
+from analytics.columnas import Columnas, fechas_a_ts
+from repositories.bloqueos import bloqueo_archivo
+from repositories.transaccion_repo import TransaccionRepo
+
+# nombre de columna → dtype en disco (ancho fijo, little-endian)
+COLUMNAS = {
+    "monto": "<f8",
+    "ts": "<i8",
+    "cuenta": "<i4",
+    "tipo": "<i1",
+    "offset": "<i8",
+}
+
+
+class AlmacenColumnar:
+    """
+    Copia columnar y binaria de transacciones.csv para análisis.
+
+    En la carpeta data/transacciones.columnas/ hay un archivo por columna
+    (monto.f8, ts.i8, ...) con valores de ancho fijo, más un meta.json con la
+    cantidad de filas, los diccionarios de cuentas y tipos y hasta qué byte
+    del CSV ya se copió.
+
+    El CSV sigue siendo la fuente de verdad. sincronizar() agrega al almacén
+    solo las filas nuevas del CSV (la cola del archivo); columnas() devuelve
+    los arreglos abiertos con np.memmap, sin copiarlos a memoria.
+
+    Varios procesos pueden sincronizar el mismo almacén: todo se hace con el
+    bloqueo de meta.json tomado, y si otro proceso lo reescribió desde la
+    última vez, se vuelve a leer antes de seguir.
+    """
+
+    def __init__(self, csv_path="data/transacciones.csv", directorio=None):
+        self.csv_path = csv_path
+        self.directorio = directorio or os.path.splitext(csv_path)[0] + ".columnas"
+        self.meta_path = os.path.join(self.directorio, "meta.json")
+        self._lock = threading.RLock()
+
+        os.makedirs(self.directorio, exist_ok=True)
+        # La firma se toma antes de leer: si meta.json cambia en el medio, se relee
+        self._firma = self._firma_meta()
+        self._meta = self._cargar_meta()
+
+    @contextmanager
+    def _bloqueado(self):
+        # El bloqueo de meta.json va siempre después del de la instancia
+        with self._lock, bloqueo_archivo(self.meta_path):
+            firma = self._firma_meta()
+            if firma != self._firma:
+                self._meta = self._cargar_meta()
+                self._firma = firma
+            yield
+
+    # -----------------------------
+    # META
+    # -----------------------------
+
+    def _meta_vacia(self):
+        with open(self.csv_path, "rb") as f:
+            f.readline()
+            inicio = f.tell()
+        return {"filas": 0, "cubierto": inicio, "cuentas": [], "tipos": []}
+
+    def _firma_meta(self):
+        try:
+            st = os.stat(self.meta_path)
+        except FileNotFoundError:
+            return ()
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _cargar_meta(self):
+        if not os.path.exists(self.meta_path):
+            return self._meta_vacia()
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _guardar_meta(self):
+        tmp = f"{self.meta_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._meta, f)
+        os.replace(tmp, self.meta_path)
+        self._firma = self._firma_meta()
+
+    def _ruta(self, columna):
+        return os.path.join(self.directorio, f"{columna}.{COLUMNAS[columna][1:]}")
+
+    # -----------------------------
+    # SINCRONIZACIÓN
+    # -----------------------------
+
+    def _leer_cola(self, desde):
+        """
+        Lee las filas completas del CSV a partir del byte `desde`.
+        Devuelve (filas, offsets, fin).
+        """
+        filas, offsets = [], []
+        with open(self.csv_path, "rb") as f:
+            encabezado = next(csv.reader([f.readline().decode("utf-8")]))
+            f.seek(desde)
+            offset = desde
+            for linea in f:
+                if not linea.endswith(b"\n"):
+                    break
+                texto = linea.decode("utf-8")
+                if texto.strip():
+                    filas.append(dict(zip(encabezado, next(csv.reader([texto])))))
+                    offsets.append(offset)
+                offset += len(linea)
+        return filas, offsets, offset
+
+    @staticmethod
+    def _codificar(valores, diccionario):
+        posiciones = {v: i for i, v in enumerate(diccionario)}
+        codigos = []
+        for v in valores:
+            if v not in posiciones:
+                posiciones[v] = len(diccionario)
+                diccionario.append(v)
+            codigos.append(posiciones[v])
+        return codigos
+
+    def sincronizar(self):
+        """
+        Copia al almacén las filas agregadas al CSV desde la última vez.
+        Si el CSV se achicó (fue reescrito), se reconstruye todo.
+        """
+        with self._bloqueado():
+            tamano = os.path.getsize(self.csv_path)
+            if tamano < self._meta["cubierto"]:
+                self.reconstruir()
+                return
+            if tamano == self._meta["cubierto"]:
+                return
+
+            filas, offsets, fin = self._leer_cola(self._meta["cubierto"])
+            n = self._meta["filas"]
+
+            nuevos = {
+                "monto": np.array([float(f["monto"]) for f in filas], dtype=COLUMNAS["monto"]),
+                "ts": fechas_a_ts([f["fecha"] for f in filas]).astype(COLUMNAS["ts"]),
+                "cuenta": np.array(self._codificar([f["cuenta_id"] for f in filas], self._meta["cuentas"]), dtype=COLUMNAS["cuenta"]),
+                "tipo": np.array(self._codificar([f["tipo"] for f in filas], self._meta["tipos"]), dtype=COLUMNAS["tipo"]),
+                "offset": np.array(offsets, dtype=COLUMNAS["offset"]),
+            }
+
+            for columna, valores in nuevos.items():
+                with open(self._ruta(columna), "ab") as f:
+                    # Si un corte dejó bytes de más después de la última fila válida, se descartan
+                    f.truncate(n * np.dtype(COLUMNAS[columna]).itemsize)
+                    valores.tofile(f)
+
+            self._meta["filas"] = n + len(filas)
+            self._meta["cubierto"] = fin
+            self._guardar_meta()
+
+    def reconstruir(self):
+        """
+        Borra el almacén y lo vuelve a generar desde el CSV.
+        """
+        with self._bloqueado():
+            for columna in COLUMNAS:
+                if os.path.exists(self._ruta(columna)):
+                    os.remove(self._ruta(columna))
+            self._meta = self._meta_vacia()
+            self.sincronizar()
+
+    # -----------------------------
+    # LECTURA
+    # -----------------------------
+
+    def columnas(self):
+        """
+        Devuelve un Columnas cuyos arreglos son np.memmap de solo lectura.
+        """
+        with self._bloqueado():
+            self.sincronizar()
+            n = self._meta["filas"]
+            arreglos = {}
+            for columna, dtype in COLUMNAS.items():
+                if n == 0:
+                    arreglos[columna] = np.empty(0, dtype=dtype)
+                else:
+                    arreglos[columna] = np.memmap(self._ruta(columna), dtype=dtype, mode="r", shape=(n,))
+
+            return Columnas(
+                monto=arreglos["monto"],
+                ts=arreglos["ts"],
+                cuenta=arreglos["cuenta"],
+                tipo=arreglos["tipo"],
+                cuentas=self._meta["cuentas"],
+                tipos=self._meta["tipos"],
+                offset=arreglos["offset"],
+            )
+
+    def filas(self, indices):
+        """
+        Recupera del CSV, como diccionarios de transacción, las filas en las
+        posiciones dadas (por ejemplo, las que marcó un filtro sobre las columnas).
+        """
+        cols = self.columnas()
+        with open(self.csv_path, "rb") as f:
+            encabezado = next(csv.reader([f.readline().decode("utf-8")]))
+            for i in indices:
+                f.seek(int(cols.offset[i]))
+                valores = next(csv.reader([f.readline().decode("utf-8")]))
+                yield TransaccionRepo._a_dict(dict(zip(encabezado, valores)))
+
+
+if __name__ == "__main__":
+    almacen = AlmacenColumnar()
+    almacen.reconstruir()
+    print(f"Almacén columnar reconstruido en {almacen.directorio}: {almacen._meta['filas']} filas")
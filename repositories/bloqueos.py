@@ -0,0 +1,212 @@
+import errno
+import os
+import random
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:  # POSIX
+    msvcrt = None
+
+# Cada cuánto se reintenta un bloqueo que el SO no dio (ver _bloquear_rango)
+ESPERA_REINTENTO = 0.01
+
+# Espera máxima entre reintentos por EDEADLK (la espera se duplica hasta acá)
+ESPERA_MAXIMA_REINTENTO = 0.5
+
+# Cuánto se reintenta un EDEADLK antes de darlo por un deadlock real (segundos)
+LIMITE_DEADLOCK = 30.0
+
+
+# ============================================================
+# PRIMITIVAS DEL SISTEMA OPERATIVO
+# ============================================================
+
+# msvcrt bloquea desde la posición actual del archivo: el seek y el bloqueo
+# tienen que ir juntos aunque varios hilos compartan el descriptor.
+_lock_msvcrt = threading.Lock()
+
+
+def _bloquear_rango(fd, inicio):
+    """
+    Bloqueo exclusivo del byte `inicio` del archivo, entre procesos.
+    Espera hasta conseguirlo. Sin fcntl ni msvcrt no hace nada.
+
+    Con fcntl, si el SO sigue informando un deadlock después de
+    LIMITE_DEADLOCK segundos de reintentos, lanza OSError(EDEADLK): quien
+    llama suelta lo que tiene tomado (BloqueoCuentas.bloquear lo hace) en
+    vez de quedar reintentando para siempre.
+    """
+    if fcntl is not None:
+        espera = ESPERA_REINTENTO
+        limite = None
+        while True:
+            try:
+                fcntl.lockf(fd, fcntl.LOCK_EX, 1, inicio)
+                return
+            except OSError as e:
+                # El kernel ve a cada proceso como un único dueño de sus bloqueos,
+                # así que con varios hilos informa deadlocks que no existen (los
+                # bloqueos siempre se toman en el mismo orden): se reintenta,
+                # cada vez esperando más. Uno que no se resuelve es real.
+                if e.errno != errno.EDEADLK:
+                    raise
+                if limite is None:
+                    limite = time.monotonic() + LIMITE_DEADLOCK
+                elif time.monotonic() > limite:
+                    raise OSError(
+                        errno.EDEADLK,
+                        f"Deadlock al bloquear el byte {inicio}: sin resolver después de {LIMITE_DEADLOCK} s"
+                    ) from e
+            time.sleep(random.uniform(espera / 2, espera))
+            espera = min(espera * 2, ESPERA_MAXIMA_REINTENTO)
+    elif msvcrt is not None:
+        # msvcrt no tiene una espera bloqueante sin límite: se reintenta
+        while True:
+            with _lock_msvcrt:
+                os.lseek(fd, inicio, os.SEEK_SET)
+                try:
+                    msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                    return
+                except OSError:
+                    pass
+            time.sleep(ESPERA_REINTENTO)
+
+
+def _liberar_rango(fd, inicio):
+    if fcntl is not None:
+        fcntl.lockf(fd, fcntl.LOCK_UN, 1, inicio)
+    elif msvcrt is not None:
+        with _lock_msvcrt:
+            os.lseek(fd, inicio, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class _Bloqueo:
+    """
+    Bloqueo reentrante que excluye a otros hilos (RLock) y a otros procesos
+    (bloqueo del SO sobre un byte de un archivo .lock).
+
+    Los bloqueos de fcntl son por proceso: el del SO se toma solo cuando el
+    hilo entra por primera vez y se suelta cuando sale del todo.
+    """
+
+    def __init__(self, fd, inicio):
+        self._fd = fd
+        self._inicio = inicio
+        self._rlock = threading.RLock()
+        self._profundidad = 0
+
+    def adquirir(self):
+        self._rlock.acquire()
+        if self._profundidad == 0:
+            try:
+                _bloquear_rango(self._fd, self._inicio)
+            except BaseException:
+                self._rlock.release()
+                raise
+        self._profundidad += 1
+
+    def liberar(self):
+        self._profundidad -= 1
+        if self._profundidad == 0:
+            _liberar_rango(self._fd, self._inicio)
+        self._rlock.release()
+
+    def __enter__(self):
+        self.adquirir()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.liberar()
+        return False
+
+
+# Los bloqueos de fcntl son por proceso y por archivo (no por descriptor):
+# cada (archivo .lock, byte) tiene un único _Bloqueo en todo el proceso.
+_descriptores = {}
+_bloqueos = {}
+_lock_registro = threading.Lock()
+
+
+def _bloqueo_compartido(ruta, inicio):
+    ruta = os.path.abspath(ruta)
+    with _lock_registro:
+        bloqueo = _bloqueos.get((ruta, inicio))
+        if bloqueo is None:
+            fd = _descriptores.get(ruta)
+            if fd is None:
+                os.makedirs(os.path.dirname(ruta), exist_ok=True)
+                fd = os.open(ruta, os.O_RDWR | os.O_CREAT, 0o644)
+                _descriptores[ruta] = fd
+            bloqueo = _Bloqueo(fd, inicio)
+            _bloqueos[(ruta, inicio)] = bloqueo
+        return bloqueo
+
+
+# ============================================================
+# BLOQUEO DE ARCHIVOS
+# ============================================================
+
+def bloqueo_archivo(ruta):
+    """
+    Bloqueo exclusivo asociado a un archivo de datos (usa `<ruta>.lock`).
+
+    Los repositorios lo toman alrededor de cada lectura-modificación-escritura
+    del archivo, así dos procesos no se pisan los cambios. Es reentrante para
+    el mismo hilo. Uso:
+
+        with bloqueo_archivo("data/cuentas.csv"):
+            ...
+    """
+    return _bloqueo_compartido(ruta + ".lock", 0)
+
+
+# ============================================================
+# BLOQUEO POR CUENTA
+# ============================================================
+
+class BloqueoCuentas:
+    """
+    Un bloqueo por cuenta, válido entre hilos y entre procesos.
+
+    Cada número de cuenta cae (por crc32) en una de `ranuras` posiciones de un
+    único archivo .lock; bloquear la cuenta es bloquear ese byte. Dos cuentas
+    pueden compartir ranura: eso solo las serializa, nunca deja pasar a dos
+    operaciones sobre la misma cuenta.
+
+    bloquear() con varias cuentas toma las ranuras siempre en orden
+    ascendente, así dos transferencias cruzadas (A→B y B→A) no se bloquean
+    mutuamente. Todas las instancias con la misma ruta comparten los bloqueos.
+    """
+
+    def __init__(self, ruta="data/bloqueos_cuentas.lock", ranuras=4096):
+        self.ruta = ruta
+        self.ranuras = ranuras
+
+    def _ranura(self, numero):
+        return zlib.crc32(str(numero).encode("utf-8")) % self.ranuras
+
+    @contextmanager
+    def bloquear(self, *numeros):
+        """
+        Bloquea las cuentas dadas mientras dura el bloque `with`.
+        """
+        tomados = []
+        try:
+            for ranura in sorted({self._ranura(n) for n in numeros}):
+                bloqueo = _bloqueo_compartido(self.ruta, ranura)
+                bloqueo.adquirir()
+                tomados.append(bloqueo)
+            yield
+        finally:
+            for bloqueo in reversed(tomados):
+                bloqueo.liberar()
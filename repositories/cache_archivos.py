@@ -0,0 +1,117 @@
+import os
+import threading
+from collections import OrderedDict
+
+# Los objetos Python ocupan bastante más que el texto del CSV; el peso de cada
+# entrada se estima como tamaño_en_disco * FACTOR_MEMORIA.
+FACTOR_MEMORIA = 8
+
+
+class CacheArchivos:
+    """
+    Cache de archivos ya parseados, compartido por todo el proceso.
+
+    Cada entrada se identifica por (ruta, clave del parser) y guarda la firma
+    del archivo al momento de leerlo: (mtime, tamaño, inodo). Si la firma
+    cambió, la entrada se descarta y se vuelve a parsear.
+
+    La memoria total se limita con `presupuesto_bytes`: al pasarse, se
+    descartan las entradas usadas hace más tiempo (LRU). Los archivos que por
+    sí solos superan `max_bytes_entrada` no se cachean (obtener() devuelve None
+    y el llamador los lee en streaming).
+
+    Lo que devuelve el cache se comparte entre llamadas: no hay que modificarlo.
+    """
+
+    def __init__(self, presupuesto_bytes=256 * 1024 * 1024, max_bytes_entrada=None):
+        self.presupuesto_bytes = presupuesto_bytes
+        self.max_bytes_entrada = max_bytes_entrada
+        self._entradas = OrderedDict()   # clave → (firma, peso, valor)
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    @staticmethod
+    def _firma(ruta):
+        st = os.stat(ruta)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _limite_entrada(self):
+        if self.max_bytes_entrada is not None:
+            return self.max_bytes_entrada
+        return self.presupuesto_bytes // 4
+
+    def obtener(self, ruta, parser, clave=None):
+        """
+        Devuelve parser(ruta), reutilizando el resultado si el archivo no cambió.
+        Devuelve None si el archivo es demasiado grande para cachearse.
+        """
+        firma = self._firma(ruta)
+        peso = firma[1] * FACTOR_MEMORIA
+        if peso > self._limite_entrada():
+            return None
+
+        llave = (os.path.abspath(ruta), clave or getattr(parser, "__qualname__", repr(parser)))
+
+        with self._lock:
+            entrada = self._entradas.get(llave)
+            if entrada is not None and entrada[0] == firma:
+                self._entradas.move_to_end(llave)
+                self.aciertos += 1
+                return entrada[2]
+            self.fallos += 1
+
+        valor = parser(ruta)
+
+        with self._lock:
+            anterior = self._entradas.pop(llave, None)
+            if anterior is not None:
+                self._bytes -= anterior[1]
+            self._entradas[llave] = (firma, peso, valor)
+            self._bytes += peso
+            self._recortar()
+
+        return valor
+
+    def leer(self, ruta, parser, clave=None):
+        """
+        Igual que obtener(), pero si el archivo no entra en el cache lo parsea igual.
+        """
+        valor = self.obtener(ruta, parser, clave)
+        return valor if valor is not None else parser(ruta)
+
+    def _recortar(self):
+        while self._bytes > self.presupuesto_bytes and self._entradas:
+            _, (_, peso, _) = self._entradas.popitem(last=False)
+            self._bytes -= peso
+
+    def invalidar(self, ruta=None):
+        """
+        Descarta las entradas de un archivo (o todas si ruta es None).
+        Los repositorios la llaman después de escribir, porque dos escrituras
+        en el mismo instante pueden dejar la misma fecha de modificación.
+        """
+        with self._lock:
+            if ruta is None:
+                self._entradas.clear()
+                self._bytes = 0
+                return
+            ruta = os.path.abspath(ruta)
+            for llave in [k for k in self._entradas if k[0] == ruta]:
+                self._bytes -= self._entradas.pop(llave)[1]
+
+    def estadisticas(self):
+        with self._lock:
+            total = self.aciertos + self.fallos
+            return {
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": self.aciertos / total if total else 0.0,
+                "entradas": len(self._entradas),
+                "bytes_estimados": self._bytes,
+            }
+
+
+# Instancia única que usan todos los repositorios y módulos de análisis
+cache_global = CacheArchivos()
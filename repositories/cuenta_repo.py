@@ -1,11 +1,19 @@
 import csv
 import os
+import threading
 from domain.cuenta import Cuenta
+from domain.compacto import CuentaCompacta, a_unidades
+from repositories.cache_archivos import cache_global
+from repositories.bloqueos import bloqueo_archivo
+from repositories.registro_redo import fsync_ruta
 
 
 class CuentaRepo:
     """
     Repositorio encargado de manejar la persistencia de cuentas bancarias.
+
+    Toda lectura y escritura de cuentas.csv se hace con bloqueo_archivo tomado,
+    así varios procesos pueden compartir el archivo sin perder cambios.
     """
 
     def __init__(self, filepath="data/cuentas.csv"):
@@ -25,52 +33,98 @@ class CuentaRepo:
                 )
                 writer.writeheader()
 
-    def cargar_todas(self):
+    @staticmethod
+    def _parsear(ruta):
         """
-        Carga todas las cuentas desde el CSV y las convierte en objetos Cuenta.
+        Lee el CSV y devuelve las filas ya convertidas a sus tipos, como tuplas.
+        El resultado queda en el cache compartido, por eso no son objetos Cuenta.
         """
-        cuentas = []
-        with open(self.filepath, "r", newline="", encoding="utf-8") as f:
+        filas = []
+        with open(ruta, "r", newline="", encoding="utf-8") as f:
             reader = csv.DictReader(f)
             for row in reader:
+                filas.append((
+                    row["numero"],
+                    row["cliente_id"],
+                    row["tipo"],
+                    float(row["saldo"]),
+                    row["activa"] == "True"  # CSV guarda booleanos como texto
+                ))
+        return filas
 
-                # Convertimos los tipos correctamente
-                cuenta = Cuenta(
-                    numero=row["numero"],
-                    cliente_id=row["cliente_id"],
-                    tipo=row["tipo"],
-                    saldo_inicial=float(row["saldo"]),
-                    activa=row["activa"] == "True"  # CSV guarda booleanos como texto
-                )
+    def cargar_todas(self):
+        """
+        Carga todas las cuentas desde el CSV y las convierte en objetos Cuenta.
+        El parseo se reutiliza mientras el archivo no cambie; los objetos
+        Cuenta son siempre nuevos, porque los servicios los modifican.
+        """
+        with bloqueo_archivo(self.filepath):
+            filas = cache_global.leer(self.filepath, self._parsear)
 
-                cuentas.append(cuenta)
+        cuentas = []
+        for numero, cliente_id, tipo, saldo, activa in filas:
+            cuentas.append(Cuenta(
+                numero=numero,
+                cliente_id=cliente_id,
+                tipo=tipo,
+                saldo_inicial=saldo,
+                activa=activa
+            ))
 
         return cuentas
 
+    def cargar_compactas(self):
+        """
+        Igual que cargar_todas, pero devuelve CuentaCompacta (saldo en
+        millonésimas, con __slots__): ocupa varias veces menos memoria.
+        """
+        with bloqueo_archivo(self.filepath):
+            filas = cache_global.leer(self.filepath, self._parsear)
+
+        return [
+            CuentaCompacta(numero, cliente_id, tipo, a_unidades(saldo), activa)
+            for numero, cliente_id, tipo, saldo, activa in filas
+        ]
+
     def guardar_todas(self, cuentas):
         """
         Sobrescribe el archivo CSV con todas las cuentas.
+        Se escribe un archivo temporal y se renombra encima del original: si el
+        proceso se cae a mitad de camino, cuentas.csv queda como estaba. El
+        temporal y el directorio se bajan a disco, así después de una caída
+        del sistema el archivo renombrado nunca queda vacío o incompleto.
         """
-        with open(self.filepath, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(
-                f,
-                fieldnames=["numero", "cliente_id", "tipo", "saldo", "activa"]
-            )
-            writer.writeheader()
+        with bloqueo_archivo(self.filepath):
+            tmp = f"{self.filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(
+                    f,
+                    fieldnames=["numero", "cliente_id", "tipo", "saldo", "activa"]
+                )
+                writer.writeheader()
+
+                for c in cuentas:
+                    writer.writerow(c.to_dict())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.filepath)
+            fsync_ruta(os.path.dirname(self.filepath) or ".")
 
-            for c in cuentas:
-                writer.writerow(c.to_dict())
+            cache_global.invalidar(self.filepath)
 
     def agregar(self, cuenta):
         """
         Agrega una cuenta nueva al CSV.
         """
-        with open(self.filepath, "a", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(
-                f,
-                fieldnames=["numero", "cliente_id", "tipo", "saldo", "activa"]
-            )
-            writer.writerow(cuenta.to_dict())
+        with bloqueo_archivo(self.filepath):
+            with open(self.filepath, "a", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(
+                    f,
+                    fieldnames=["numero", "cliente_id", "tipo", "saldo", "activa"]
+                )
+                writer.writerow(cuenta.to_dict())
+
+            cache_global.invalidar(self.filepath)
 
     def obtener_por_numero(self, numero):
         """
@@ -81,15 +135,54 @@ class CuentaRepo:
                 return c
         return None
 
+    def obtener_varias(self, numeros):
+        """
+        Busca varias cuentas con una sola lectura del archivo.
+        Devuelve un diccionario número → Cuenta (las que no existen no aparecen).
+        """
+        numeros = set(numeros)
+        encontradas = {}
+        for c in self.cargar_todas():
+            if c.numero in numeros:
+                encontradas.setdefault(c.numero, c)
+        return encontradas
+
+    def obtener_por_cliente(self, cliente_id):
+        """
+        Devuelve todas las cuentas que pertenecen a un cliente.
+        """
+        return [c for c in self.cargar_todas() if c.cliente_id == cliente_id]
+
     def actualizar(self, cuenta_actualizada):
         """
         Reemplaza una cuenta existente por su versión actualizada.
         """
-        cuentas = self.cargar_todas()
+        with bloqueo_archivo(self.filepath):
+            cuentas = self.cargar_todas()
+
+            for i, c in enumerate(cuentas):
+                if c.numero == cuenta_actualizada.numero:
+                    cuentas[i] = cuenta_actualizada
+                    break
 
-        for i, c in enumerate(cuentas):
-            if c.numero == cuenta_actualizada.numero:
-                cuentas[i] = cuenta_actualizada
-                break
+            self.guardar_todas(cuentas)
 
-        self.guardar_todas(cuentas)
+    def actualizar_varias(self, cuentas_actualizadas):
+        """
+        Igual que actualizar, pero para varias cuentas con una sola reescritura.
+        """
+        nuevas = {c.numero: c for c in cuentas_actualizadas}
+        if not nuevas:
+            return
+
+        with bloqueo_archivo(self.filepath):
+            cuentas = [nuevas.get(c.numero, c) for c in self.cargar_todas()]
+            self.guardar_todas(cuentas)
+
+    def asegurar_en_disco(self):
+        """
+        fsync del archivo y de su carpeta (para que el último rename sea durable).
+        """
+        with bloqueo_archivo(self.filepath):
+            fsync_ruta(self.filepath)
+            fsync_ruta(os.path.dirname(self.filepath) or ".")
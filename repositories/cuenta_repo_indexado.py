@@ -0,0 +1,138 @@
+import os
+from domain.cuenta import Cuenta
+from repositories.cuenta_repo import CuentaRepo
+from repositories.bloqueos import bloqueo_archivo
+
+
+class CuentaRepoIndexado(CuentaRepo):
+    """
+    Variante de CuentaRepo que carga el CSV una sola vez en memoria y mantiene
+    dos índices:
+    - por número de cuenta → Cuenta
+    - por cliente_id → lista de números de cuenta
+
+    Las búsquedas son O(1). El archivo solo se vuelve a leer cuando cambia
+    en disco (por ejemplo, si otro proceso lo modificó).
+
+    Los índices se consultan y modifican con bloqueo_archivo tomado, que
+    también excluye a los otros hilos del proceso.
+    """
+
+    def __init__(self, filepath="data/cuentas.csv"):
+        super().__init__(filepath)
+        self._por_numero = {}
+        self._por_cliente = {}
+        self._firma = None
+
+    # -----------------------------
+    # SINCRONIZACIÓN CON EL DISCO
+    # -----------------------------
+
+    def _firma_actual(self):
+        """
+        Identifica la versión del archivo en disco (fecha de modificación y tamaño).
+        """
+        st = os.stat(self.filepath)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _leer_cuentas(self):
+        """
+        Lee las cuentas desde disco, sin pasar por los índices.
+        """
+        return super().cargar_todas()
+
+    def _recargar(self):
+        """
+        Reconstruye los índices a partir del archivo.
+        """
+        self._por_numero = {}
+        self._por_cliente = {}
+        for c in self._leer_cuentas():
+            self._indexar(c)
+        self._firma = self._firma_actual()
+
+    def _sincronizar(self):
+        """
+        Recarga los índices solo si el archivo cambió desde la última lectura.
+        """
+        if self._firma != self._firma_actual():
+            self._recargar()
+
+    def _indexar(self, cuenta):
+        if cuenta.numero not in self._por_numero:
+            self._por_cliente.setdefault(cuenta.cliente_id, []).append(cuenta.numero)
+        self._por_numero[cuenta.numero] = cuenta
+
+    @staticmethod
+    def _copiar(cuenta):
+        """
+        Devuelve una copia de la cuenta. Los servicios modifican los objetos
+        antes de persistirlos, así que nunca entregamos los del índice.
+        """
+        return Cuenta(cuenta.numero, cuenta.cliente_id, cuenta.tipo, cuenta.saldo, cuenta.activa)
+
+    # -----------------------------
+    # LECTURA
+    # -----------------------------
+
+    def cargar_todas(self):
+        with bloqueo_archivo(self.filepath):
+            self._sincronizar()
+            return [self._copiar(c) for c in self._por_numero.values()]
+
+    def obtener_por_numero(self, numero):
+        with bloqueo_archivo(self.filepath):
+            self._sincronizar()
+            cuenta = self._por_numero.get(numero)
+            return self._copiar(cuenta) if cuenta else None
+
+    def obtener_varias(self, numeros):
+        with bloqueo_archivo(self.filepath):
+            self._sincronizar()
+            return {n: self._copiar(self._por_numero[n]) for n in set(numeros) if n in self._por_numero}
+
+    def obtener_por_cliente(self, cliente_id):
+        with bloqueo_archivo(self.filepath):
+            self._sincronizar()
+            return [self._copiar(self._por_numero[n]) for n in self._por_cliente.get(cliente_id, [])]
+
+    # -----------------------------
+    # ESCRITURA
+    # -----------------------------
+
+    def guardar_todas(self, cuentas):
+        with bloqueo_archivo(self.filepath):
+            super().guardar_todas(cuentas)
+            self._recargar()
+
+    def agregar(self, cuenta):
+        with bloqueo_archivo(self.filepath):
+            self._sincronizar()
+            super().agregar(cuenta)
+            self._indexar(self._copiar(cuenta))
+            self._firma = self._firma_actual()
+
+    def actualizar(self, cuenta_actualizada):
+        with bloqueo_archivo(self.filepath):
+            # Se sincroniza con el bloqueo tomado: si otro proceso cambió el
+            # archivo, sus cambios entran en la reescritura en vez de perderse.
+            self._sincronizar()
+            if cuenta_actualizada.numero not in self._por_numero:
+                return
+
+            self._por_numero[cuenta_actualizada.numero] = self._copiar(cuenta_actualizada)
+            CuentaRepo.guardar_todas(self, self._por_numero.values())
+            self._firma = self._firma_actual()
+
+    def actualizar_varias(self, cuentas_actualizadas):
+        cuentas_actualizadas = list(cuentas_actualizadas)
+        if not cuentas_actualizadas:
+            return
+
+        with bloqueo_archivo(self.filepath):
+            self._sincronizar()
+            for c in cuentas_actualizadas:
+                if c.numero in self._por_numero:
+                    self._por_numero[c.numero] = self._copiar(c)
+            CuentaRepo.guardar_todas(self, self._por_numero.values())
+            self._firma = self._firma_actual()
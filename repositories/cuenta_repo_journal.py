@@ -0,0 +1,267 @@
+import csv
+import os
+import threading
+from domain.cuenta import Cuenta
+from repositories.cuenta_repo_indexado import CuentaRepoIndexado
+from repositories.cache_archivos import cache_global
+from repositories.bloqueos import bloqueo_archivo
+from repositories.registro_redo import fsync_ruta
+
+CAMPOS = ["numero", "cliente_id", "tipo", "saldo", "activa"]
+
+
+class CuentaRepoJournal(CuentaRepoIndexado):
+    """
+    Variante de CuentaRepoIndexado que no reescribe cuentas.csv en cada cambio.
+
+    - cuentas.csv funciona como snapshot.
+    - Cada alta o cambio de saldo/estado se agrega como una fila al final de
+      cuentas.journal.csv (costo constante, sin importar cuántas cuentas haya).
+    - El estado actual = snapshot + journal reproducido en orden.
+    - Cuando el journal supera `umbral_compactacion` filas se compacta: se genera
+      un snapshot nuevo y el journal vuelve a quedar vacío.
+
+    Durante la compactación el journal se renombra a cuentas.journal.compactando.csv
+    para que las escrituras nuevas sigan entrando a un journal limpio. Si el
+    proceso se cae a mitad de camino, ese archivo se reproduce al cargar.
+
+    Entre procesos: las lecturas y las filas del journal usan el bloqueo de
+    cuentas.csv; la compactación y guardar_todas además toman el bloqueo del
+    journal en compactación, para que haya una sola a la vez.
+    Orden de bloqueos: compactación → self._lock → cuentas.csv.
+    """
+
+    def __init__(self, filepath="data/cuentas.csv", umbral_compactacion=1000, compactar_en_segundo_plano=True):
+        base = os.path.splitext(filepath)[0]
+        self.journal_path = base + ".journal.csv"
+        self.compactando_path = base + ".journal.compactando.csv"
+        self.umbral_compactacion = umbral_compactacion
+        self.compactar_en_segundo_plano = compactar_en_segundo_plano
+
+        self._lock = threading.RLock()
+        self._hilo_compactacion = None
+        self._compactando = False
+        self._filas_journal = 0
+
+        super().__init__(filepath)
+        self._asegurar_journal(self.journal_path)
+
+    @staticmethod
+    def _asegurar_journal(ruta):
+        if not os.path.exists(ruta):
+            with open(ruta, "w", newline="", encoding="utf-8") as f:
+                csv.DictWriter(f, fieldnames=CAMPOS).writeheader()
+
+    # -----------------------------
+    # LECTURA Y REPRODUCCIÓN
+    # -----------------------------
+
+    def _firma_actual(self):
+        firma = []
+        for ruta in (self.filepath, self.journal_path, self.compactando_path):
+            try:
+                st = os.stat(ruta)
+                firma.append((st.st_mtime_ns, st.st_size, st.st_ino))
+            except FileNotFoundError:
+                firma.append(None)
+        return tuple(firma)
+
+    @staticmethod
+    def _parsear_filas(ruta):
+        with open(ruta, "r", newline="", encoding="utf-8") as f:
+            return list(csv.DictReader(f))
+
+    def _leer_filas(self, ruta):
+        if not os.path.exists(ruta):
+            return []
+        return cache_global.leer(ruta, self._parsear_filas)
+
+    def _leer_cuentas(self):
+        """
+        Snapshot + journal en compactación (si quedó uno) + journal actual.
+        Cada fila del journal trae el estado completo de la cuenta, así que
+        reproducirla dos veces no cambia el resultado.
+        """
+        cuentas = {c.numero: c for c in super()._leer_cuentas()}
+
+        filas = self._leer_filas(self.journal_path)
+        self._filas_journal = len(filas)
+
+        for row in self._leer_filas(self.compactando_path) + filas:
+            cuentas[row["numero"]] = Cuenta(
+                numero=row["numero"],
+                cliente_id=row["cliente_id"],
+                tipo=row["tipo"],
+                saldo_inicial=float(row["saldo"]),
+                activa=row["activa"] == "True"
+            )
+
+        return list(cuentas.values())
+
+    def cargar_todas(self):
+        with self._lock:
+            return super().cargar_todas()
+
+    def obtener_por_numero(self, numero):
+        with self._lock:
+            return super().obtener_por_numero(numero)
+
+    def obtener_varias(self, numeros):
+        with self._lock:
+            return super().obtener_varias(numeros)
+
+    def obtener_por_cliente(self, cliente_id):
+        with self._lock:
+            return super().obtener_por_cliente(cliente_id)
+
+    # -----------------------------
+    # ESCRITURA
+    # -----------------------------
+
+    def _anotar(self, *cuentas):
+        """
+        Agrega al journal una fila por cuenta con su estado actual.
+        """
+        with open(self.journal_path, "a", newline="", encoding="utf-8") as f:
+            csv.DictWriter(f, fieldnames=CAMPOS).writerows(c.to_dict() for c in cuentas)
+        self._filas_journal += len(cuentas)
+        cache_global.invalidar(self.journal_path)
+
+    def agregar(self, cuenta):
+        with self._lock, bloqueo_archivo(self.filepath):
+            self._sincronizar()
+            self._anotar(cuenta)
+            self._indexar(self._copiar(cuenta))
+            self._firma = self._firma_actual()
+        self._revisar_umbral()
+
+    def actualizar(self, cuenta_actualizada):
+        with self._lock, bloqueo_archivo(self.filepath):
+            self._sincronizar()
+            if cuenta_actualizada.numero not in self._por_numero:
+                return
+
+            self._anotar(cuenta_actualizada)
+            self._por_numero[cuenta_actualizada.numero] = self._copiar(cuenta_actualizada)
+            self._firma = self._firma_actual()
+        self._revisar_umbral()
+
+    def actualizar_varias(self, cuentas_actualizadas):
+        """
+        Agrega todas las cuentas al journal con una sola escritura.
+        """
+        with self._lock, bloqueo_archivo(self.filepath):
+            self._sincronizar()
+            existentes = [c for c in cuentas_actualizadas if c.numero in self._por_numero]
+            if not existentes:
+                return
+
+            self._anotar(*existentes)
+            for c in existentes:
+                self._por_numero[c.numero] = self._copiar(c)
+            self._firma = self._firma_actual()
+        self._revisar_umbral()
+
+    def guardar_todas(self, cuentas):
+        """
+        Reemplaza todo el estado: escribe un snapshot nuevo y vacía el journal.
+        """
+        with bloqueo_archivo(self.compactando_path), self._lock, bloqueo_archivo(self.filepath):
+            self._escribir_snapshot(cuentas)
+            for ruta in (self.journal_path, self.compactando_path):
+                if os.path.exists(ruta):
+                    os.remove(ruta)
+            self._asegurar_journal(self.journal_path)
+            self._recargar()
+
+    def asegurar_en_disco(self):
+        with self._lock, bloqueo_archivo(self.filepath):
+            for ruta in (self.filepath, self.journal_path, self.compactando_path):
+                fsync_ruta(ruta)
+            fsync_ruta(os.path.dirname(self.filepath) or ".")
+
+    # -----------------------------
+    # COMPACTACIÓN
+    # -----------------------------
+
+    def _escribir_snapshot(self, cuentas):
+        """
+        Escribe el snapshot en un archivo temporal y lo renombra encima del
+        original, para no dejar nunca un cuentas.csv a medio escribir. El
+        rename se baja a disco antes de volver: quien llama borra después los
+        journals que el snapshot reemplaza.
+        """
+        tmp = f"{self.filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=CAMPOS)
+            writer.writeheader()
+            for c in cuentas:
+                writer.writerow(c.to_dict())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.filepath)
+        fsync_ruta(os.path.dirname(self.filepath) or ".")
+        cache_global.invalidar(self.filepath)
+
+    def _revisar_umbral(self):
+        if self._filas_journal < self.umbral_compactacion:
+            return
+
+        if not self.compactar_en_segundo_plano:
+            self.compactar()
+            return
+
+        with self._lock:
+            if self._hilo_compactacion and self._hilo_compactacion.is_alive():
+                return
+            self._hilo_compactacion = threading.Thread(target=self.compactar, daemon=True)
+            self._hilo_compactacion.start()
+
+    def compactar(self):
+        """
+        Vuelca el journal en un snapshot nuevo.
+        """
+        with self._lock:
+            if self._compactando:
+                return
+            self._compactando = True
+
+        try:
+            # Una sola compactación a la vez, también entre procesos
+            with bloqueo_archivo(self.compactando_path):
+                with self._lock, bloqueo_archivo(self.filepath):
+                    self._sincronizar()
+
+                    # Quedó una compactación a medias: se resuelve entera bajo el lock.
+                    if os.path.exists(self.compactando_path):
+                        self.guardar_todas(list(self._por_numero.values()))
+                        return
+
+                    if self._filas_journal == 0:
+                        return
+
+                    os.replace(self.journal_path, self.compactando_path)
+                    self._asegurar_journal(self.journal_path)
+                    self._filas_journal = 0
+                    estado = [self._copiar(c) for c in self._por_numero.values()]
+                    self._firma = self._firma_actual()
+
+                # La escritura pesada ocurre fuera del lock; las operaciones nuevas
+                # siguen agregándose al journal limpio mientras tanto.
+                self._escribir_snapshot(estado)
+
+                with self._lock, bloqueo_archivo(self.filepath):
+                    # Otro proceso pudo haber escrito en el journal mientras tanto
+                    self._sincronizar()
+                    os.remove(self.compactando_path)
+                    self._firma = self._firma_actual()
+        finally:
+            self._compactando = False
+
+    def esperar_compactacion(self):
+        """
+        Bloquea hasta que termine la compactación en segundo plano (si hay una).
+        """
+        hilo = self._hilo_compactacion
+        if hilo:
+            hilo.join()
@@ -0,0 +1,162 @@
+import atexit
+import csv
+import io
+import os
+import threading
+import time
+from repositories.bloqueos import bloqueo_archivo
+
+# Políticas de fsync
+FSYNC_SIEMPRE = "siempre"      # fsync después de cada vaciado (más durable, más lento)
+FSYNC_AL_CERRAR = "al_cerrar"  # fsync solo al cerrar el escritor
+FSYNC_NUNCA = "nunca"          # el sistema operativo decide cuándo bajar a disco
+
+POLITICAS_FSYNC = (FSYNC_SIEMPRE, FSYNC_AL_CERRAR, FSYNC_NUNCA)
+
+
+def serializar_fila(fila, fieldnames):
+    """
+    Convierte un dict en la línea CSV (bytes UTF-8) que escribiría csv.DictWriter.
+    """
+    buf = io.StringIO()
+    csv.DictWriter(buf, fieldnames=fieldnames).writerow(fila)
+    return buf.getvalue().encode("utf-8")
+
+
+class EscritorBuffer:
+    """
+    Escritor de CSV con commit en grupo.
+
+    Mantiene un solo archivo abierto y acumula filas pendientes. Las filas se
+    escriben juntas (un solo write) cuando se cumple cualquiera de estas
+    condiciones:
+    - hay `max_filas` filas pendientes
+    - las filas pendientes ocupan `max_bytes` bytes
+    - la fila pendiente más antigua lleva `max_latencia` segundos esperando
+
+    También se puede vaciar a mano con flush(), o usarlo como context manager.
+    `al_vaciar`, si se pasa, recibe la lista de (fila, offset, largo) recién
+    escritas, con offset y largo en bytes dentro del archivo.
+    """
+
+    def __init__(self, filepath, fieldnames, max_filas=500, max_bytes=64 * 1024,
+                 max_latencia=0.5, fsync=FSYNC_NUNCA, al_vaciar=None):
+        if fsync not in POLITICAS_FSYNC:
+            raise ValueError(f"Política de fsync inválida: {fsync}")
+
+        self.filepath = filepath
+        self.fieldnames = fieldnames
+        self.max_filas = max_filas
+        self.max_bytes = max_bytes
+        self.max_latencia = max_latencia
+        self.fsync = fsync
+        self.al_vaciar = al_vaciar
+
+        self._archivo = open(filepath, "ab")
+        self._pendientes = []        # lista de (fila, bytes ya serializados)
+        self._bytes_pendientes = 0
+        self._primera_pendiente = None
+        self._timer = None
+        self._lock = threading.RLock()
+
+        atexit.register(self.cerrar)
+
+    # -----------------------------
+    # ESCRITURA
+    # -----------------------------
+
+    def escribir(self, fila):
+        """
+        Encola una fila. Puede disparar un vaciado si se alcanzó algún límite.
+        """
+        datos = serializar_fila(fila, self.fieldnames)
+
+        with self._lock:
+            if self._archivo is None:
+                raise ValueError("El escritor está cerrado")
+
+            self._pendientes.append((fila, datos))
+            self._bytes_pendientes += len(datos)
+
+            if self._primera_pendiente is None:
+                self._primera_pendiente = time.monotonic()
+                self._programar_deadline()
+
+            if (len(self._pendientes) >= self.max_filas
+                    or self._bytes_pendientes >= self.max_bytes
+                    or (self.max_latencia is not None
+                        and time.monotonic() - self._primera_pendiente >= self.max_latencia)):
+                self.flush()
+
+    def _programar_deadline(self):
+        """
+        Arranca un timer para que las filas no esperen más de max_latencia
+        aunque no lleguen escrituras nuevas.
+        """
+        if self.max_latencia is None:
+            return
+        self._timer = threading.Timer(self.max_latencia, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self):
+        """
+        Escribe todas las filas pendientes en un solo write.
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+            if not self._pendientes or self._archivo is None:
+                return
+
+            # Con el bloqueo tomado ningún otro proceso escribe entre el fstat
+            # y el write, así los offsets que se informan son exactos.
+            with bloqueo_archivo(self.filepath):
+                # En modo append el write va siempre al final real del archivo
+                offset = os.fstat(self._archivo.fileno()).st_size
+                escritas = []
+                for fila, datos in self._pendientes:
+                    escritas.append((fila, offset, len(datos)))
+                    offset += len(datos)
+
+                self._archivo.write(b"".join(datos for _, datos in self._pendientes))
+                self._archivo.flush()
+                if self.fsync == FSYNC_SIEMPRE:
+                    os.fsync(self._archivo.fileno())
+
+                self._pendientes = []
+                self._bytes_pendientes = 0
+                self._primera_pendiente = None
+
+                if self.al_vaciar:
+                    self.al_vaciar(escritas)
+
+    def pendientes(self):
+        """
+        Cantidad de filas que todavía no llegaron al archivo.
+        """
+        return len(self._pendientes)
+
+    # -----------------------------
+    # CIERRE
+    # -----------------------------
+
+    def cerrar(self):
+        with self._lock:
+            if self._archivo is None:
+                return
+            self.flush()
+            if self.fsync in (FSYNC_SIEMPRE, FSYNC_AL_CERRAR):
+                os.fsync(self._archivo.fileno())
+            self._archivo.close()
+            self._archivo = None
+        atexit.unregister(self.cerrar)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cerrar()
+        return False
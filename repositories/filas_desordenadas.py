@@ -0,0 +1,141 @@
+import json
+import os
+import threading
+from datetime import datetime
+from domain.identificadores import ms_de_id
+
+# Cuánto puede estar desordenado el archivo respecto de los ids (ms): una fila
+# se agrega después de crear su id (espera de bloqueos, lotes, buffer), así
+# que dos procesos pueden escribir ids un poco fuera de orden.
+VENTANA_DESFASE_MS = 5_000
+
+# Cada cuántos bytes revisados del CSV se guarda el estado (si no cambió nada más)
+BYTES_POR_GUARDADO = 1024 * 1024
+
+
+class FilasDesordenadas:
+    """
+    Filas de un CSV de transacciones que no respetan el orden por id del que
+    dependen las búsquedas por id y por tiempo de TransaccionRepo.
+
+    Una fila con id ordenable (domain.identificadores) está "en orden" si su
+    instante no es más de VENTANA_DESFASE_MS anterior al mayor instante de
+    las filas en orden que tiene antes, y si su fecha está a menos de
+    VENTANA_DESFASE_MS de ese instante. Las demás se anotan por offset:
+    - filas que se escriben mucho después de crear su id (reaplicadas por el
+      registro de intenciones, confirmadas en dos fases tras una cola larga,
+      un lote lento, el buffer de otro proceso)
+    - filas con ids viejos (uuid4) escritas después de alguna ordenable
+    - filas cuya fecha no corresponde al id (cargadas o corregidas a mano)
+
+    Las búsquedas leen aparte estas filas, así que ninguna queda afuera por
+    caer lejos de donde su id diría. No se calcula en cada escritura: al
+    consultar se revisan solo los bytes agregados desde la última vez, y el
+    estado se guarda en transacciones.desordenadas.json. Si el CSV se achicó
+    o se reemplazó, se revisa de nuevo desde el principio.
+    """
+
+    def __init__(self, csv_path):
+        self.csv_path = csv_path
+        self.ruta = os.path.splitext(csv_path)[0] + ".desordenadas.json"
+        self._lock = threading.RLock()
+        self._estado = None
+        self._sin_guardar = 0
+
+    # -----------------------------
+    # ESTADO
+    # -----------------------------
+
+    def _estado_vacio(self):
+        with open(self.csv_path, "rb") as f:
+            f.readline()
+            inicio = f.tell()
+        return {
+            "inodo": os.stat(self.csv_path).st_ino,
+            "cubierto": inicio,
+            "max_ms": None,       # mayor instante de las filas en orden
+            "ordenadas": False,   # si ya apareció alguna fila con id ordenable
+            "offsets": [],
+        }
+
+    def _cargar(self):
+        if os.path.exists(self.ruta):
+            try:
+                with open(self.ruta, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except ValueError:
+                pass   # guardado cortado: se revisa todo de nuevo
+        return self._estado_vacio()
+
+    def _guardar(self):
+        tmp = f"{self.ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._estado, f)
+        os.replace(tmp, self.ruta)
+        self._sin_guardar = 0
+
+    # -----------------------------
+    # REVISIÓN
+    # -----------------------------
+
+    @staticmethod
+    def _fecha_ms(fecha):
+        # Las fechas del CSV son locales, igual que timestamp() de una fecha sin zona
+        try:
+            return int(datetime.fromisoformat(fecha).timestamp() * 1000)
+        except ValueError:
+            return None
+
+    def _en_orden(self, linea):
+        """
+        True si la fila está en orden (y actualiza el mayor instante).
+        Supone que ningún campo contiene comas (ids, números y fechas ISO).
+        """
+        e = self._estado
+        partes = linea.rstrip(b"\r\n").split(b",")
+        ms = ms_de_id(partes[0].decode("utf-8", "replace"))
+        if ms is None:
+            return not e["ordenadas"]
+
+        e["ordenadas"] = True
+        fecha_ms = self._fecha_ms(partes[-1].decode("utf-8", "replace"))
+        if fecha_ms is None or abs(fecha_ms - ms) > VENTANA_DESFASE_MS:
+            return False
+        if e["max_ms"] is not None and ms < e["max_ms"] - VENTANA_DESFASE_MS:
+            return False
+        e["max_ms"] = ms if e["max_ms"] is None else max(e["max_ms"], ms)
+        return True
+
+    def sincronizar(self):
+        """
+        Revisa las filas agregadas al CSV desde la última vez. Devuelve
+        (offsets de las filas desordenadas, hasta qué byte del CSV están
+        revisadas). Una fila a medio escribir queda para la próxima.
+        """
+        with self._lock:
+            if self._estado is None:
+                self._estado = self._cargar()
+
+            st = os.stat(self.csv_path)
+            if st.st_ino != self._estado["inodo"] or st.st_size < self._estado["cubierto"]:
+                self._estado = self._estado_vacio()
+                self._sin_guardar = BYTES_POR_GUARDADO
+
+            e = self._estado
+            if st.st_size > e["cubierto"]:
+                nuevas = 0
+                with open(self.csv_path, "rb") as f:
+                    f.seek(e["cubierto"])
+                    for linea in f:
+                        if not linea.endswith(b"\n"):
+                            break
+                        if linea.strip() and not self._en_orden(linea):
+                            e["offsets"].append(e["cubierto"])
+                            nuevas += 1
+                        e["cubierto"] += len(linea)
+                        self._sin_guardar += len(linea)
+
+                if nuevas or self._sin_guardar >= BYTES_POR_GUARDADO:
+                    self._guardar()
+
+            return list(e["offsets"]), e["cubierto"]
@@ -0,0 +1,36 @@
+from datetime import date, datetime
+
+
+def como_conjunto(valor):
+    """
+    Normaliza un filtro que puede venir como un valor suelto o como colección.
+    None significa "sin filtro"; una colección vacía no deja pasar nada.
+    """
+    if valor is None:
+        return None
+    if isinstance(valor, str):
+        return {valor}
+    return set(valor)
+
+
+def como_fecha_iso(valor):
+    """
+    Convierte date/datetime/str a texto ISO para comparar directo contra el
+    campo "fecha" del CSV (las fechas ISO se ordenan igual como texto).
+    """
+    if valor is None:
+        return None
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return str(valor)
+
+
+def en_rango(fecha, desde, hasta):
+    """
+    desde es inclusivo, hasta es exclusivo. Ambos ya normalizados con como_fecha_iso.
+    """
+    if desde is not None and fecha < desde:
+        return False
+    if hasta is not None and fecha >= hasta:
+        return False
+    return True
@@ -0,0 +1,176 @@
+import csv
+import os
+import threading
+
+
+class IndiceCuentas:
+    """
+    Índice secundario de un CSV de transacciones por cuenta_id.
+
+    Guarda, para cada cuenta, los offsets en bytes de sus filas dentro del CSV.
+    Así una consulta por cuenta hace seek directo a sus filas en vez de leer
+    el archivo completo.
+
+    El índice vive en un archivo al lado del CSV (transacciones.idx.csv) con una
+    fila "cuenta_id,offset,largo" por transacción. Es solo de agregado, igual
+    que el CSV. Si el CSV creció por fuera del repositorio (otro proceso, una
+    importación a mano), las filas nuevas se indexan leyendo únicamente la cola
+    del archivo. Si el CSV se achicó, se reconstruye desde cero.
+
+    Supone que ningún campo contiene saltos de línea (ids, números y fechas ISO).
+    """
+
+    def __init__(self, csv_path, columna="cuenta_id"):
+        self.csv_path = csv_path
+        self.idx_path = os.path.splitext(csv_path)[0] + ".idx.csv"
+        self.columna = columna
+
+        self._offsets = {}
+        self._cubierto = 0   # bytes del CSV ya indexados
+        self._cargado = False
+        self._lock = threading.RLock()
+
+    # -----------------------------
+    # CARGA Y RECONSTRUCCIÓN
+    # -----------------------------
+
+    def _cargar(self):
+        if not os.path.exists(self.idx_path):
+            self.reconstruir()
+            return
+
+        offsets = {}
+        cubierto = 0
+        with open(self.idx_path, "r", newline="", encoding="utf-8") as f:
+            for fila in csv.reader(f):
+                # Una fila incompleta (corte a mitad de escritura) se ignora;
+                # _ponerse_al_dia vuelve a indexar lo que falte.
+                if len(fila) != 3:
+                    continue
+                cuenta_id, offset, largo = fila[0], int(fila[1]), int(fila[2])
+                offsets.setdefault(cuenta_id, set()).add(offset)
+                cubierto = max(cubierto, offset + largo)
+
+        self._offsets = {c: sorted(o) for c, o in offsets.items()}
+        self._cubierto = cubierto or self._inicio_datos()
+        self._cargado = True
+
+    def _inicio_datos(self):
+        """
+        Offset de la primera fila de datos (justo después del encabezado).
+        """
+        with open(self.csv_path, "rb") as f:
+            f.readline()
+            return f.tell()
+
+    def _escanear(self, desde):
+        """
+        Recorre el CSV a partir del byte `desde` y devuelve (cuenta_id, offset, largo)
+        para cada fila, junto con el byte donde terminó la lectura.
+        """
+        with open(self.csv_path, "rb") as f:
+            encabezado = next(csv.reader([f.readline().decode("utf-8")]))
+            col = encabezado.index(self.columna)
+
+            f.seek(desde)
+            entradas = []
+            offset = desde
+            for linea in f:
+                # Una línea sin salto final es una fila a medio escribir: se deja para después
+                if not linea.endswith(b"\n"):
+                    break
+                texto = linea.decode("utf-8")
+                if texto.strip():
+                    valores = next(csv.reader([texto]))
+                    entradas.append((valores[col], offset, len(linea)))
+                offset += len(linea)
+
+        return entradas, offset
+
+    def reconstruir(self):
+        """
+        Vuelve a generar el índice completo leyendo todo el CSV.
+        """
+        with self._lock:
+            entradas, fin = self._escanear(self._inicio_datos())
+
+            tmp = self.idx_path + ".tmp"
+            with open(tmp, "w", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerows(entradas)
+            os.replace(tmp, self.idx_path)
+
+            self._offsets = {}
+            for cuenta_id, offset, _ in entradas:
+                self._offsets.setdefault(cuenta_id, []).append(offset)
+            self._cubierto = fin
+            self._cargado = True
+
+    def _ponerse_al_dia(self):
+        """
+        Indexa las filas que se agregaron al CSV desde la última vez.
+        """
+        tamano = os.path.getsize(self.csv_path)
+        if tamano == self._cubierto:
+            return
+        if tamano < self._cubierto:
+            self.reconstruir()
+            return
+
+        entradas, fin = self._escanear(self._cubierto)
+        self._anotar(entradas)
+        self._cubierto = fin
+
+    def _anotar(self, entradas):
+        if not entradas:
+            return
+        with open(self.idx_path, "a", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(entradas)
+        for cuenta_id, offset, _ in entradas:
+            self._offsets.setdefault(cuenta_id, []).append(offset)
+
+    # -----------------------------
+    # API
+    # -----------------------------
+
+    def registrar(self, entradas):
+        """
+        Registra filas recién agregadas al CSV: lista de (cuenta_id, offset, largo).
+        Si hay un hueco (otro proceso escribió en el medio), se indexa la cola completa.
+        """
+        with self._lock:
+            if not self._cargado:
+                self._cargar()
+
+            if entradas and entradas[0][1] == self._cubierto:
+                self._anotar(entradas)
+                ultimo = entradas[-1]
+                self._cubierto = ultimo[1] + ultimo[2]
+            else:
+                self._ponerse_al_dia()
+
+    def offsets(self, cuenta_id):
+        """
+        Offsets (ordenados) de las filas de una cuenta.
+        """
+        with self._lock:
+            if not self._cargado:
+                self._cargar()
+            self._ponerse_al_dia()
+            return list(self._offsets.get(cuenta_id, []))
+
+    def leer_filas(self, offsets):
+        """
+        Lee las filas en los offsets dados y las devuelve como dicts del CSV.
+        """
+        with open(self.csv_path, "rb") as f:
+            encabezado = next(csv.reader([f.readline().decode("utf-8")]))
+            for offset in offsets:
+                f.seek(offset)
+                valores = next(csv.reader([f.readline().decode("utf-8")]))
+                yield dict(zip(encabezado, valores))
+
+
+if __name__ == "__main__":
+    indice = IndiceCuentas("data/transacciones.csv")
+    indice.reconstruir()
+    print(f"Índice reconstruido en {indice.idx_path}")
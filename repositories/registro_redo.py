@@ -0,0 +1,323 @@
+import json
+import os
+import uuid
+from domain.cuenta import Cuenta
+from repositories.bloqueos import BloqueoCuentas, bloqueo_archivo
+
+# Tamaño del registro a partir del cual se hace un checkpoint
+MAX_BYTES_REGISTRO = 1024 * 1024
+
+
+def fsync_ruta(ruta):
+    """
+    Baja a disco un archivo (o un directorio, para que un rename sea durable).
+    En Windows los directorios no se pueden abrir: se ignora.
+    """
+    try:
+        fd = os.open(ruta, os.O_RDONLY)
+    except (FileNotFoundError, PermissionError, IsADirectoryError):
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class FilaReconstruida:
+    """
+    Transacción o transferencia ya serializada (leída del registro o de otro
+    CSV) que se vuelve a guardar: los repositorios solo necesitan to_dict().
+    """
+
+    def __init__(self, fila):
+        self.fila = fila
+
+    def to_dict(self):
+        return dict(self.fila)
+
+
+class RegistroRedo:
+    """
+    Registro de intenciones (redo log) para confirmar una operación que toca
+    varios archivos como una sola unidad.
+
+    confirmar() se llama con las cuentas de la operación ya bloqueadas (con
+    el mismo BloqueoCuentas que `bloqueos`) y hace:
+    1. Con el bloqueo del registro, agrega una línea JSON con todo lo que se
+       va a escribir (estado final de las cuentas, cuentas nuevas,
+       transacciones y transferencias) y hace un único fsync. Desde ese
+       momento la operación está confirmada.
+    2. Sin el bloqueo del registro, aplica los cambios en los repositorios:
+       operaciones sobre cuentas distintas se aplican en paralelo.
+    3. Con el bloqueo del registro, agrega una línea {"hecho": id}.
+
+    Una intención sin "hecho" que toca una cuenta que tenemos bloqueada es
+    de un proceso que se cayó entre 1 y 3 (el dueño tiene la cuenta
+    bloqueada hasta terminar): recuperar(numeros) la reaplica. Reaplicar es
+    idempotente: las cuentas se escriben con su estado final y las filas
+    cuyo id ya está en el archivo no se repiten.
+
+    La marca "hecho" no se baja a disco y los archivos de datos se bajan
+    recién en el checkpoint: después de una caída del sistema operativo la
+    marca puede estar y las filas no. Por eso recuperar() sin cuentas (al
+    arrancar) reaplica todas las intenciones desde el último checkpoint, en
+    orden, tengan marca o no, y después hace checkpoint.
+
+    Cuando el registro supera `max_bytes` se hace un checkpoint (si no hay
+    intenciones pendientes): se bajan a disco los archivos de datos y el
+    registro se vacía.
+    """
+
+    def __init__(self, cuenta_repo, transaccion_repo, transferencia_repo,
+                 ruta="data/registro_redo.log", max_bytes=MAX_BYTES_REGISTRO, bloqueos=None):
+        self.cuenta_repo = cuenta_repo
+        self.transaccion_repo = transaccion_repo
+        self.transferencia_repo = transferencia_repo
+        self.ruta = ruta
+        self.max_bytes = max_bytes
+        self.bloqueos = bloqueos or BloqueoCuentas()
+        self._leido = 0        # hasta qué byte del registro ya se revisó
+        self._inodo = None     # de qué archivo (el checkpoint lo reemplaza)
+        self._pendientes = {}  # id -> intención sin "hecho", en orden del registro
+
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        open(ruta, "ab").close()
+
+    # -----------------------------
+    # CONFIRMACIÓN
+    # -----------------------------
+
+    def confirmar(self, cuentas=(), transacciones=(), transferencias=(), nuevas=()):
+        """
+        Persiste cuentas (objetos Cuenta), cuentas nuevas, transacciones y
+        transferencias como una sola operación atómica ante caídas. Todas
+        las cuentas tienen que estar bloqueadas por quien llama.
+        """
+        cuentas = list(cuentas)
+        transacciones = list(transacciones)
+        transferencias = list(transferencias)
+        nuevas = list(nuevas)
+
+        intencion = {
+            "id": str(uuid.uuid4()),
+            "cuentas": [c.to_dict() for c in cuentas],
+            "nuevas": [c.to_dict() for c in nuevas],
+            "transacciones": [t.to_dict() for t in transacciones],
+            "transferencias": [t.to_dict() for t in transferencias],
+        }
+
+        with bloqueo_archivo(self.ruta):
+            self._anotar(intencion, durable=True)
+
+        self._aplicar(cuentas, transacciones, transferencias, nuevas)
+
+        with bloqueo_archivo(self.ruta):
+            self._anotar({"hecho": intencion["id"]})
+            if self._leido > self.max_bytes:
+                self.checkpoint()
+
+    def _anotar(self, registro, durable=False):
+        """
+        Agrega una línea al registro. Se llama con el bloqueo del registro.
+        """
+        self._leer_nuevas()
+        linea = (json.dumps(registro, ensure_ascii=False) + "\n").encode("utf-8")
+        with open(self.ruta, "ab") as f:
+            f.write(linea)
+            f.flush()
+            if durable:
+                os.fsync(f.fileno())
+        self._leer_nuevas()
+
+    def _aplicar(self, cuentas, transacciones, transferencias, nuevas=()):
+        for cuenta in nuevas:
+            if self.cuenta_repo.obtener_por_numero(cuenta.numero) is None:
+                self.cuenta_repo.agregar(cuenta)
+        if cuentas:
+            self.cuenta_repo.actualizar_varias(cuentas)
+        if transacciones:
+            self.transaccion_repo.guardar_varias(transacciones)
+        if transferencias:
+            self.transferencia_repo.guardar_varias(transferencias)
+
+        # Con escritura en buffer las filas tienen que llegar al archivo
+        # antes de marcar la intención como hecha.
+        for repo in (self.transaccion_repo, self.transferencia_repo):
+            if hasattr(repo, "flush"):
+                repo.flush()
+
+    # -----------------------------
+    # LECTURA DEL REGISTRO
+    # -----------------------------
+
+    def _leer(self, desde):
+        """
+        Registros completos desde el byte `desde` y hasta qué byte llegan.
+        Una línea a medio escribir es una intención que nunca se confirmó
+        (las líneas se escriben con el bloqueo tomado): se corta.
+        Se llama con el bloqueo del registro.
+        """
+        registros = []
+        with open(self.ruta, "rb+") as f:
+            tamano = f.seek(0, os.SEEK_END)
+            f.seek(desde)
+            fin = desde
+            for linea in f:
+                if not linea.endswith(b"\n"):
+                    break
+                fin += len(linea)
+                registros.append(json.loads(linea))
+            if fin < tamano:
+                f.truncate(fin)
+        return registros, fin
+
+    def _leer_nuevas(self):
+        """
+        Actualiza las intenciones pendientes con lo que se agregó al registro
+        desde la última lectura. Se llama con el bloqueo del registro.
+        """
+        inodo = os.stat(self.ruta).st_ino
+        if inodo != self._inodo:
+            # Otro proceso hizo checkpoint (solo se hace sin pendientes)
+            self._inodo = inodo
+            self._leido = 0
+            self._pendientes = {}
+
+        registros, self._leido = self._leer(self._leido)
+        for registro in registros:
+            if "hecho" in registro:
+                self._pendientes.pop(registro["hecho"], None)
+            else:
+                self._pendientes[registro["id"]] = registro
+
+    @staticmethod
+    def _cuentas_de(intencion):
+        return {c["numero"] for c in intencion["cuentas"] + intencion.get("nuevas", [])}
+
+    # -----------------------------
+    # RECUPERACIÓN
+    # -----------------------------
+
+    def recuperar(self, numeros=None):
+        """
+        Reaplica las intenciones que quedaron sin terminar por una caída.
+
+        - Con `numeros`: las pendientes que tocan esas cuentas. BankService la
+          llama con las cuentas ya bloqueadas y antes de leerlas, así nunca
+          trabaja sobre un saldo al que le falta una operación confirmada.
+        - Sin `numeros` (al arrancar): bloquea todas las cuentas del registro
+          y reaplica todas las intenciones desde el último checkpoint, con
+          marca o sin ella (ver la documentación de la clase).
+        """
+        if numeros is None:
+            self._recuperar_todo()
+            return
+
+        numeros = set(numeros)
+        if not numeros:
+            return
+        with bloqueo_archivo(self.ruta):
+            self._leer_nuevas()
+            intenciones = [i for i in self._pendientes.values() if self._cuentas_de(i) & numeros]
+            if intenciones:
+                self._rehacer(intenciones)
+                for intencion in intenciones:
+                    self._anotar({"hecho": intencion["id"]})
+
+    def _recuperar_todo(self):
+        # Las cuentas se bloquean antes que el registro (el mismo orden que
+        # confirmar). Si mientras tanto entró una intención con otras
+        # cuentas, se vuelve a intentar con el conjunto más grande.
+        numeros = set()
+        while True:
+            with self.bloqueos.bloquear(*numeros), bloqueo_archivo(self.ruta):
+                intenciones = [r for r in self._leer(0)[0] if "hecho" not in r]
+                cuentas = set()
+                for intencion in intenciones:
+                    cuentas |= self._cuentas_de(intencion)
+                if cuentas <= numeros:
+                    if intenciones:
+                        self._rehacer(intenciones)
+                    self._leer_nuevas()
+                    for intencion in list(self._pendientes.values()):
+                        self._anotar({"hecho": intencion["id"]})
+                    self.checkpoint()
+                    return
+            numeros |= cuentas
+
+    def _rehacer(self, intenciones):
+        """
+        Vuelve a aplicar intenciones, en el orden del registro: cada cuenta
+        queda con el estado de la última y se agregan las filas que faltan.
+        """
+        estados = {}
+        nuevas = {}
+        transacciones = []
+        transferencias = []
+        for intencion in intenciones:
+            for c in intencion.get("nuevas", []):
+                nuevas.setdefault(c["numero"], c)
+            for c in intencion.get("nuevas", []) + intencion["cuentas"]:
+                estados[c["numero"]] = c
+            transacciones.extend(intencion["transacciones"])
+            transferencias.extend(intencion["transferencias"])
+
+        def a_cuenta(c):
+            return Cuenta(c["numero"], c["cliente_id"], c["tipo"], c["saldo"], c["activa"])
+
+        if transacciones:
+            existentes = {
+                t["id"] for t in self.transaccion_repo.iter_todas(
+                    cuenta_id={t["cuenta_id"] for t in transacciones}
+                )
+            }
+            transacciones = [t for t in transacciones if t["id"] not in existentes]
+
+        if transferencias:
+            existentes = {
+                t["id"] for t in self.transferencia_repo.iter_todas(
+                    cuenta_id={t["cuenta_origen"] for t in transferencias}
+                )
+            }
+            transferencias = [t for t in transferencias if t["id"] not in existentes]
+
+        self._aplicar(
+            [a_cuenta(c) for c in estados.values()],
+            [FilaReconstruida(t) for t in transacciones],
+            [FilaReconstruida(t) for t in transferencias],
+            [a_cuenta(c) for c in nuevas.values()],
+        )
+
+    # -----------------------------
+    # CHECKPOINT
+    # -----------------------------
+
+    def checkpoint(self):
+        """
+        Baja a disco los archivos de datos y reemplaza el registro por uno
+        vacío (un archivo nuevo: los demás procesos lo notan por el inodo,
+        aunque vuelva a crecer antes de que lo lean). Si hay
+        intenciones pendientes (de operaciones en curso o de un proceso
+        caído) no hace nada y devuelve False: el registro se vacía en un
+        checkpoint posterior o en el recuperar() del próximo arranque.
+        """
+        with bloqueo_archivo(self.ruta):
+            self._leer_nuevas()
+            if self._pendientes:
+                return False
+
+            for repo in (self.cuenta_repo, self.transaccion_repo, self.transferencia_repo):
+                if hasattr(repo, "asegurar_en_disco"):
+                    repo.asegurar_en_disco()
+
+            tmp = self.ruta + ".tmp"
+            with open(tmp, "wb") as f:
+                os.fsync(f.fileno())
+            os.replace(tmp, self.ruta)
+            fsync_ruta(os.path.dirname(self.ruta) or ".")
+            self._leer_nuevas()
+            return True
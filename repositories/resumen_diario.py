@@ -0,0 +1,559 @@
+import csv
+import datetime
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+from repositories.bloqueos import bloqueo_archivo
+
+# Columnas de cada archivo mensual del resumen
+CAMPOS = [
+    "dia", "cuenta_id", "cantidad", "depositos", "retiros",
+    "transferencias_entrada", "transferencias_salida", "minimo", "maximo",
+]
+
+# Cada cuántas filas nuevas se agregan los cambios al registro de deltas
+FILAS_POR_DELTA = 1000
+
+# Tamaño del registro de deltas a partir del cual se pasan a los meses sin
+# esperar al checkpoint (para que abrir el resumen no tenga que leer tanto)
+MAX_BYTES_DELTAS = 4 * 1024 * 1024
+
+
+def _leer_filas(ruta, inicio, fin=None):
+    """
+    Genera (fila, largo en bytes) de las líneas del CSV entre los bytes
+    `inicio` y `fin`. Corta antes de una fila a medio escribir; las líneas en
+    blanco salen con fila None (cuentan para el largo).
+    """
+    with open(ruta, "rb") as f:
+        encabezado = next(csv.reader([f.readline().decode("utf-8")]))
+        f.seek(inicio)
+        posicion = inicio
+        for linea in f:
+            if fin is not None and posicion >= fin:
+                break
+            if not linea.endswith(b"\n"):
+                break   # fila a medio escribir por otro proceso
+            texto = linea.decode("utf-8")
+            fila = dict(zip(encabezado, next(csv.reader([texto])))) if texto.strip() else None
+            posicion += len(linea)
+            yield fila, len(linea)
+
+
+def dia_exacto(fecha):
+    """
+    Día ISO ("AAAA-MM-DD") si `fecha` (date, datetime o texto ISO) cae justo
+    al comienzo de un día; None si tiene hora distinta de 00:00.
+    """
+    if isinstance(fecha, datetime.datetime):
+        return fecha.date().isoformat() if fecha.time() == datetime.time() else None
+    if isinstance(fecha, datetime.date):
+        return fecha.isoformat()
+    if len(fecha) == 10:
+        return fecha
+    return fecha[:10] if datetime.datetime.fromisoformat(fecha).time() == datetime.time() else None
+
+
+class ResumenDiario:
+    """
+    Tabla de resumen por día y por cuenta, mantenida al día con cada
+    escritura, para que los reportes por día no tengan que releer todas las
+    transacciones.
+
+    Por cada (día, cuenta) guarda: cantidad de transacciones, suma de
+    depósitos y de retiros, monto mínimo y máximo, y suma de transferencias
+    recibidas y enviadas (estas salen de transferencias.csv).
+
+    Se guarda en data/transacciones.diario/, un CSV por mes (AAAA-MM.csv),
+    más estado.json con hasta qué byte de cada CSV ya se contó. En el camino
+    de escritura los meses no se reescriben: cada FILAS_POR_DELTA filas se
+    agrega a deltas.log una línea con lo que cambió en cada (día, cuenta) y
+    hasta dónde llegan los CSV. guardar() (en el checkpoint, al cerrar o
+    cuando deltas.log pasa MAX_BYTES_DELTAS) pasa los deltas a los meses que
+    tocan y vacía el registro. Al abrir, el resumen es estado.json más las
+    líneas de deltas.log.
+
+    - TransaccionRepo llama a registrar() después de cada escritura.
+    - Las transferencias y las filas que escribió otro proceso se leen desde
+      el último byte contado (sincronizar()).
+    - Filas cargadas con fecha vieja solo modifican su día. Si se corrigieron
+      filas ya contadas, recalcular_dias() rehace solo esos días.
+    - Si un CSV se achicó o se reemplazó, se recalcula todo (reconstruir()).
+    """
+
+    def __init__(self, csv_path="data/transacciones.csv", transferencias_path=None, directorio=None):
+        self.csv_path = csv_path
+        self.transferencias_path = transferencias_path or os.path.join(
+            os.path.dirname(csv_path), "transferencias.csv"
+        )
+        self.directorio = directorio or os.path.splitext(csv_path)[0] + ".diario"
+        self.estado_path = os.path.join(self.directorio, "estado.json")
+        self.deltas_path = os.path.join(self.directorio, "deltas.log")
+        os.makedirs(self.directorio, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._meses = {}       # "AAAA-MM" → {(dia, cuenta_id): entrada}
+        self._sucios = set()   # meses con cambios que todavía no están en su CSV
+        self._pendientes = {}  # (dia, cuenta_id) → delta que todavía no está en deltas.log
+        self._sin_guardar = 0
+        self._deltas = (None, 0)   # (inodo, hasta qué byte) de deltas.log que está en memoria
+        with bloqueo_archivo(self.csv_path):
+            self._estado = self._cargar()
+            self._aplicar_deltas(0)
+
+    @contextmanager
+    def _bloqueado(self):
+        """
+        Bloqueo de transacciones.csv y después el de la instancia, siempre en
+        ese orden: TransaccionRepo llama a registrar() con el del archivo ya
+        tomado, así que tomarlos al revés en otro hilo sería un deadlock.
+        """
+        with bloqueo_archivo(self.csv_path), self._lock:
+            yield
+
+    # -----------------------------
+    # ESTADO
+    # -----------------------------
+
+    def _fuentes(self):
+        return {
+            "transacciones": (self.csv_path, self._sumar_transaccion),
+            "transferencias": (self.transferencias_path, self._sumar_transferencia),
+        }
+
+    @staticmethod
+    def _inicio(ruta):
+        if not os.path.exists(ruta):
+            return None
+        with open(ruta, "rb") as f:
+            f.readline()
+            return {"cubierto": f.tell(), "inodo": os.fstat(f.fileno()).st_ino}
+
+    def _estado_vacio(self):
+        for nombre in os.listdir(self.directorio):
+            if nombre.endswith(".csv"):
+                os.remove(os.path.join(self.directorio, nombre))
+        self._vaciar_deltas()
+        return {
+            "generacion": 0,
+            "guardando": False,
+            "fuentes": {nombre: self._inicio(ruta) for nombre, (ruta, _) in self._fuentes().items()},
+        }
+
+    def _leer_estado(self):
+        if not os.path.exists(self.estado_path):
+            return None
+        with open(self.estado_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _cargar(self):
+        estado = self._leer_estado()
+        if estado is None or estado["guardando"]:
+            # Sin estado, o se cortó un guardado a la mitad: se cuenta todo de
+            # nuevo. Se escribe enseguida: deltas.log parte de este estado.
+            self._estado = self._estado_vacio()
+            self._escribir_estado()
+            return self._estado
+        return estado
+
+    def _adoptar_disco(self):
+        """
+        Si otro proceso guardó o agregó deltas después que esta instancia,
+        toma el estado de disco. Sin cambios propios fuera de deltas.log
+        alcanza con aplicar las líneas nuevas; si no, descarta lo que hay en
+        memoria y parte de disco (las filas que falten se suman al
+        sincronizar). Devuelve True si lo hizo.
+        """
+        en_disco = self._leer_estado()
+        if en_disco is None or en_disco["guardando"]:
+            return False
+        misma_generacion = en_disco["generacion"] == self._estado["generacion"]
+        firma = self._firma_deltas()
+        if misma_generacion and firma == self._deltas:
+            return False
+
+        if misma_generacion and firma[0] == self._deltas[0] and not self._pendientes:
+            self._aplicar_deltas(self._deltas[1])
+            return True
+
+        self._meses = {}
+        self._sucios = set()
+        self._pendientes = {}
+        self._sin_guardar = 0
+        self._estado = en_disco
+        self._aplicar_deltas(0)
+        return True
+
+    # -----------------------------
+    # REGISTRO DE DELTAS
+    # -----------------------------
+
+    def _firma_deltas(self):
+        try:
+            st = os.stat(self.deltas_path)
+        except FileNotFoundError:
+            return None, 0
+        return st.st_ino, st.st_size
+
+    def _vaciar_deltas(self):
+        # Un archivo nuevo: los demás procesos lo notan por el inodo
+        tmp = f"{self.deltas_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        open(tmp, "wb").close()
+        os.replace(tmp, self.deltas_path)
+        self._deltas = self._firma_deltas()
+
+    def _aplicar_deltas(self, desde):
+        """
+        Suma a la memoria las líneas de deltas.log desde el byte `desde`.
+        Una línea cortada (el programa se cortó mientras la agregaba) se
+        descarta; las de una generación anterior (se cortó un guardado antes
+        de vaciar el registro) ya están en los meses y se saltean.
+        """
+        if not os.path.exists(self.deltas_path):
+            self._vaciar_deltas()
+            return
+
+        with open(self.deltas_path, "rb+") as f:
+            tamano = f.seek(0, os.SEEK_END)
+            f.seek(desde)
+            fin = desde
+            for linea in f:
+                if not linea.endswith(b"\n"):
+                    break
+                fin += len(linea)
+                registro = json.loads(linea)
+                if registro["generacion"] != self._estado["generacion"]:
+                    continue
+                for dia, cuenta_id, delta in registro["deltas"]:
+                    self._combinar(self._entrada(dia, cuenta_id), delta)
+                self._estado["fuentes"] = registro["fuentes"]
+            if fin < tamano:
+                f.truncate(fin)
+            self._deltas = (os.fstat(f.fileno()).st_ino, fin)
+
+    def _anotar_deltas(self):
+        """
+        Agrega a deltas.log una línea con los cambios por (día, cuenta) desde
+        la última y hasta dónde se contaron los CSV. Es lo único que se
+        escribe en el camino de escritura.
+        """
+        if self._adoptar_disco():
+            # Otro proceso anotó o guardó: lo propio se descartó y se vuelve
+            # a contar desde lo que quedó en disco
+            self.sincronizar()
+        if not self._pendientes:
+            return
+
+        registro = {
+            "generacion": self._estado["generacion"],
+            "fuentes": self._estado["fuentes"],
+            "deltas": [[dia, cuenta, d] for (dia, cuenta), d in sorted(self._pendientes.items())],
+        }
+        linea = (json.dumps(registro) + "\n").encode("utf-8")
+        with open(self.deltas_path, "ab") as f:
+            f.write(linea)
+        self._deltas = (self._deltas[0], self._deltas[1] + len(linea))
+        self._pendientes = {}
+        self._sin_guardar = 0
+
+        if self._deltas[1] > MAX_BYTES_DELTAS:
+            self.guardar()
+
+    def _anotar_si_corresponde(self):
+        if self._sin_guardar >= FILAS_POR_DELTA:
+            self._anotar_deltas()
+
+    def _escribir_estado(self):
+        tmp = f"{self.estado_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._estado, f)
+        os.replace(tmp, self.estado_path)
+
+    # -----------------------------
+    # MESES
+    # -----------------------------
+
+    def _ruta_mes(self, mes):
+        return os.path.join(self.directorio, f"{mes}.csv")
+
+    def _leer_mes(self, mes):
+        datos = {}
+        ruta = self._ruta_mes(mes)
+        if not os.path.exists(ruta):
+            return datos
+        with open(ruta, "r", newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                entrada = {campo: float(row[campo]) for campo in CAMPOS[2:7]}
+                entrada["cantidad"] = int(row["cantidad"])
+                entrada["minimo"] = float(row["minimo"]) if row["minimo"] else None
+                entrada["maximo"] = float(row["maximo"]) if row["maximo"] else None
+                datos[(row["dia"], row["cuenta_id"])] = entrada
+        return datos
+
+    def _escribir_mes(self, mes):
+        ruta = self._ruta_mes(mes)
+        tmp = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(CAMPOS)
+            for (dia, cuenta_id), e in sorted(self._meses[mes].items()):
+                writer.writerow([dia, cuenta_id] + [
+                    "" if e[campo] is None else e[campo] for campo in CAMPOS[2:]
+                ])
+        os.replace(tmp, ruta)
+
+    def _meses_guardados(self):
+        return {
+            nombre[:-4] for nombre in os.listdir(self.directorio)
+            if nombre.endswith(".csv") and len(nombre) == 11
+        }
+
+    @staticmethod
+    def _vacia():
+        return {
+            "cantidad": 0, "depositos": 0.0, "retiros": 0.0,
+            "transferencias_entrada": 0.0, "transferencias_salida": 0.0,
+            "minimo": None, "maximo": None,
+        }
+
+    @staticmethod
+    def _combinar(e, d):
+        """
+        Suma el delta `d` a la entrada `e` (los mínimos y máximos se combinan).
+        """
+        for campo in CAMPOS[2:7]:
+            e[campo] += d[campo]
+        for campo, elegir in (("minimo", min), ("maximo", max)):
+            if d[campo] is not None:
+                e[campo] = d[campo] if e[campo] is None else elegir(e[campo], d[campo])
+
+    def _entrada(self, dia, cuenta_id):
+        mes = dia[:7]
+        if mes not in self._meses:
+            self._meses[mes] = self._leer_mes(mes)
+        self._sucios.add(mes)
+        return self._meses[mes].setdefault((dia, cuenta_id), self._vacia())
+
+    def _sumar(self, dia, cuenta_id, **cambios):
+        d = self._vacia()
+        d.update(cambios)
+        self._combinar(self._entrada(dia, cuenta_id), d)
+        self._combinar(self._pendientes.setdefault((dia, cuenta_id), self._vacia()), d)
+
+    def _sumar_transaccion(self, fila):
+        monto = float(fila["monto"])
+        self._sumar(
+            fila["fecha"][:10], fila["cuenta_id"], cantidad=1,
+            depositos=monto if fila["tipo"] == "deposito" else 0.0,
+            retiros=monto if fila["tipo"] == "retiro" else 0.0,
+            minimo=monto, maximo=monto,
+        )
+        self._sin_guardar += 1
+
+    def _sumar_transferencia(self, fila):
+        dia = fila["fecha"][:10]
+        monto = float(fila["monto"])
+        self._sumar(dia, fila["cuenta_origen"], transferencias_salida=monto)
+        self._sumar(dia, fila["cuenta_destino"], transferencias_entrada=monto)
+        self._sin_guardar += 1
+
+    # -----------------------------
+    # ACTUALIZACIÓN
+    # -----------------------------
+
+    def registrar(self, escritas):
+        """
+        Suma filas recién escritas en transacciones.csv. `escritas` es una
+        lista de (fila, offset, largo), la misma que reciben el índice, el
+        almacén columnar y los agregados.
+        """
+        with self._bloqueado():
+            fuente = self._estado["fuentes"]["transacciones"]
+            if not escritas:
+                return
+            if fuente is None or escritas[0][1] != fuente["cubierto"]:
+                # Hay filas antes de estas que no se contaron: se leen del archivo
+                self.sincronizar()
+                return
+
+            for fila, offset, largo in escritas:
+                self._sumar_transaccion(fila)
+                fuente["cubierto"] = offset + largo
+
+            self._anotar_si_corresponde()
+
+    def sincronizar(self):
+        """
+        Cuenta las filas de transacciones.csv y transferencias.csv que
+        todavía no están en el resumen.
+        """
+        with self._bloqueado():
+            fuentes = self._estado["fuentes"]
+            for nombre, (ruta, sumar) in self._fuentes().items():
+                if not os.path.exists(ruta):
+                    continue
+                if fuentes[nombre] is None:
+                    fuentes[nombre] = self._inicio(ruta)
+
+                st = os.stat(ruta)
+                if st.st_size < fuentes[nombre]["cubierto"] or st.st_ino != fuentes[nombre]["inodo"]:
+                    self.reconstruir()
+                    return
+                for fila, largo in _leer_filas(ruta, fuentes[nombre]["cubierto"]):
+                    if fila is not None:
+                        sumar(fila)
+                    fuentes[nombre]["cubierto"] += largo
+
+            self._anotar_si_corresponde()
+
+    def recalcular_dias(self, dias):
+        """
+        Vuelve a calcular solo los días dados (texto "AAAA-MM-DD" o date)
+        releyendo los CSV; para cuando se corrigieron filas ya contadas.
+        """
+        dias = {d if isinstance(d, str) else d.isoformat() for d in dias}
+        with self._bloqueado():
+            self._adoptar_disco()
+            self.sincronizar()
+            for dia in dias:
+                mes = dia[:7]
+                if mes not in self._meses:
+                    self._meses[mes] = self._leer_mes(mes)
+                for clave in [c for c in self._meses[mes] if c[0] == dia]:
+                    del self._meses[mes][clave]
+                self._sucios.add(mes)
+
+            for nombre, (ruta, sumar) in self._fuentes().items():
+                fuente = self._estado["fuentes"][nombre]
+                if fuente is None:
+                    continue
+                with open(ruta, "rb") as f:
+                    f.readline()
+                    inicio = f.tell()
+                for fila, _ in _leer_filas(ruta, inicio, fuente["cubierto"]):
+                    if fila is not None and fila["fecha"][:10] in dias:
+                        sumar(fila)
+            self.guardar()
+
+    def reconstruir(self):
+        """
+        Vuelve a calcular todo desde los CSV.
+        """
+        with self._bloqueado():
+            # Mientras se recalcula, lo que está en disco queda marcado como
+            # "guardando" (los meses y los deltas se borran)
+            self._estado["guardando"] = True
+            self._escribir_estado()
+            self._meses = {}
+            self._sucios = set()
+            self._pendientes = {}
+            self._sin_guardar = 0
+            generacion = self._estado["generacion"]
+            self._estado = self._estado_vacio()
+            self._estado["generacion"] = generacion
+            self.sincronizar()
+            self.guardar()
+
+    def guardar(self):
+        """
+        Pasa los deltas a los meses: escribe los meses modificados y el estado
+        y vacía deltas.log. Mientras se escriben, el estado queda marcado como
+        "guardando": si el programa se corta en el medio, al abrirlo de nuevo
+        se recalcula todo.
+
+        Si otro proceso guardó después que esta instancia, se toma lo que
+        quedó en disco y se le suman las filas que falten, así lo guardado
+        siempre corresponde a un mismo punto de los CSV.
+        """
+        with self._bloqueado():
+            if self._adoptar_disco():
+                self.sincronizar()
+
+            self._estado["guardando"] = True
+            self._escribir_estado()
+            for mes in sorted(self._sucios):
+                self._escribir_mes(mes)
+            self._estado["guardando"] = False
+            self._estado["generacion"] += 1
+            self._escribir_estado()
+            self._vaciar_deltas()
+
+            # En memoria queda solo el mes más reciente, que es el que más se modifica
+            if self._meses:
+                ultimo = max(self._meses)
+                self._meses = {ultimo: self._meses[ultimo]}
+            self._sucios = set()
+            self._pendientes = {}
+            self._sin_guardar = 0
+
+    # -----------------------------
+    # LECTURA
+    # -----------------------------
+
+    def filas(self, desde=None, hasta=None, cuenta_id=None):
+        """
+        Filas del resumen (diccionarios con CAMPOS) de los días en
+        [desde, hasta), ordenadas por día y cuenta. desde/hasta tienen que
+        caer al comienzo de un día (ver dia_exacto).
+        """
+        desde = dia_exacto(desde) if desde is not None else None
+        hasta = dia_exacto(hasta) if hasta is not None else None
+
+        # Se arma la lista con los bloqueos tomados y se entrega después, para
+        # no frenar las escrituras mientras quien llama recorre las filas.
+        resultado = []
+        with self._bloqueado():
+            self._adoptar_disco()
+            self.sincronizar()
+            meses = sorted(self._meses_guardados() | set(self._meses))
+            for mes in meses:
+                if (desde is not None and mes < desde[:7]) or (hasta is not None and mes > hasta[:7]):
+                    continue
+                datos = self._meses[mes] if mes in self._meses else self._leer_mes(mes)
+                for (dia, cuenta), e in sorted(datos.items()):
+                    if desde is not None and dia < desde:
+                        continue
+                    if hasta is not None and dia >= hasta:
+                        continue
+                    if cuenta_id is not None and cuenta != cuenta_id:
+                        continue
+                    resultado.append({"dia": dia, "cuenta_id": cuenta, **e})
+        yield from resultado
+
+    def totales(self, desde=None, hasta=None):
+        """
+        Totales por día de todas las cuentas, como TotalesDiarios (arreglos
+        de NumPy), para Estadisticas y Visualizador.
+        """
+        # Import diferido: NumPy solo hace falta para los reportes
+        from analytics.columnas import TotalesDiarios
+
+        por_dia = {}
+        for fila in self.filas(desde, hasta):
+            t = por_dia.get(fila["dia"])
+            if t is None:
+                t = por_dia[fila["dia"]] = dict(fila)
+                continue
+            for campo in CAMPOS[2:7]:
+                t[campo] += fila[campo]
+            for campo, elegir in (("minimo", min), ("maximo", max)):
+                if fila[campo] is not None:
+                    t[campo] = fila[campo] if t[campo] is None else elegir(t[campo], fila[campo])
+
+        return TotalesDiarios.desde_filas(por_dia[dia] for dia in sorted(por_dia))
+
+    @staticmethod
+    def cubre(desde=None, hasta=None):
+        """
+        True si el rango [desde, hasta) se puede responder con el resumen
+        (los dos extremos caen al comienzo de un día).
+        """
+        return all(f is None or dia_exacto(f) is not None for f in (desde, hasta))
+
+
+if __name__ == "__main__":
+    resumen = ResumenDiario()
+    resumen.reconstruir()
+    print(f"Resumen diario recalculado en {resumen.directorio}/")
@@ -0,0 +1,359 @@
+import os
+import sqlite3
+import threading
+from domain.cuenta import Cuenta
+from domain.cliente import Cliente
+from domain.administrador import Administrador
+from repositories.filtros import como_conjunto, como_fecha_iso
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS usuarios (
+    dui       TEXT PRIMARY KEY,
+    nombres   TEXT NOT NULL,
+    apellidos TEXT NOT NULL,
+    pin       TEXT NOT NULL,
+    rol       TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS cuentas (
+    numero     TEXT PRIMARY KEY,
+    cliente_id TEXT NOT NULL,
+    tipo       TEXT NOT NULL,
+    saldo      REAL NOT NULL,
+    activa     INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cuentas_cliente ON cuentas (cliente_id);
+
+CREATE TABLE IF NOT EXISTS transacciones (
+    id        TEXT PRIMARY KEY,
+    cuenta_id TEXT NOT NULL,
+    tipo      TEXT NOT NULL,
+    monto     REAL NOT NULL,
+    fecha     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transacciones_cuenta ON transacciones (cuenta_id);
+CREATE INDEX IF NOT EXISTS idx_transacciones_fecha ON transacciones (fecha);
+
+CREATE TABLE IF NOT EXISTS transferencias (
+    id               TEXT PRIMARY KEY,
+    cuenta_origen    TEXT NOT NULL,
+    cuenta_destino   TEXT NOT NULL,
+    tipo_cuenta      TEXT NOT NULL,
+    tipo_transaccion TEXT NOT NULL,
+    monto            REAL NOT NULL,
+    fecha            TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transferencias_fecha ON transferencias (fecha);
+"""
+
+# Tope de parámetros "?" por consulta (el límite histórico de SQLite es 999)
+MAX_PARAMETROS = 900
+
+
+def _filtros_sql(columnas_cuenta, columna_tipo, cuenta_id, tipo, desde, hasta):
+    """
+    Traduce los filtros de iter_todas a una cláusula WHERE con parámetros.
+    """
+    condiciones = []
+    params = []
+
+    cuentas = como_conjunto(cuenta_id)
+    if cuentas is not None:
+        marcas = ", ".join("?" * len(cuentas))
+        condiciones.append("(" + " OR ".join(f"{col} IN ({marcas})" for col in columnas_cuenta) + ")")
+        for _ in columnas_cuenta:
+            params.extend(cuentas)
+
+    tipos = como_conjunto(tipo)
+    if tipos is not None:
+        condiciones.append(f"{columna_tipo} IN ({', '.join('?' * len(tipos))})")
+        params.extend(tipos)
+
+    if desde is not None:
+        condiciones.append("fecha >= ?")
+        params.append(como_fecha_iso(desde))
+    if hasta is not None:
+        condiciones.append("fecha < ?")
+        params.append(como_fecha_iso(hasta))
+
+    where = " WHERE " + " AND ".join(condiciones) if condiciones else ""
+    return where, params
+
+
+def _abrir(db_path):
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class ConexionPorHilo:
+    """
+    Se usa como una conexión de sqlite3 (execute, executemany, `with conn:`)
+    pero cada hilo trabaja con su propia conexión a la misma base, abierta
+    la primera vez que la usa. Con una sola conexión compartida, las
+    transacciones de dos hilos (`with self.conn:`) se mezclarían: un hilo
+    podría confirmar o deshacer lo que escribió el otro. Entre conexiones
+    las escrituras las ordena SQLite (se espera hasta `timeout` segundos).
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def _conexion(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = _abrir(self.db_path)
+        return conn
+
+    def execute(self, *args):
+        return self._conexion().execute(*args)
+
+    def executemany(self, *args):
+        return self._conexion().executemany(*args)
+
+    def executescript(self, script):
+        return self._conexion().executescript(script)
+
+    def __enter__(self):
+        return self._conexion().__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._conexion().__exit__(exc_type, exc, tb)
+
+    def close(self):
+        """
+        Cierra la conexión del hilo que llama.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def conectar(db_path="data/banco.db"):
+    """
+    Abre la base SQLite en modo WAL y crea las tablas si no existen.
+    WAL permite que las lecturas no bloqueen a las escrituras.
+    Devuelve una ConexionPorHilo: los repositorios la pueden compartir
+    entre hilos.
+    """
+    carpeta = os.path.dirname(db_path)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+
+    conn = ConexionPorHilo(db_path)
+    conn.executescript(ESQUEMA)
+    return conn
+
+
+class SQLiteUsuarioRepo:
+    """
+    Versión SQLite de UsuarioRepo. Mismos métodos, mismos objetos de retorno.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    @staticmethod
+    def _a_usuario(row):
+        if row["rol"] == "cliente":
+            return Cliente(row["nombres"], row["apellidos"], row["dui"], row["pin"])
+        return Administrador(row["nombres"], row["apellidos"], row["dui"], row["pin"])
+
+    def cargar_todos(self):
+        rows = self.conn.execute("SELECT * FROM usuarios ORDER BY rowid")
+        return [self._a_usuario(r) for r in rows]
+
+    def guardar_todos(self, usuarios):
+        with self.conn:
+            self.conn.execute("DELETE FROM usuarios")
+            self.conn.executemany(
+                "INSERT INTO usuarios (nombres, apellidos, dui, pin, rol) "
+                "VALUES (:nombres, :apellidos, :dui, :pin, :rol)",
+                [u.to_dict() for u in usuarios]
+            )
+
+    def agregar(self, usuario):
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO usuarios (nombres, apellidos, dui, pin, rol) "
+                "VALUES (:nombres, :apellidos, :dui, :pin, :rol)",
+                usuario.to_dict()
+            )
+
+    def buscar_por_dui(self, dui):
+        row = self.conn.execute("SELECT * FROM usuarios WHERE dui = ?", (dui,)).fetchone()
+        return self._a_usuario(row) if row else None
+
+
+class SQLiteCuentaRepo:
+    """
+    Versión SQLite de CuentaRepo.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    @staticmethod
+    def _a_cuenta(row):
+        return Cuenta(
+            numero=row["numero"],
+            cliente_id=row["cliente_id"],
+            tipo=row["tipo"],
+            saldo_inicial=row["saldo"],
+            activa=bool(row["activa"])
+        )
+
+    def cargar_todas(self):
+        rows = self.conn.execute("SELECT * FROM cuentas ORDER BY rowid")
+        return [self._a_cuenta(r) for r in rows]
+
+    def guardar_todas(self, cuentas):
+        with self.conn:
+            self.conn.execute("DELETE FROM cuentas")
+            self.conn.executemany(
+                "INSERT INTO cuentas (numero, cliente_id, tipo, saldo, activa) "
+                "VALUES (:numero, :cliente_id, :tipo, :saldo, :activa)",
+                [c.to_dict() for c in cuentas]
+            )
+
+    def agregar(self, cuenta):
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO cuentas (numero, cliente_id, tipo, saldo, activa) "
+                "VALUES (:numero, :cliente_id, :tipo, :saldo, :activa)",
+                cuenta.to_dict()
+            )
+
+    def obtener_por_numero(self, numero):
+        row = self.conn.execute("SELECT * FROM cuentas WHERE numero = ?", (numero,)).fetchone()
+        return self._a_cuenta(row) if row else None
+
+    def obtener_varias(self, numeros):
+        numeros = list(set(numeros))
+        encontradas = {}
+        # SQLite limita la cantidad de parámetros por consulta
+        for i in range(0, len(numeros), MAX_PARAMETROS):
+            tramo = numeros[i:i + MAX_PARAMETROS]
+            rows = self.conn.execute(
+                f"SELECT * FROM cuentas WHERE numero IN ({', '.join('?' * len(tramo))})", tramo
+            )
+            for r in rows:
+                encontradas[r["numero"]] = self._a_cuenta(r)
+        return encontradas
+
+    def obtener_por_cliente(self, cliente_id):
+        rows = self.conn.execute("SELECT * FROM cuentas WHERE cliente_id = ? ORDER BY rowid", (cliente_id,))
+        return [self._a_cuenta(r) for r in rows]
+
+    def actualizar(self, cuenta_actualizada):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE cuentas SET cliente_id = :cliente_id, tipo = :tipo, saldo = :saldo, activa = :activa "
+                "WHERE numero = :numero",
+                cuenta_actualizada.to_dict()
+            )
+
+    def actualizar_varias(self, cuentas_actualizadas):
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE cuentas SET cliente_id = :cliente_id, tipo = :tipo, saldo = :saldo, activa = :activa "
+                "WHERE numero = :numero",
+                [c.to_dict() for c in cuentas_actualizadas]
+            )
+
+
+class SQLiteTransaccionRepo:
+    """
+    Versión SQLite de TransaccionRepo. Devuelve diccionarios, igual que la de CSV.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def iter_todas(self, cuenta_id=None, tipo=None, desde=None, hasta=None):
+        where, params = _filtros_sql(["cuenta_id"], "tipo", cuenta_id, tipo, desde, hasta)
+        rows = self.conn.execute(
+            f"SELECT id, cuenta_id, tipo, monto, fecha FROM transacciones{where} ORDER BY rowid",
+            params
+        )
+        for r in rows:
+            yield dict(r)
+
+    def iter_por_cuenta(self, cuenta_id, **filtros):
+        return self.iter_todas(cuenta_id=cuenta_id, **filtros)
+
+    def obtener_todas(self):
+        return list(self.iter_todas())
+
+    def obtener_por_cuenta(self, cuenta_id):
+        return list(self.iter_por_cuenta(cuenta_id))
+
+    def obtener_por_id(self, transaccion_id):
+        r = self.conn.execute(
+            "SELECT id, cuenta_id, tipo, monto, fecha FROM transacciones WHERE id = ?",
+            (transaccion_id,)
+        ).fetchone()
+        return dict(r) if r else None
+
+    def guardar(self, transaccion):
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO transacciones (id, cuenta_id, tipo, monto, fecha) "
+                "VALUES (:id, :cuenta_id, :tipo, :monto, :fecha)",
+                transaccion.to_dict()
+            )
+
+    def guardar_varias(self, transacciones):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO transacciones (id, cuenta_id, tipo, monto, fecha) "
+                "VALUES (:id, :cuenta_id, :tipo, :monto, :fecha)",
+                [t.to_dict() for t in transacciones]
+            )
+
+
+class SQLiteTransferenciaRepo:
+    """
+    Versión SQLite de TransferenciaRepo.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def iter_todas(self, cuenta_id=None, tipo=None, desde=None, hasta=None):
+        where, params = _filtros_sql(
+            ["cuenta_origen", "cuenta_destino"], "tipo_transaccion", cuenta_id, tipo, desde, hasta
+        )
+        rows = self.conn.execute(
+            "SELECT id, cuenta_origen, cuenta_destino, tipo_cuenta, tipo_transaccion, monto, fecha "
+            f"FROM transferencias{where} ORDER BY rowid",
+            params
+        )
+        for r in rows:
+            yield dict(r)
+
+    def iter_por_cuenta(self, cuenta_id, **filtros):
+        return self.iter_todas(cuenta_id=cuenta_id, **filtros)
+
+    def obtener_todas(self):
+        return list(self.iter_todas())
+
+    def guardar(self, transferencia):
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO transferencias (id, cuenta_origen, cuenta_destino, tipo_cuenta, tipo_transaccion, monto, fecha) "
+                "VALUES (:id, :cuenta_origen, :cuenta_destino, :tipo_cuenta, :tipo_transaccion, :monto, :fecha)",
+                transferencia.to_dict()
+            )
+
+    def guardar_varias(self, transferencias):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO transferencias (id, cuenta_origen, cuenta_destino, tipo_cuenta, tipo_transaccion, monto, fecha) "
+                "VALUES (:id, :cuenta_origen, :cuenta_destino, :tipo_cuenta, :tipo_transaccion, :monto, :fecha)",
+                [t.to_dict() for t in transferencias]
+            )
@@ -1,6 +1,21 @@
 import csv
+import heapq
 import os
+from datetime import datetime
+from repositories.escritor_buffer import EscritorBuffer, serializar_fila
+from repositories.indice_cuentas import IndiceCuentas
+from repositories.agregados_globales import AgregadosGlobales
+from repositories.resumen_diario import ResumenDiario
+from repositories.cache_archivos import cache_global
+from repositories.bloqueos import bloqueo_archivo
+from repositories.registro_redo import fsync_ruta
+from repositories.filtros import como_conjunto, como_fecha_iso, en_rango
+from repositories.filas_desordenadas import VENTANA_DESFASE_MS, FilasDesordenadas
 from domain.transaccion import Transaccion
+from domain.compacto import TransaccionCompacta
+from domain.identificadores import ms_de_id
+
+CAMPOS = ["id", "cuenta_id", "tipo", "monto", "fecha"]
 
 
 class TransaccionRepo:
@@ -10,10 +25,48 @@ class TransaccionRepo:
     - Devuelve diccionarios, no objetos, porque Estadisticas.py trabaja con dicts.
     """
 
-    def __init__(self, filepath="data/transacciones.csv"):
+    def __init__(self, filepath="data/transacciones.csv", buffer=False, indice=False, columnar=False,
+                 agregados=False, resumen_diario=False, **opciones_buffer):
+        """
+        buffer=True activa el modo de escritura en grupo: las filas se acumulan
+        en un EscritorBuffer y se escriben juntas. `opciones_buffer` se pasa tal
+        cual al escritor (max_filas, max_bytes, max_latencia, fsync).
+
+        indice=True mantiene un índice por cuenta_id (IndiceCuentas) para que las
+        consultas de una cuenta lean solo sus filas.
+
+        columnar=True mantiene además una copia binaria por columnas
+        (AlmacenColumnar) sincronizada en cada escritura, para análisis con NumPy.
+
+        agregados=True mantiene las estadísticas globales (AgregadosGlobales)
+        al día con cada escritura (se guardan en asegurar_en_disco y en cerrar).
+
+        resumen_diario=True mantiene la tabla de totales por día y por cuenta
+        (ResumenDiario) al día con cada escritura.
+        """
         self.filepath = filepath
         self._asegurar_archivo()
 
+        self.indice = IndiceCuentas(self.filepath) if indice else None
+        self.desordenadas = FilasDesordenadas(self.filepath)
+
+        self.columnar = None
+        if columnar:
+            # Import diferido: NumPy solo hace falta si se usa el almacén columnar
+            from repositories.almacen_columnar import AlmacenColumnar
+            self.columnar = AlmacenColumnar(self.filepath)
+
+        self.agregados = AgregadosGlobales(self.filepath) if agregados else None
+        self.resumen_diario = ResumenDiario(self.filepath) if resumen_diario else None
+
+        self._escritor = None
+        if buffer:
+            self._escritor = EscritorBuffer(
+                self.filepath, CAMPOS,
+                al_vaciar=self._despues_de_escribir,
+                **opciones_buffer
+            )
+
     def _asegurar_archivo(self):
         """
         Crea el archivo CSV si no existe.
@@ -23,40 +76,367 @@ class TransaccionRepo:
             with open(self.filepath, "w", newline="", encoding="utf-8") as f:
                 writer = csv.DictWriter(
                     f,
-                    fieldnames=["id", "cuenta_id", "tipo", "monto", "fecha"]
+                    fieldnames=CAMPOS
                 )
                 writer.writeheader()
 
+    @staticmethod
+    def _a_dict(row):
+        return {
+            "id": row["id"],
+            "cuenta_id": row["cuenta_id"],
+            "tipo": row["tipo"],
+            "monto": float(row["monto"]),
+            "fecha": row["fecha"]
+        }
+
+    @staticmethod
+    def _parsear(ruta):
+        with open(ruta, "r", newline="", encoding="utf-8") as f:
+            return [TransaccionRepo._a_dict(row) for row in csv.DictReader(f)]
+
+    def iter_todas(self, cuenta_id=None, tipo=None, desde=None, hasta=None):
+        """
+        Recorre las transacciones de a una, sin cargar el archivo en memoria
+        (salvo que el archivo entre en el cache compartido de parseo).
+        Filtros opcionales, aplicados mientras se lee:
+        - cuenta_id: un número de cuenta o una colección de números
+        - tipo: un tipo o una colección de tipos
+        - desde / hasta: date, datetime o texto ISO (desde inclusivo, hasta exclusivo)
+        """
+        cuentas = como_conjunto(cuenta_id)
+        tipos = como_conjunto(tipo)
+        desde = como_fecha_iso(desde)
+        hasta = como_fecha_iso(hasta)
+
+        self.flush()
+        for row in self._filas(cuentas, desde, hasta):
+            if cuentas is not None and row["cuenta_id"] not in cuentas:
+                continue
+            if tipos is not None and row["tipo"] not in tipos:
+                continue
+            if not en_rango(row["fecha"], desde, hasta):
+                continue
+            yield self._a_dict(row)
+
+    def _filas(self, cuentas, desde=None, hasta=None):
+        """
+        Filas crudas del CSV. Con índice y filtro por cuenta, solo se leen las
+        filas de esas cuentas (en el orden en que aparecen en el archivo).
+        Con rango de fechas y el archivo fuera del cache, se salta la parte del
+        archivo que queda fuera del rango (ver _filas_por_tiempo).
+        """
+        if self.indice is not None and cuentas is not None:
+            offsets = sorted(o for c in cuentas for o in self.indice.offsets(c))
+            yield from self.indice.leer_filas(offsets)
+            return
+
+        filas = cache_global.obtener(self.filepath, self._parsear)
+        if filas is not None:
+            yield from filas
+            return
+
+        if desde is not None or hasta is not None:
+            yield from self._filas_por_tiempo(desde, hasta)
+            return
+
+        with open(self.filepath, "r", newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+
+    def iter_por_cuenta(self, cuenta_id, **filtros):
+        """
+        Recorre las transacciones de una cuenta (acepta los mismos filtros que iter_todas).
+        """
+        return self.iter_todas(cuenta_id=cuenta_id, **filtros)
+
     def obtener_todas(self):
         """
         Devuelve todas las transacciones como diccionarios.
         """
-        trans = []
-        with open(self.filepath, "r", newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                trans.append({
-                    "id": row["id"],
-                    "cuenta_id": row["cuenta_id"],
-                    "tipo": row["tipo"],
-                    "monto": float(row["monto"]),
-                    "fecha": row["fecha"]
-                })
-        return trans
+        return list(self.iter_todas())
 
     def obtener_por_cuenta(self, cuenta_id):
         """
         Devuelve todas las transacciones asociadas a una cuenta.
         """
-        return [t for t in self.obtener_todas() if t["cuenta_id"] == cuenta_id]
+        return list(self.iter_por_cuenta(cuenta_id))
+
+    def iter_compactas(self, **filtros):
+        """
+        Igual que iter_todas, pero devuelve TransaccionCompacta (millonésimas,
+        fecha en microsegundos, id en 16 bytes) para tener millones en memoria.
+        """
+        for t in self.iter_todas(**filtros):
+            yield TransaccionCompacta.desde_dict(t)
+
+    # -----------------------------
+    # BÚSQUEDA POR ID Y POR TIEMPO
+    # -----------------------------
+    #
+    # Las filas con ids de domain.identificadores están (casi) ordenadas por
+    # el instante que llevan en el id, así que se puede buscar en el archivo
+    # por bisección sin leerlo entero. Las filas con ids viejos (uuid4) quedan
+    # al principio del archivo y se recorren de punta a punta. Las que rompen
+    # ese orden (ver FilasDesordenadas) se saltean en la bisección y se leen
+    # aparte, por offset.
+
+    def obtener_por_id(self, transaccion_id):
+        """
+        Busca una transacción por id. Devuelve el diccionario o None.
+        Para ids ordenables lee solo las filas de ±VENTANA_DESFASE_MS
+        alrededor del instante del id, más las filas desordenadas.
+        """
+        self.flush()
+        prefijo = (transaccion_id + ",").encode("utf-8")
+        ms = ms_de_id(transaccion_id)
+        desordenadas, revisado = self.desordenadas.sincronizar()
+        saltar = set(desordenadas)
+
+        with open(self.filepath, "rb") as f:
+            encabezado, inicio, ordenadas, fin = self._regiones(f, revisado, saltar)
+            if ms is None:
+                lineas = self._lineas(f, inicio, ordenadas)
+            else:
+                desde = self._bisectar(f, ordenadas, fin, ms - VENTANA_DESFASE_MS, saltar)
+                lineas = self._lineas(f, desde, fin, hasta_ms=ms + VENTANA_DESFASE_MS, saltar=saltar)
+
+            for _, linea in lineas:
+                if linea.startswith(prefijo):
+                    return self._a_dict(self._leer_linea(encabezado, linea))
+        for _, linea in self._lineas_en(desordenadas):
+            if linea.startswith(prefijo):
+                return self._a_dict(self._leer_linea(encabezado, linea))
+        return None
+
+    def _filas_por_tiempo(self, desde, hasta):
+        """
+        Filas crudas que pueden caer en [desde, hasta): todas las de ids viejos,
+        de las ordenables solo el tramo que corresponde según el id, y todas
+        las desordenadas (en el orden del archivo). El filtro exacto por fecha
+        lo sigue haciendo iter_todas.
+        """
+        desde_ms = self._a_ms(desde)
+        hasta_ms = self._a_ms(hasta)
+        desordenadas, revisado = self.desordenadas.sincronizar()
+        saltar = set(desordenadas)
+
+        with open(self.filepath, "rb") as f:
+            encabezado, inicio, ordenadas, fin = self._regiones(f, revisado, saltar)
+            campos = next(csv.reader([encabezado.decode("utf-8")]))
+
+            lineas = (linea for _, linea in self._lineas(f, inicio, ordenadas))
+            for valores in csv.reader(l.decode("utf-8") for l in lineas):
+                if valores:   # DictReader también salta las líneas vacías
+                    yield dict(zip(campos, valores))
+
+            if desde_ms is not None:
+                ordenadas = self._bisectar(f, ordenadas, fin, desde_ms - VENTANA_DESFASE_MS, saltar)
+            tope = hasta_ms + VENTANA_DESFASE_MS if hasta_ms is not None else None
+
+            tramo = self._lineas(f, ordenadas, fin, hasta_ms=tope, saltar=saltar)
+            lineas = (linea for _, linea in heapq.merge(tramo, self._lineas_en(desordenadas)))
+            for valores in csv.reader(l.decode("utf-8") for l in lineas):
+                if valores:   # DictReader también salta las líneas vacías
+                    yield dict(zip(campos, valores))
+
+    @staticmethod
+    def _a_ms(fecha_iso):
+        # Las fechas del CSV son locales, igual que timestamp() de una fecha sin zona
+        if fecha_iso is None:
+            return None
+        return int(datetime.fromisoformat(fecha_iso).timestamp() * 1000)
+
+    @staticmethod
+    def _ms_de_linea(linea):
+        return ms_de_id(linea.split(b",", 1)[0].decode("utf-8", "replace"))
+
+    @staticmethod
+    def _leer_linea(encabezado, linea):
+        campos = next(csv.reader([encabezado.decode("utf-8")]))
+        return dict(zip(campos, next(csv.reader([linea.decode("utf-8")]))))
+
+    def _regiones(self, f, fin, saltar):
+        """
+        (encabezado, inicio de los datos, inicio de las filas con id ordenable, fin).
+        `fin` es hasta dónde están revisadas las filas desordenadas.
+        """
+        encabezado = f.readline()
+        inicio = f.tell()
+        ordenadas = self._bisectar(f, inicio, fin, None, saltar)
+        return encabezado, inicio, ordenadas, fin
+
+    def _bisectar(self, f, lo, hi, ms, saltar=frozenset()):
+        """
+        Offset de la primera fila en [lo, hi) cuyo id tiene instante >= ms.
+        Con ms=None, la primera fila con id ordenable. Las filas de `saltar`
+        (desordenadas) cuentan como posteriores: a lo sumo se lee de más.
+        """
+        while lo < hi:
+            medio = (lo + hi) // 2
+            # Primera línea que empieza en medio o después
+            f.seek(medio - 1)
+            f.readline()
+            linea_inicio = f.tell()
+            if linea_inicio >= hi:
+                hi = medio
+                continue
+
+            linea = f.readline()
+            if not linea.endswith(b"\n") or linea_inicio in saltar:
+                antes = False   # fila a medio escribir (es la última) o desordenada
+            elif ms is None:
+                antes = self._ms_de_linea(linea) is None
+            else:
+                clave = self._ms_de_linea(linea)
+                antes = clave is not None and clave < ms
+
+            if antes:
+                lo = linea_inicio + len(linea)
+            else:
+                hi = medio
+        return lo
+
+    def _lineas(self, f, desde, hasta, hasta_ms=None, saltar=frozenset()):
+        """
+        (offset, línea) de las líneas completas entre los offsets dados, sin
+        las de `saltar`. Con hasta_ms, corta en la primera fila ordenable
+        (en orden) con instante mayor.
+        """
+        f.seek(desde)
+        posicion = desde
+        while posicion < hasta:
+            linea = f.readline()
+            if not linea.endswith(b"\n"):
+                return   # fila a medio escribir por otro proceso
+            inicio, posicion = posicion, posicion + len(linea)
+            if inicio in saltar:
+                continue
+            if hasta_ms is not None:
+                clave = self._ms_de_linea(linea)
+                if clave is not None and clave > hasta_ms:
+                    return
+            yield inicio, linea
+
+    def _lineas_en(self, offsets):
+        """
+        (offset, línea) de las filas que empiezan en los offsets dados (en orden).
+        """
+        if not offsets:
+            return
+        with open(self.filepath, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                yield offset, f.readline()
 
     def guardar(self, transaccion: Transaccion):
         """
         Guarda una transacción generada por BankService.
         """
-        with open(self.filepath, "a", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(
-                f,
-                fieldnames=["id", "cuenta_id", "tipo", "monto", "fecha"]
-            )
-            writer.writerow(transaccion.to_dict())
+        if self._escritor:
+            self._escritor.escribir(transaccion.to_dict())
+            return
+
+        with bloqueo_archivo(self.filepath):
+            if self._mantiene_derivados():
+                # Se escribe en binario para conocer el offset exacto de la fila
+                fila = transaccion.to_dict()
+                datos = serializar_fila(fila, CAMPOS)
+                with open(self.filepath, "ab") as f:
+                    offset = os.fstat(f.fileno()).st_size
+                    f.write(datos)
+                self._despues_de_escribir([(fila, offset, len(datos))])
+                return
+
+            with open(self.filepath, "a", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(
+                    f,
+                    fieldnames=CAMPOS
+                )
+                writer.writerow(transaccion.to_dict())
+
+            cache_global.invalidar(self.filepath)
+
+    def guardar_varias(self, transacciones):
+        """
+        Guarda varias transacciones con una sola escritura al archivo.
+        """
+        filas = [t.to_dict() for t in transacciones]
+        if not filas:
+            return
+
+        if self._escritor:
+            for fila in filas:
+                self._escritor.escribir(fila)
+            return
+
+        datos = [serializar_fila(fila, CAMPOS) for fila in filas]
+        with bloqueo_archivo(self.filepath):
+            with open(self.filepath, "ab") as f:
+                offset = os.fstat(f.fileno()).st_size
+                f.write(b"".join(datos))
+
+            escritas = []
+            for fila, d in zip(filas, datos):
+                escritas.append((fila, offset, len(d)))
+                offset += len(d)
+            self._despues_de_escribir(escritas)
+
+    def _mantiene_derivados(self):
+        return any(d is not None for d in (self.indice, self.columnar, self.agregados, self.resumen_diario))
+
+    def _despues_de_escribir(self, escritas):
+        """
+        Mantiene al día las estructuras derivadas del CSV (índice, almacén
+        columnar, agregados, resumen diario). `escritas` es una lista de
+        (fila, offset, largo).
+        """
+        cache_global.invalidar(self.filepath)
+        if self.indice is not None:
+            self.indice.registrar([(fila["cuenta_id"], offset, largo) for fila, offset, largo in escritas])
+        if self.columnar is not None:
+            self.columnar.sincronizar()
+        if self.agregados is not None:
+            self.agregados.registrar(escritas)
+        if self.resumen_diario is not None:
+            self.resumen_diario.registrar(escritas)
+
+    # -----------------------------
+    # MODO BUFFER
+    # -----------------------------
+
+    def flush(self):
+        """
+        Escribe en disco las filas pendientes del buffer (si está activo).
+        """
+        if self._escritor:
+            self._escritor.flush()
+
+    def asegurar_en_disco(self):
+        """
+        Vacía el buffer y hace fsync del archivo. Los agregados y el resumen
+        diario se guardan en el mismo momento (checkpoint del registro de
+        intenciones).
+        """
+        self.flush()
+        with bloqueo_archivo(self.filepath):
+            fsync_ruta(self.filepath)
+            if self.agregados is not None:
+                self.agregados.guardar()
+            if self.resumen_diario is not None:
+                self.resumen_diario.guardar()
+
+    def cerrar(self):
+        if self._escritor:
+            self._escritor.cerrar()
+        # Lo que los agregados y el resumen acumularon desde el último checkpoint
+        if self.agregados is not None:
+            self.agregados.guardar()
+        if self.resumen_diario is not None:
+            self.resumen_diario.guardar()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cerrar()
+        return False
@@ -0,0 +1,299 @@
+import csv
+import json
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+from domain.identificadores import ms_de_id
+from domain.transaccion import Transaccion
+from repositories.bloqueos import bloqueo_archivo
+from repositories.filtros import como_conjunto, como_fecha_iso, en_rango
+from repositories.transaccion_repo import CAMPOS, VENTANA_DESFASE_MS, TransaccionRepo
+from repositories.cache_archivos import cache_global
+from repositories.registro_redo import fsync_ruta
+
+GRANULARIDADES = {
+    "dia": 10,   # "2026-02-20"
+    "mes": 7,    # "2026-02"
+}
+
+
+class TransaccionRepoParticionado:
+    """
+    Variante de TransaccionRepo que guarda las transacciones en un segmento
+    por día o por mes dentro de una carpeta (data/transacciones/2026-02.csv, ...).
+
+    Un manifest.json guarda, para cada segmento, la fecha mínima, la máxima y
+    la cantidad de filas. Las lecturas con rango de fechas abren solo los
+    segmentos que se superponen con ese rango.
+
+    Los métodos y el formato de retorno (diccionarios) son los mismos que en
+    TransaccionRepo.
+
+    Varios procesos pueden compartir la carpeta: cada escritura toma el
+    bloqueo del manifest, lo vuelve a leer de disco, agrega sus filas y lo
+    guarda; las lecturas lo vuelven a leer si cambió desde la última vez.
+    """
+
+    def __init__(self, directorio="data/transacciones", granularidad="mes"):
+        if granularidad not in GRANULARIDADES:
+            raise ValueError(f"Granularidad inválida: {granularidad}")
+
+        self.directorio = directorio
+        self.granularidad = granularidad
+        self.manifest_path = os.path.join(directorio, "manifest.json")
+
+        os.makedirs(directorio, exist_ok=True)
+        self._manifest = {}
+        self._firma = None   # del manifest.json que está en memoria
+        self._refrescar()
+
+    # -----------------------------
+    # MANIFEST
+    # -----------------------------
+
+    def _cargar_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            datos = json.load(f)
+
+        if datos.get("granularidad") != self.granularidad:
+            raise ValueError(
+                f"La carpeta {self.directorio} está particionada por '{datos.get('granularidad')}', "
+                f"no por '{self.granularidad}'"
+            )
+        return datos["segmentos"]
+
+    def _firma_manifest(self):
+        try:
+            st = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _refrescar(self):
+        """
+        Vuelve a leer el manifest si otro proceso (u otra instancia) lo
+        cambió. Se llama con el bloqueo tomado o lo toma.
+        """
+        with bloqueo_archivo(self.manifest_path):
+            firma = self._firma_manifest()
+            if firma != self._firma:
+                self._manifest = self._cargar_manifest()
+                self._firma = firma
+
+    def _guardar_manifest(self):
+        tmp = f"{self.manifest_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"granularidad": self.granularidad, "segmentos": self._manifest}, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+        self._firma = self._firma_manifest()
+
+    def reconstruir_manifest(self):
+        """
+        Vuelve a calcular el manifest leyendo todos los segmentos.
+        Útil si algún segmento se editó a mano.
+        """
+        with bloqueo_archivo(self.manifest_path):
+            self._manifest = {}
+            for nombre in sorted(os.listdir(self.directorio)):
+                if not nombre.endswith(".csv"):
+                    continue
+                segmento = nombre[:-4]
+                with open(self._ruta(segmento), "r", newline="", encoding="utf-8") as f:
+                    for row in csv.DictReader(f):
+                        self._anotar(segmento, row["fecha"])
+            self._guardar_manifest()
+
+    def _anotar(self, segmento, fecha):
+        info = self._manifest.get(segmento)
+        if info is None:
+            self._manifest[segmento] = {"min": fecha, "max": fecha, "filas": 1}
+            return
+        info["min"] = min(info["min"], fecha)
+        info["max"] = max(info["max"], fecha)
+        info["filas"] += 1
+
+    def segmentos(self, desde=None, hasta=None):
+        """
+        Nombres de los segmentos que pueden tener filas en [desde, hasta), en orden.
+        """
+        desde = como_fecha_iso(desde)
+        hasta = como_fecha_iso(hasta)
+        self._refrescar()
+        return [
+            segmento for segmento, info in sorted(self._manifest.items())
+            if not (desde is not None and info["max"] < desde)
+            and not (hasta is not None and info["min"] >= hasta)
+        ]
+
+    # -----------------------------
+    # ESCRITURA
+    # -----------------------------
+
+    def _ruta(self, segmento):
+        return os.path.join(self.directorio, segmento + ".csv")
+
+    def _segmento_de(self, fecha):
+        return fecha[:GRANULARIDADES[self.granularidad]]
+
+    def _escribir(self, filas):
+        """
+        Agrega filas (dicts) a sus segmentos y actualiza el manifest una sola
+        vez. Con el bloqueo del manifest: parte del que está en disco, así no
+        se pierden las filas que anotó otro proceso.
+        """
+        por_segmento = {}
+        for fila in filas:
+            por_segmento.setdefault(self._segmento_de(fila["fecha"]), []).append(fila)
+        if not por_segmento:
+            return
+
+        with bloqueo_archivo(self.manifest_path):
+            self._refrescar()
+            for segmento, filas_segmento in por_segmento.items():
+                ruta = self._ruta(segmento)
+                nuevo = not os.path.exists(ruta)
+                with open(ruta, "a", newline="", encoding="utf-8") as f:
+                    writer = csv.DictWriter(f, fieldnames=CAMPOS)
+                    if nuevo:
+                        writer.writeheader()
+                    for fila in filas_segmento:
+                        writer.writerow(fila)
+                        self._anotar(segmento, fila["fecha"])
+                cache_global.invalidar(ruta)
+
+            self._guardar_manifest()
+
+    def guardar(self, transaccion: Transaccion):
+        """
+        Guarda una transacción en el segmento que le corresponde por fecha.
+        """
+        self._escribir([transaccion.to_dict()])
+
+    def guardar_varias(self, transacciones):
+        """
+        Guarda varias transacciones: una escritura por segmento y un solo
+        guardado del manifest.
+        """
+        self._escribir(t.to_dict() for t in transacciones)
+
+    def importar(self, csv_path="data/transacciones.csv"):
+        """
+        Reparte un transacciones.csv de un solo archivo en segmentos.
+        Pensado para correrse una vez sobre una carpeta vacía.
+        """
+        self._escribir(TransaccionRepo(csv_path).iter_todas())
+
+    def asegurar_en_disco(self):
+        """
+        fsync de todos los segmentos, del manifest y de la carpeta.
+        """
+        with bloqueo_archivo(self.manifest_path):
+            self._refrescar()
+            for segmento in self._manifest:
+                fsync_ruta(self._ruta(segmento))
+            fsync_ruta(self.manifest_path)
+            fsync_ruta(self.directorio)
+
+    def flush(self):
+        """
+        No hay buffer: cada escritura ya llega al archivo. Está para poder
+        usarse donde se usa TransaccionRepo (por ejemplo, RegistroRedo).
+        """
+
+    def cerrar(self):
+        """
+        No hay nada que cerrar; igual que flush().
+        """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cerrar()
+        return False
+
+    # -----------------------------
+    # LECTURA
+    # -----------------------------
+
+    def iter_todas(self, cuenta_id=None, tipo=None, desde=None, hasta=None):
+        """
+        Igual que TransaccionRepo.iter_todas, pero solo abre los segmentos
+        cuyo rango de fechas se cruza con [desde, hasta).
+        """
+        cuentas = como_conjunto(cuenta_id)
+        tipos = como_conjunto(tipo)
+        desde = como_fecha_iso(desde)
+        hasta = como_fecha_iso(hasta)
+
+        for segmento in self.segmentos(desde, hasta):
+            for row in self._filas(segmento):
+                if cuentas is not None and row["cuenta_id"] not in cuentas:
+                    continue
+                if tipos is not None and row["tipo"] not in tipos:
+                    continue
+                if not en_rango(row["fecha"], desde, hasta):
+                    continue
+                yield TransaccionRepo._a_dict(row)
+
+    def _filas(self, segmento):
+        """
+        Filas de un segmento. Los segmentos viejos ya no cambian, así que casi
+        siempre salen del cache compartido.
+        """
+        ruta = self._ruta(segmento)
+        filas = cache_global.obtener(ruta, TransaccionRepo._parsear)
+        if filas is not None:
+            yield from filas
+            return
+
+        with open(ruta, "r", newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+
+    def iter_por_cuenta(self, cuenta_id, **filtros):
+        return self.iter_todas(cuenta_id=cuenta_id, **filtros)
+
+    def obtener_todas(self):
+        return list(self.iter_todas())
+
+    def obtener_por_cuenta(self, cuenta_id):
+        return list(self.iter_por_cuenta(cuenta_id))
+
+    def obtener_por_id(self, transaccion_id):
+        """
+        Busca una transacción por id. Devuelve el diccionario o None.
+        Para ids ordenables (domain.identificadores) abre solo los segmentos
+        de ±VENTANA_DESFASE_MS alrededor del instante del id (la fecha de la
+        fila es la hora local del mismo momento); para ids viejos, todos.
+        Si no está ahí (una fila con fecha que no corresponde al id, cargada
+        o corregida a mano), se buscan en el resto de los segmentos.
+        """
+        ms = ms_de_id(transaccion_id)
+        desde = hasta = None
+        if ms is not None:
+            instante = datetime.fromtimestamp(ms / 1000)
+            desde = instante - timedelta(milliseconds=VENTANA_DESFASE_MS)
+            hasta = instante + timedelta(milliseconds=VENTANA_DESFASE_MS)
+
+        revisados = set()
+        for segmentos in (self.segmentos(desde, hasta), self.segmentos()):
+            for segmento in segmentos:
+                if segmento in revisados:
+                    continue
+                revisados.add(segmento)
+                for row in self._filas(segmento):
+                    if row["id"] == transaccion_id:
+                        return TransaccionRepo._a_dict(row)
+        return None
+
+
+if __name__ == "__main__":
+    # Uso: python -m repositories.transaccion_repo_particionado [dia|mes]
+    repo = TransaccionRepoParticionado(granularidad=sys.argv[1] if len(sys.argv) > 1 else "mes")
+    repo.importar()
+    for segmento, info in sorted(repo._manifest.items()):
+        print(f"{segmento}: {info['filas']} filas ({info['min']} → {info['max']})")
@@ -1,7 +1,14 @@
 import csv
 import os
+from repositories.escritor_buffer import EscritorBuffer
+from repositories.filtros import como_conjunto, como_fecha_iso, en_rango
+from repositories.cache_archivos import cache_global
+from repositories.bloqueos import bloqueo_archivo
+from repositories.registro_redo import fsync_ruta
 from domain.transferencia import Transferencia
 
+CAMPOS = ["id", "cuenta_origen", "cuenta_destino", "tipo_cuenta", "tipo_transaccion", "monto", "fecha"]
+
 
 class TransferenciaRepo:
     """
@@ -9,9 +16,21 @@ class TransferenciaRepo:
     Devuelve diccionarios para compatibilidad con análisis.
     """
 
-    def __init__(self, filepath="data/transferencias.csv"):
+    def __init__(self, filepath="data/transferencias.csv", buffer=False, **opciones_buffer):
+        """
+        buffer=True activa el modo de escritura en grupo: las filas se acumulan
+        en un EscritorBuffer y se escriben juntas. `opciones_buffer` se pasa tal
+        cual al escritor (max_filas, max_bytes, max_latencia, fsync).
+        """
         self.filepath = filepath
         self._asegurar_archivo()
+        self._escritor = None
+        if buffer:
+            self._escritor = EscritorBuffer(
+                self.filepath, CAMPOS,
+                al_vaciar=lambda escritas: cache_global.invalidar(self.filepath),
+                **opciones_buffer
+            )
 
     def _asegurar_archivo(self):
         """
@@ -22,36 +41,139 @@ class TransferenciaRepo:
             with open(self.filepath, "w", newline="", encoding="utf-8") as f:
                 writer = csv.DictWriter(
                     f,
-                    fieldnames=["id", "cuenta_origen", "cuenta_destino","tipo_cuenta","tipo_transaccion", "monto", "fecha"]
+                    fieldnames=CAMPOS
                 )
                 writer.writeheader()
 
+    @staticmethod
+    def _a_dict(row):
+        return {
+            "id": row["id"],
+            "cuenta_origen": row["cuenta_origen"],
+            "cuenta_destino": row["cuenta_destino"],
+            "tipo_cuenta": row["tipo_cuenta"],
+            "tipo_transaccion": row["tipo_transaccion"],
+            "monto": float(row["monto"]),
+            "fecha": row["fecha"]
+        }
+
+    @staticmethod
+    def _parsear(ruta):
+        with open(ruta, "r", newline="", encoding="utf-8") as f:
+            return [TransferenciaRepo._a_dict(row) for row in csv.DictReader(f)]
+
+    def _filas(self):
+        filas = cache_global.obtener(self.filepath, self._parsear)
+        if filas is not None:
+            yield from filas
+            return
+
+        with open(self.filepath, "r", newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+
+    def iter_todas(self, cuenta_id=None, tipo=None, desde=None, hasta=None):
+        """
+        Recorre las transferencias de a una, sin cargar el archivo en memoria
+        (salvo que el archivo entre en el cache compartido de parseo).
+        Filtros opcionales:
+        - cuenta_id: cuenta (o colección) que aparezca como origen o destino
+        - tipo: tipo_transaccion (o colección)
+        - desde / hasta: date, datetime o texto ISO (desde inclusivo, hasta exclusivo)
+        """
+        cuentas = como_conjunto(cuenta_id)
+        tipos = como_conjunto(tipo)
+        desde = como_fecha_iso(desde)
+        hasta = como_fecha_iso(hasta)
+
+        self.flush()
+        for row in self._filas():
+            if cuentas is not None and row["cuenta_origen"] not in cuentas and row["cuenta_destino"] not in cuentas:
+                continue
+            if tipos is not None and row["tipo_transaccion"] not in tipos:
+                continue
+            if not en_rango(row["fecha"], desde, hasta):
+                continue
+            yield self._a_dict(row)
+
+    def iter_por_cuenta(self, cuenta_id, **filtros):
+        """
+        Recorre las transferencias donde participa una cuenta.
+        """
+        return self.iter_todas(cuenta_id=cuenta_id, **filtros)
+
     def obtener_todas(self):
         """
         Devuelve todas las transferencias como diccionarios.
         """
-        trans = []
-        with open(self.filepath, "r", newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                trans.append({
-                    "id": row["id"],
-                    "cuenta_origen": row["cuenta_origen"],
-                    "cuenta_destino": row["cuenta_destino"],
-                    "tipo_cuenta": row["tipo_cuenta"],
-                    "tipo_transaccion": row["tipo_transaccion"],
-                    "monto": float(row["monto"]),
-                    "fecha": row["fecha"]
-                })
-        return trans
+        return list(self.iter_todas())
 
     def guardar(self, transferencia: Transferencia):
         """
         Guarda una transferencia generada por BankService.
         """
-        with open(self.filepath, "a", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(
-                f,
-                fieldnames=["id", "cuenta_origen", "cuenta_destino","tipo_cuenta","tipo_transaccion", "monto", "fecha"]
-            )
-            writer.writerow(transferencia.to_dict())
+        if self._escritor:
+            self._escritor.escribir(transferencia.to_dict())
+            return
+
+        with bloqueo_archivo(self.filepath):
+            with open(self.filepath, "a", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(
+                    f,
+                    fieldnames=CAMPOS
+                )
+                writer.writerow(transferencia.to_dict())
+
+            cache_global.invalidar(self.filepath)
+
+    def guardar_varias(self, transferencias):
+        """
+        Guarda varias transferencias con una sola escritura al archivo.
+        """
+        filas = [t.to_dict() for t in transferencias]
+        if not filas:
+            return
+
+        if self._escritor:
+            for fila in filas:
+                self._escritor.escribir(fila)
+            return
+
+        with bloqueo_archivo(self.filepath):
+            with open(self.filepath, "a", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(
+                    f,
+                    fieldnames=CAMPOS
+                )
+                writer.writerows(filas)
+
+            cache_global.invalidar(self.filepath)
+
+    # -----------------------------
+    # MODO BUFFER
+    # -----------------------------
+
+    def flush(self):
+        """
+        Escribe en disco las filas pendientes del buffer (si está activo).
+        """
+        if self._escritor:
+            self._escritor.flush()
+
+    def asegurar_en_disco(self):
+        """
+        Vacía el buffer y hace fsync del archivo.
+        """
+        self.flush()
+        with bloqueo_archivo(self.filepath):
+            fsync_ruta(self.filepath)
+
+    def cerrar(self):
+        if self._escritor:
+            self._escritor.cerrar()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cerrar()
+        return False
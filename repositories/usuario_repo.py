@@ -2,6 +2,7 @@ import csv
 import os
 from domain.cliente import Cliente
 from domain.administrador import Administrador
+from repositories.cache_archivos import cache_global
 
 
 class UsuarioRepo:
@@ -25,25 +26,31 @@ class UsuarioRepo:
                 writer = csv.DictWriter(f, fieldnames=["nombres", "apellidos", "dui", "pin", "rol"])
                 writer.writeheader()
 
+    @staticmethod
+    def _parsear(ruta):
+        """
+        Lee el CSV y devuelve las filas como dicts (quedan en el cache compartido).
+        """
+        with open(ruta, "r", newline="", encoding="utf-8") as f:
+            return list(csv.DictReader(f))
+
     def cargar_todos(self):
         """
         Carga todos los usuarios desde el CSV.
         Según el campo 'rol', reconstruye un Cliente o un Administrador.
         """
         usuarios = []
-        with open(self.filepath, "r", newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
+        for row in cache_global.leer(self.filepath, self._parsear):
 
-                # Si el rol es cliente → reconstruimos Cliente
-                if row["rol"] == "cliente":
-                    usuario = Cliente(row["nombres"], row["apellidos"], row["dui"], row["pin"])
+            # Si el rol es cliente → reconstruimos Cliente
+            if row["rol"] == "cliente":
+                usuario = Cliente(row["nombres"], row["apellidos"], row["dui"], row["pin"])
 
-                # Si el rol es admin → reconstruimos Administrador
-                else:
-                    usuario = Administrador(row["nombres"], row["apellidos"], row["dui"], row["pin"])
+            # Si el rol es admin → reconstruimos Administrador
+            else:
+                usuario = Administrador(row["nombres"], row["apellidos"], row["dui"], row["pin"])
 
-                usuarios.append(usuario)
+            usuarios.append(usuario)
 
         return usuarios
 
@@ -59,6 +66,8 @@ class UsuarioRepo:
             for u in usuarios:
                 writer.writerow(u.to_dict())
 
+        cache_global.invalidar(self.filepath)
+
     def agregar(self, usuario):
         """
         Agrega un usuario al archivo sin borrar los existentes.
@@ -67,6 +76,8 @@ class UsuarioRepo:
             writer = csv.DictWriter(f, fieldnames=["nombres", "apellidos", "dui", "pin", "rol"])
             writer.writerow(usuario.to_dict())
 
+        cache_global.invalidar(self.filepath)
+
     def buscar_por_dui(self, dui):
         """
         Busca un usuario por su DUI (o username en caso de admin).
@@ -0,0 +1,87 @@
+import os
+from repositories.usuario_repo import UsuarioRepo
+from repositories.bloqueos import bloqueo_archivo
+
+
+class UsuarioRepoIndexado(UsuarioRepo):
+    """
+    Variante de UsuarioRepo con un directorio de usuarios en memoria indexado
+    por DUI (o username, en el caso de los administradores).
+
+    buscar_por_dui es O(1). El índice se descarta y se vuelve a armar cuando
+    cambia el archivo en disco, incluso si lo cambió otro proceso.
+
+    Los usuarios no se modifican después de creados, así que se devuelven los
+    mismos objetos del índice (sin copiarlos).
+
+    Igual que en CuentaRepoIndexado, el índice se consulta y modifica con
+    bloqueo_archivo tomado, que también excluye a los otros hilos del proceso.
+    """
+
+    def __init__(self, filepath="data/usuarios.csv"):
+        super().__init__(filepath)
+        self._usuarios = None
+        self._por_dui = {}
+        self._firma = None
+
+    def _firma_actual(self):
+        """
+        Identifica la versión del archivo en disco. El inodo distingue un
+        archivo reemplazado con el mismo tamaño en el mismo instante.
+        """
+        st = os.stat(self.filepath)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _sincronizar(self):
+        """
+        Reconstruye el índice si el archivo cambió desde la última lectura.
+        """
+        firma = self._firma_actual()
+        if self._usuarios is None or firma != self._firma:
+            self._usuarios = []
+            self._por_dui = {}
+            for u in super().cargar_todos():
+                self._indexar(u)
+            self._firma = firma
+
+    def _indexar(self, usuario):
+        self._usuarios.append(usuario)
+        # Si un DUI aparece repetido gana la primera fila, igual que en la búsqueda lineal
+        self._por_dui.setdefault(usuario.dui, usuario)
+
+    def invalidar(self):
+        """
+        Descarta el índice; la próxima consulta vuelve a leer el archivo.
+        """
+        with bloqueo_archivo(self.filepath):
+            self._usuarios = None
+
+    # -----------------------------
+    # LECTURA
+    # -----------------------------
+
+    def cargar_todos(self):
+        with bloqueo_archivo(self.filepath):
+            self._sincronizar()
+            return list(self._usuarios)
+
+    def buscar_por_dui(self, dui):
+        with bloqueo_archivo(self.filepath):
+            self._sincronizar()
+            return self._por_dui.get(dui)
+
+    # -----------------------------
+    # ESCRITURA
+    # -----------------------------
+
+    def guardar_todos(self, usuarios):
+        with bloqueo_archivo(self.filepath):
+            super().guardar_todos(usuarios)
+            self.invalidar()
+
+    def agregar(self, usuario):
+        with bloqueo_archivo(self.filepath):
+            self._sincronizar()
+            super().agregar(usuario)
+            self._indexar(usuario)
+            self._firma = self._firma_actual()
@@ -1,6 +1,7 @@
 from domain.cliente import Cliente
 from domain.administrador import Administrador
 from domain.cuenta import Cuenta
+from repositories.bloqueos import BloqueoCuentas
 
 
 class AdminService:
@@ -9,12 +10,22 @@ class AdminService:
     Se apoya en los repositorios para persistir datos.
     """
 
-    def __init__(self, usuario_repo, cuenta_repo):
+    def __init__(self, usuario_repo, cuenta_repo, bloqueos=None, registro=None, ledger=None):
         """
         Recibe los repositorios necesarios.
+        `bloqueos` es el mismo BloqueoCuentas que usa BankService, para que
+        bloquear/activar no se cruce con un depósito en curso.
+        Con `registro` (el RegistroRedo de BankService) los cambios de cuentas
+        pasan por el registro de intenciones, igual que las operaciones: si
+        no, reaplicar una intención pendiente podría deshacer un bloqueo.
+        Con `ledger` (LedgerParticionado) las cuentas se crean, bloquean y
+        activan en su shard.
         """
         self.usuario_repo = usuario_repo
         self.cuenta_repo = cuenta_repo
+        self.bloqueos = bloqueos or BloqueoCuentas()
+        self.registro = registro
+        self.ledger = ledger
 
     
     # USUARIOS
@@ -67,12 +78,23 @@ class AdminService:
         if not cliente:
             raise Exception("El cliente no existe")
 
-        # Validar que no exista una cuenta con ese número
-        if self.cuenta_repo.obtener_por_numero(numero):
-            raise Exception("Ya existe una cuenta con ese número")
-
         cuenta = Cuenta(numero, cliente_id, tipo, saldo_inicial)
-        self.cuenta_repo.agregar(cuenta)
+        if self.ledger:
+            return self.ledger.crear_cuenta(cuenta)
+        return self.agregar_cuenta(cuenta)
+
+    def agregar_cuenta(self, cuenta):
+        """
+        Guarda una cuenta nueva (sin validar el cliente).
+        """
+        with self.bloqueos.bloquear(cuenta.numero):
+            self._recuperar(cuenta.numero)
+
+            # Validar que no exista una cuenta con ese número
+            if self.cuenta_repo.obtener_por_numero(cuenta.numero):
+                raise Exception("Ya existe una cuenta con ese número")
+
+            self._persistir(nuevas=[cuenta])
 
         return cuenta
 
@@ -86,24 +108,49 @@ class AdminService:
         """
         Cambia el estado de una cuenta a bloqueada.
         """
-        cuenta = self.cuenta_repo.obtener_por_numero(numero)
-        if not cuenta:
-            raise Exception("Cuenta no encontrada")
-
-        cuenta.bloquear()
-        self.cuenta_repo.actualizar(cuenta)
-
-        return cuenta
+        if self.ledger:
+            return self.ledger.bloquear_cuenta(numero)
+        return self._cambiar_estado(numero, "bloquear")
 
     def activar_cuenta(self, numero):
         """
         Cambia el estado de una cuenta a activa.
         """
-        cuenta = self.cuenta_repo.obtener_por_numero(numero)
-        if not cuenta:
-            raise Exception("Cuenta no encontrada")
+        if self.ledger:
+            return self.ledger.activar_cuenta(numero)
+        return self._cambiar_estado(numero, "activar")
 
-        cuenta.activar()
-        self.cuenta_repo.actualizar(cuenta)
+    def _cambiar_estado(self, numero, metodo):
+        """
+        Bloquea o activa la cuenta (`metodo` es "bloquear" o "activar").
+        """
+        with self.bloqueos.bloquear(numero):
+            self._recuperar(numero)
+            cuenta = self.cuenta_repo.obtener_por_numero(numero)
+            if not cuenta:
+                raise Exception("Cuenta no encontrada")
+
+            getattr(cuenta, metodo)()
+            self._persistir(cuentas=[cuenta])
 
         return cuenta
+
+    # PERSISTENCIA
+
+    def _recuperar(self, numero):
+        """
+        Con la cuenta ya bloqueada: termina primero una operación sobre ella
+        que haya quedado a medias por una caída.
+        """
+        if self.registro:
+            self.registro.recuperar([numero])
+
+    def _persistir(self, cuentas=(), nuevas=()):
+        if self.registro:
+            self.registro.confirmar(cuentas, nuevas=nuevas)
+            return
+
+        for cuenta in nuevas:
+            self.cuenta_repo.agregar(cuenta)
+        for cuenta in cuentas:
+            self.cuenta_repo.actualizar(cuenta)
@@ -1,25 +1,159 @@
-from analytics.estadisticas import Estadisticas
+import csv
+import json
+import math
+import os
+
+# Columnas del CSV de exportar_resumen_todas_cuentas (además de cuenta_id)
+CAMPOS_RESUMEN = [
+    "total_depositos", "total_gastos", "ratio_dep_gastos", "promedio_diario",
+    "desviacion_estandar", "p50", "p90", "p99",
+]
+
+
+def _estadisticas():
+    # Import diferido: Estadisticas trae NumPy, que solo hace falta cuando se
+    # pide un reporte (no al arrancar el programa).
+    from analytics.estadisticas import Estadisticas
+    return Estadisticas
+
+
+def _a_nativo(resumen):
+    """
+    Copia del resumen con floats de Python en vez de escalares de NumPy
+    (para json.dumps).
+    """
+    return {
+        clave: _a_nativo(valor) if isinstance(valor, dict) else float(valor)
+        for clave, valor in resumen.items()
+    }
+
+
+def _a_json(resumen):
+    """
+    Igual que _a_nativo, pero con None en vez de inf/nan: JSON no tiene
+    esos valores (json.dumps escribiría Infinity, que no es JSON válido).
+    """
+    return {
+        clave: _a_json(valor) if isinstance(valor, dict)
+        else (float(valor) if math.isfinite(valor) else None)
+        for clave, valor in resumen.items()
+    }
 
 
 class AnalyticsService:
     """
     Servicio que usa Estadisticas para generar reportes.
+    Si el repositorio tiene almacén columnar, las métricas globales se calculan
+    sobre esos arreglos en vez de volver a leer el CSV.
     """
 
     def __init__(self, transaccion_repo):
         self.transaccion_repo = transaccion_repo
+        self.almacen = getattr(transaccion_repo, "columnar", None)
 
     def resumen_por_cuenta(self, cuenta_id):
-        trans = self.transaccion_repo.obtener_por_cuenta(cuenta_id)
-        return Estadisticas.resumen_por_cuenta(trans)
+        if self.almacen is not None:
+            cols = self.almacen.columnas()
+            return _estadisticas().resumen_por_cuenta(cols.seleccionar(cols.mascara_cuenta(cuenta_id)))
+
+        trans = self.transaccion_repo.iter_por_cuenta(cuenta_id)
+        return _estadisticas().resumen_por_cuenta(trans)
+
+    def resumen_todas_cuentas(self, desde=None, hasta=None):
+        """
+        {cuenta_id: resumen} para todas las cuentas con movimientos, con los
+        mismos campos que resumen_por_cuenta, leyendo las transacciones una
+        sola vez (en vez de una lectura por cuenta).
+        """
+        return _estadisticas().resumen_todas_cuentas(self._transacciones(desde, hasta))
+
+    def exportar_resumen_todas_cuentas(self, ruta, desde=None, hasta=None):
+        """
+        Escribe el resumen de todas las cuentas en `ruta`, en CSV (una fila
+        por cuenta, percentiles en columnas p50/p90/p99) o en JSON si la ruta
+        termina en .json. Se escribe cuenta por cuenta, sin armar el
+        resultado completo en memoria. Devuelve cuántas cuentas escribió.
+
+        ratio_dep_gastos es inf en una cuenta sin gastos: en
+        JSON se escribe null (cualquier valor no finito sale como null); en
+        CSV queda "inf".
+        """
+        resumenes = _estadisticas().iter_resumen_todas_cuentas(self._transacciones(desde, hasta))
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+        cantidad = 0
+        with open(ruta, "w", newline="", encoding="utf-8") as f:
+            if ruta.endswith(".json"):
+                f.write("{")
+                for cuenta_id, resumen in resumenes:
+                    separador = "," if cantidad else ""
+                    f.write(f"{separador}\n  {json.dumps(cuenta_id)}: {json.dumps(_a_json(resumen), allow_nan=False)}")
+                    cantidad += 1
+                f.write("\n}\n")
+            else:
+                writer = csv.DictWriter(f, fieldnames=["cuenta_id"] + CAMPOS_RESUMEN)
+                writer.writeheader()
+                for cuenta_id, resumen in resumenes:
+                    fila = _a_nativo(resumen)
+                    fila.update(fila.pop("percentiles"))
+                    writer.writerow({"cuenta_id": cuenta_id, **fila})
+                    cantidad += 1
+        return cantidad
+
+    def transacciones_por_dia(self, desde=None, hasta=None, periodo="dia"):
+        return _estadisticas().transacciones_por_dia(self._por_periodo(desde, hasta, periodo), periodo)
+
+    def total_diario(self, desde=None, hasta=None, periodo="dia"):
+        return _estadisticas().total_diario(self._por_periodo(desde, hasta, periodo), periodo)
+
+    def _por_periodo(self, desde, hasta, periodo):
+        """
+        Datos para los reportes por período: si el repositorio mantiene el
+        resumen diario y el período es de un día o más (con desde/hasta al
+        comienzo de un día), los totales por día del resumen; si no, las
+        transacciones.
+        """
+        resumen = getattr(self.transaccion_repo, "resumen_diario", None)
+        if resumen is not None and periodo != "hora" and resumen.cubre(desde, hasta):
+            return resumen.totales(desde, hasta)
+        return self._transacciones(desde, hasta)
+
+    def cuantiles(self, desde=None, hasta=None):
+        """
+        Sketches de cuantiles de los montos (SketchesPorCuenta), global y por
+        cuenta. Sin rango, salen de los agregados del repositorio si los
+        tiene; si no, de una sola pasada por las filas, sin cargarlas todas.
+        """
+        agregados = getattr(self.transaccion_repo, "agregados", None)
+        if agregados is not None and desde is None and hasta is None:
+            return agregados.cuantiles()
 
-    def transacciones_por_dia(self):
-        trans = self.transaccion_repo.obtener_todas()
-        return Estadisticas.transacciones_por_dia(trans)
+        from analytics.cuantiles import SketchesPorCuenta
+        return SketchesPorCuenta.desde_transacciones(self.transaccion_repo.iter_todas(desde=desde, hasta=hasta))
 
-    def total_diario(self):
-        trans = self.transaccion_repo.obtener_todas()
-        return Estadisticas.total_diario(trans)
+    def percentiles_por_cuenta(self, desde=None, hasta=None):
+        """
+        {cuenta_id: {"p50": ..., "p90": ..., "p99": ...}} para todas las cuentas
+        con movimientos. Exacto en cuentas con pocos movimientos; en las demás,
+        con el error de rango del sketch (ver analytics.cuantiles).
+        """
+        sketches = self.cuantiles(desde, hasta)
+        return {cuenta_id: sketch.percentiles() for cuenta_id, sketch in sketches.por_cuenta.items()}
+
+    def _transacciones(self, desde, hasta):
+        """
+        Con almacén columnar, las columnas (con la fecha ya guardada como
+        entero) filtradas por rango; si no, las filas del repositorio.
+        """
+        if self.almacen is None:
+            return self.transaccion_repo.iter_todas(desde=desde, hasta=hasta)
+
+        cols = self.almacen.columnas()
+        if desde is None and hasta is None:
+            return cols
+        return cols.seleccionar(cols.en_rango(desde, hasta))
 
     # ============================================================
     # MÉTODO NUEVO PARA EL MENÚ ADMIN
@@ -29,5 +163,12 @@ class AnalyticsService:
         """
         Devuelve estadísticas globales del sistema.
         """
-        trans = self.transaccion_repo.obtener_todas()
-        return Estadisticas.estadisticas_generales(trans)
+        agregados = getattr(self.transaccion_repo, "agregados", None)
+        if agregados is not None:
+            return agregados.estadisticas()
+
+        if self.almacen is not None:
+            return _estadisticas().estadisticas_generales(self.almacen.columnas())
+
+        trans = self.transaccion_repo.iter_todas()
+        return _estadisticas().estadisticas_generales(trans)
@@ -0,0 +1,189 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+
+class EjecutorAsync:
+    """
+    Corre funciones bloqueantes (lecturas y escrituras de CSV) en un pool de
+    hilos acotado, para usarlas desde asyncio sin frenar el event loop.
+
+    - Como mucho `max_hilos` llamadas corren a la vez. El resto espera en un
+      semáforo del event loop, sin ocupar hilos ni memoria del pool.
+    - Cancelación: si la corrutina que espera se cancela antes de que la
+      llamada arranque, la llamada no se ejecuta. Si ya arrancó, termina
+      igual (una operación bancaria no se corta a la mitad) y su resultado se
+      descarta; el lugar en el pool se libera recién cuando termina.
+    - leer() junta lecturas iguales concurrentes: si diez sesiones piden lo
+      mismo a la vez, se lee una sola vez y las diez reciben el mismo
+      resultado (que no hay que modificar).
+
+    Las lecturas no se juntan con otras que empezaron antes de la última
+    escritura hecha por este ejecutor, así nadie recibe datos anteriores a
+    una escritura que ya vio terminar.
+    """
+
+    def __init__(self, max_hilos=8):
+        self.max_hilos = max_hilos
+        self._pool = ThreadPoolExecutor(max_workers=max_hilos, thread_name_prefix="banco")
+        self._semaforo = None
+        self._lecturas = {}   # clave → [tarea, cantidad de sesiones esperando]
+        self._generacion = 0
+
+    async def ejecutar(self, funcion, *args, **kwargs):
+        """
+        Corre funcion(*args, **kwargs) en el pool y devuelve su resultado.
+        """
+        if self._semaforo is None:
+            self._semaforo = asyncio.Semaphore(self.max_hilos)
+
+        loop = asyncio.get_running_loop()
+        await self._semaforo.acquire()
+        try:
+            futuro = self._pool.submit(functools.partial(funcion, *args, **kwargs))
+        except BaseException:
+            self._semaforo.release()
+            raise
+
+        # El semáforo se libera cuando el hilo termina (o la llamada se cancela sin
+        # haber arrancado), no cuando se cancela la corrutina que esperaba.
+        futuro.add_done_callback(lambda _: loop.call_soon_threadsafe(self._semaforo.release))
+        return await asyncio.wrap_future(futuro)
+
+    async def escribir(self, funcion, *args, **kwargs):
+        """
+        Igual que ejecutar(), para operaciones que modifican datos.
+        """
+        try:
+            return await self.ejecutar(funcion, *args, **kwargs)
+        finally:
+            self._generacion += 1
+
+    async def leer(self, clave, funcion, *args, **kwargs):
+        """
+        Igual que ejecutar(), pero las llamadas concurrentes con la misma
+        `clave` comparten una sola ejecución.
+        """
+        clave = (self._generacion, clave)
+        entrada = self._lecturas.get(clave)
+        if entrada is None:
+            tarea = asyncio.ensure_future(self.ejecutar(funcion, *args, **kwargs))
+            entrada = [tarea, 0]
+            self._lecturas[clave] = entrada
+            tarea.add_done_callback(lambda _: self._olvidar(clave, entrada))
+
+        entrada[1] += 1
+        try:
+            # shield: cancelar a una sesión no cancela la lectura de las demás
+            return await asyncio.shield(entrada[0])
+        finally:
+            entrada[1] -= 1
+            if entrada[1] == 0 and not entrada[0].done():
+                # Se fue la última sesión que esperaba: la lectura ya no hace falta
+                self._olvidar(clave, entrada)
+                entrada[0].cancel()
+
+    def _olvidar(self, clave, entrada):
+        if self._lecturas.get(clave) is entrada:
+            del self._lecturas[clave]
+
+    def cerrar(self):
+        self._pool.shutdown(wait=True)
+
+
+class AsyncBankService:
+    """
+    Versión async de BankService para usar desde un gateway asyncio.
+
+    Cada método delega en el BankService síncrono a través de un EjecutorAsync,
+    así que conserva sus garantías (bloqueo por cuenta, registro de
+    intenciones) y no bloquea el event loop. Uso:
+
+        banco = AsyncBankService(bank_service)
+        trans = await banco.depositar("001", 50.0)
+    """
+
+    def __init__(self, bank_service, ejecutor=None):
+        self.bank_service = bank_service
+        self.ejecutor = ejecutor or EjecutorAsync()
+
+    # ============================================================
+    # OPERACIONES
+    # ============================================================
+
+    async def depositar(self, cuenta_num, monto):
+        return await self.ejecutor.escribir(self.bank_service.depositar, cuenta_num, monto)
+
+    async def retirar(self, cuenta_num, monto):
+        return await self.ejecutor.escribir(self.bank_service.retirar, cuenta_num, monto)
+
+    async def transferir(self, origen_num, destino_num, tipo_cuenta, tipo_transaccion, monto):
+        return await self.ejecutor.escribir(
+            self.bank_service.transferir, origen_num, destino_num, tipo_cuenta, tipo_transaccion, monto
+        )
+
+    async def procesar_lote(self, operaciones):
+        return await self.ejecutor.escribir(self.bank_service.procesar_lote, list(operaciones))
+
+    # ============================================================
+    # CONSULTAS
+    # ============================================================
+
+    async def obtener_transacciones(self, numero_cuenta):
+        return await self.ejecutor.leer(
+            ("obtener_transacciones", numero_cuenta),
+            self.bank_service.obtener_transacciones, numero_cuenta
+        )
+
+    # ============================================================
+    # CIERRE
+    # ============================================================
+
+    def cerrar(self):
+        self.ejecutor.cerrar()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await asyncio.get_running_loop().run_in_executor(None, self.cerrar)
+        return False
+
+
+class AsyncAnalyticsService:
+    """
+    Versión async de AnalyticsService.
+
+    Los reportes leen todo transacciones.csv, así que pedidos iguales que
+    llegan a la vez se calculan una sola vez (ver EjecutorAsync.leer). Para
+    que las escrituras de AsyncBankService corten ese agrupamiento, conviene
+    que los dos compartan el mismo ejecutor:
+
+        ejecutor = EjecutorAsync()
+        banco = AsyncBankService(bank_service, ejecutor)
+        analitica = AsyncAnalyticsService(analytics_service, ejecutor)
+    """
+
+    def __init__(self, analytics_service, ejecutor=None):
+        self.analytics_service = analytics_service
+        self.ejecutor = ejecutor or EjecutorAsync()
+
+    async def _leer(self, metodo, *args):
+        return await self.ejecutor.leer(
+            (metodo, args), getattr(self.analytics_service, metodo), *args
+        )
+
+    async def resumen_por_cuenta(self, cuenta_id):
+        return await self._leer("resumen_por_cuenta", cuenta_id)
+
+    async def transacciones_por_dia(self, desde=None, hasta=None, periodo="dia"):
+        return await self._leer("transacciones_por_dia", desde, hasta, periodo)
+
+    async def total_diario(self, desde=None, hasta=None, periodo="dia"):
+        return await self._leer("total_diario", desde, hasta, periodo)
+
+    async def obtener_estadisticas(self):
+        return await self._leer("obtener_estadisticas")
+
+    def cerrar(self):
+        self.ejecutor.cerrar()
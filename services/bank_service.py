@@ -1,16 +1,56 @@
 from domain.transferencia import Transferencia
+from repositories.bloqueos import BloqueoCuentas
 
 
 class BankService:
     """
     Servicio que orquesta las operaciones bancarias entre cuentas.
     Se comunica con los repositorios para persistir cambios.
+
+    Es seguro usarlo desde varios hilos y varios procesos a la vez: cada
+    operación bloquea las cuentas que toca (ver BloqueoCuentas) desde que lee
+    el saldo hasta que lo persiste, así dos depósitos simultáneos en la misma
+    cuenta no se pisan. Operaciones sobre cuentas distintas corren en paralelo.
+
+    Con un RegistroRedo (`registro`), todo lo que escribe una operación se
+    confirma como una sola unidad: una caída a mitad de camino nunca deja
+    dinero debitado sin acreditar (ver repositories/registro_redo.py).
     """
 
-    def __init__(self, cuenta_repo, transaccion_repo, transferencia_repo):
+    def __init__(self, cuenta_repo, transaccion_repo, transferencia_repo, bloqueos=None, registro=None):
         self.cuenta_repo = cuenta_repo
         self.transaccion_repo = transaccion_repo
         self.transferencia_repo = transferencia_repo
+        self.bloqueos = bloqueos or BloqueoCuentas()
+        self.registro = registro
+
+    # ============================================================
+    # PERSISTENCIA
+    # ============================================================
+
+    def _recuperar(self, *numeros):
+        """
+        Se llama con las cuentas ya bloqueadas y antes de leerlas: si un
+        proceso se cayó a mitad de una operación sobre ellas, la termina primero.
+        """
+        if self.registro:
+            self.registro.recuperar(numeros)
+
+    def _persistir(self, cuentas=(), transacciones=(), transferencias=()):
+        """
+        Escribe el resultado de una operación: una escritura por archivo y,
+        con registro, todo como una sola unidad atómica.
+        """
+        if self.registro:
+            self.registro.confirmar(cuentas, transacciones, transferencias)
+            return
+
+        if cuentas:
+            self.cuenta_repo.actualizar_varias(cuentas)
+        if transacciones:
+            self.transaccion_repo.guardar_varias(transacciones)
+        if transferencias:
+            self.transferencia_repo.guardar_varias(transferencias)
 
     # ============================================================
     # OPERACIONES INDIVIDUALES
@@ -25,15 +65,16 @@ class BankService:
         - Registra transacción
         """
 
-        cuenta = self.cuenta_repo.obtener_por_numero(cuenta_num)
-        if not cuenta:
-            raise Exception("Cuenta no encontrada")
+        with self.bloqueos.bloquear(cuenta_num):
+            self._recuperar(cuenta_num)
+            cuenta = self.cuenta_repo.obtener_por_numero(cuenta_num)
+            if not cuenta:
+                raise Exception("Cuenta no encontrada")
 
-        trans = cuenta.depositar(monto)
+            trans = cuenta.depositar(monto)
 
-        # Persistencia
-        self.cuenta_repo.actualizar(cuenta)
-        self.transaccion_repo.guardar(trans)
+            # Persistencia
+            self._persistir([cuenta], [trans])
 
         return trans
 
@@ -42,15 +83,16 @@ class BankService:
         Retira dinero de una cuenta.
         """
 
-        cuenta = self.cuenta_repo.obtener_por_numero(cuenta_num)
-        if not cuenta:
-            raise Exception("Cuenta no encontrada")
+        with self.bloqueos.bloquear(cuenta_num):
+            self._recuperar(cuenta_num)
+            cuenta = self.cuenta_repo.obtener_por_numero(cuenta_num)
+            if not cuenta:
+                raise Exception("Cuenta no encontrada")
 
-        trans = cuenta.retirar(monto)
+            trans = cuenta.retirar(monto)
 
-        # Persistencia
-        self.cuenta_repo.actualizar(cuenta)
-        self.transaccion_repo.guardar(trans)
+            # Persistencia
+            self._persistir([cuenta], [trans])
 
         return trans
 
@@ -67,31 +109,128 @@ class BankService:
         - Registra la transferencia global
         """
 
-        origen = self.cuenta_repo.obtener_por_numero(origen_num)
-        destino = self.cuenta_repo.obtener_por_numero(destino_num)
-
-        if not origen or not destino:
-            raise Exception("Cuenta no encontrada")
+        # Las dos cuentas se bloquean juntas (en orden fijo, sin riesgo de deadlock)
+        with self.bloqueos.bloquear(origen_num, destino_num):
+            self._recuperar(origen_num, destino_num)
+            origen = self.cuenta_repo.obtener_por_numero(origen_num)
+            destino = self.cuenta_repo.obtener_por_numero(destino_num)
 
-        if not origen.activa or not destino.activa:
-            raise Exception("Una de las cuentas está bloqueada")
+            if not origen or not destino:
+                raise Exception("Cuenta no encontrada")
 
-        # Operaciones en memoria
-        trans_out = origen.retirar(monto)
-        trans_in = destino.depositar(monto)
+            if not origen.activa or not destino.activa:
+                raise Exception("Una de las cuentas está bloqueada")
 
-        transferencia = Transferencia(origen_num, destino_num, tipo_cuenta, tipo_transaccion, monto)
+            # Operaciones en memoria
+            trans_out = origen.retirar(monto)
+            trans_in = destino.depositar(monto)
 
-        # Persistencia
-        self.cuenta_repo.actualizar(origen)
-        self.cuenta_repo.actualizar(destino)
+            transferencia = Transferencia(origen_num, destino_num, tipo_cuenta, tipo_transaccion, monto)
 
-        self.transaccion_repo.guardar(trans_out)
-        self.transaccion_repo.guardar(trans_in)
-        self.transferencia_repo.guardar(transferencia)
+            # Persistencia: las cinco escrituras se confirman juntas
+            self._persistir([origen, destino], [trans_out, trans_in], [transferencia])
 
         return transferencia
 
+    # ============================================================
+    # LOTES
+    # ============================================================
+
+    def procesar_lote(self, operaciones):
+        """
+        Procesa muchas operaciones juntas: las cuentas involucradas se leen una
+        sola vez y al final se hace una sola escritura de cuentas, una de
+        transacciones y una de transferencias.
+
+        Cada operación es un diccionario:
+        - {"tipo": "deposito", "cuenta": "001", "monto": 50.0}
+        - {"tipo": "retiro", "cuenta": "001", "monto": 20.0}
+        - {"tipo": "transferencia", "cuenta": "001", "destino": "002", "monto": 10.0,
+           "tipo_cuenta": "ahorro", "tipo_transaccion": "pago"}
+
+        Se aplican en orden, con las mismas validaciones que depositar, retirar
+        y transferir. Una operación que falla no modifica nada ni frena a las
+        demás. Devuelve un resultado por operación, en el mismo orden:
+        - {"ok": True, "resultado": Transaccion o Transferencia}
+        - {"ok": False, "error": "Saldo insuficiente"}
+        """
+        operaciones = list(operaciones)
+
+        numeros = set()
+        for op in operaciones:
+            numeros.add(op.get("cuenta"))
+            if op.get("tipo") == "transferencia":
+                numeros.add(op.get("destino"))
+        numeros.discard(None)
+
+        with self.bloqueos.bloquear(*numeros):
+            self._recuperar(*numeros)
+            cuentas = self.cuenta_repo.obtener_varias(numeros)
+
+            modificadas = {}
+            transacciones = []
+            transferencias = []
+            resultados = []
+
+            for op in operaciones:
+                try:
+                    resultado = self._aplicar_operacion(op, cuentas, modificadas, transacciones, transferencias)
+                    resultados.append({"ok": True, "resultado": resultado})
+                except Exception as e:
+                    resultados.append({"ok": False, "error": str(e)})
+
+            # Persistencia: una escritura por archivo
+            self._persistir(list(modificadas.values()), transacciones, transferencias)
+
+        return resultados
+
+    def _aplicar_operacion(self, op, cuentas, modificadas, transacciones, transferencias):
+        """
+        Aplica una operación del lote en memoria y anota lo que hay que persistir.
+        """
+        tipo = op.get("tipo")
+
+        if tipo in ("deposito", "retiro"):
+            cuenta = cuentas.get(op.get("cuenta"))
+            if not cuenta:
+                raise Exception("Cuenta no encontrada")
+
+            if tipo == "deposito":
+                trans = cuenta.depositar(op["monto"])
+            else:
+                trans = cuenta.retirar(op["monto"])
+
+            modificadas[cuenta.numero] = cuenta
+            transacciones.append(trans)
+            return trans
+
+        if tipo == "transferencia":
+            origen = cuentas.get(op.get("cuenta"))
+            destino = cuentas.get(op.get("destino"))
+
+            if not origen or not destino:
+                raise Exception("Cuenta no encontrada")
+
+            if not origen.activa or not destino.activa:
+                raise Exception("Una de las cuentas está bloqueada")
+
+            trans_out = origen.retirar(op["monto"])
+            trans_in = destino.depositar(op["monto"])
+
+            transferencia = Transferencia(
+                origen.numero, destino.numero,
+                op.get("tipo_cuenta", origen.tipo), op.get("tipo_transaccion", "transferencia"),
+                op["monto"]
+            )
+
+            modificadas[origen.numero] = origen
+            modificadas[destino.numero] = destino
+            transacciones.extend([trans_out, trans_in])
+            transferencias.append(transferencia)
+            return transferencia
+
+        raise ValueError(f"Tipo de operación desconocido: {tipo}")
+
     # ============================================================
     # CONSULTAS
     # ============================================================
@@ -0,0 +1,626 @@
+import json
+import multiprocessing
+import os
+import pickle
+import queue
+import sys
+import threading
+import uuid
+import zlib
+from analytics.cuantiles import SketchesPorCuenta
+from concurrent.futures import Future
+from domain.identificadores import nuevo_id
+from domain.transferencia import Transferencia
+from repositories.bloqueos import BloqueoCuentas, bloqueo_archivo
+from repositories.cuenta_repo_journal import CuentaRepoJournal
+from repositories.registro_redo import FilaReconstruida, RegistroRedo
+from repositories.transaccion_repo import TransaccionRepo
+from repositories.transferencia_repo import TransferenciaRepo
+from services.admin_service import AdminService
+from services.bank_service import BankService
+
+# Cada cuánto el receptor de respuestas revisa que el proceso del shard siga vivo (segundos)
+ESPERA_RESPUESTA = 0.5
+
+
+def shard_de(numero, shards):
+    """
+    Shard dueño de una cuenta. crc32 (y no hash()) para que sea el mismo en
+    todos los procesos y entre ejecuciones.
+    """
+    return zlib.crc32(str(numero).encode("utf-8")) % shards
+
+
+# ============================================================
+# SHARD (corre dentro de cada proceso trabajador)
+# ============================================================
+
+class Shard:
+    """
+    Una porción del libro de cuentas: sus propios cuentas.csv,
+    transacciones.csv y transferencias.csv en data/shards/shard_NN/, con su
+    propio BankService y registro de intenciones.
+
+    Además de las operaciones locales participa en transferencias entre
+    shards (confirmación en dos fases): preparar() valida y deja anotada la
+    operación en preparadas.log con fsync; confirmar() o abortar() la cierran.
+    """
+
+    def __init__(self, indice, directorio="data/shards"):
+        self.indice = indice
+        self.directorio = os.path.join(directorio, f"shard_{indice:02d}")
+
+        def ruta(nombre):
+            return os.path.join(self.directorio, nombre)
+
+        self.cuenta_repo = CuentaRepoJournal(ruta("cuentas.csv"))
+        self.transaccion_repo = TransaccionRepo(ruta("transacciones.csv"), indice=True)
+        self.transferencia_repo = TransferenciaRepo(ruta("transferencias.csv"))
+        bloqueos = BloqueoCuentas(ruta("bloqueos_cuentas.lock"))
+        self.registro = RegistroRedo(
+            self.cuenta_repo, self.transaccion_repo, self.transferencia_repo,
+            ruta=ruta("registro_redo.log"), bloqueos=bloqueos
+        )
+        self.registro.recuperar()
+        self.bank_service = BankService(
+            self.cuenta_repo, self.transaccion_repo, self.transferencia_repo,
+            bloqueos=bloqueos, registro=self.registro
+        )
+        self.admin_service = AdminService(None, self.cuenta_repo, bloqueos=bloqueos, registro=self.registro)
+
+        self.preparadas_path = ruta("preparadas.log")
+        self.preparadas = self._cargar_preparadas()
+
+    # -----------------------------
+    # OPERACIONES LOCALES
+    # -----------------------------
+
+    def depositar(self, cuenta_num, monto):
+        return self.bank_service.depositar(cuenta_num, monto)
+
+    def retirar(self, cuenta_num, monto):
+        return self.bank_service.retirar(cuenta_num, monto)
+
+    def transferir(self, origen_num, destino_num, tipo_cuenta, tipo_transaccion, monto):
+        return self.bank_service.transferir(origen_num, destino_num, tipo_cuenta, tipo_transaccion, monto)
+
+    def procesar_lote(self, operaciones):
+        return self.bank_service.procesar_lote(operaciones)
+
+    def obtener_transacciones(self, numero_cuenta):
+        return self.bank_service.obtener_transacciones(numero_cuenta)
+
+    def obtener_cuenta(self, numero):
+        return self.cuenta_repo.obtener_por_numero(numero)
+
+    def crear_cuenta(self, cuenta):
+        return self.admin_service.agregar_cuenta(cuenta)
+
+    def bloquear_cuenta(self, numero):
+        return self.admin_service.bloquear_cuenta(numero)
+
+    def activar_cuenta(self, numero):
+        return self.admin_service.activar_cuenta(numero)
+
+    def importar(self, cuentas, transacciones, transferencias):
+        """
+        Agrega cuentas (objetos Cuenta) y filas ya serializadas de
+        transacciones y transferencias. Pensado para repartir los CSV actuales.
+        """
+        for cuenta in cuentas:
+            self.cuenta_repo.agregar(cuenta)
+        self.transaccion_repo.guardar_varias(FilaReconstruida(t) for t in transacciones)
+        self.transferencia_repo.guardar_varias(FilaReconstruida(t) for t in transferencias)
+
+    def cuantiles(self):
+        """
+        Sketches de cuantiles de las transacciones del shard, como diccionario
+        (ver analytics.cuantiles.SketchesPorCuenta).
+        """
+        return SketchesPorCuenta.desde_transacciones(self.transaccion_repo.iter_todas()).to_dict()
+
+    # -----------------------------
+    # CONFIRMACIÓN EN DOS FASES
+    # -----------------------------
+
+    def _cargar_preparadas(self):
+        preparadas = {}
+        if not os.path.exists(self.preparadas_path):
+            return preparadas
+
+        with open(self.preparadas_path, "rb") as f:
+            for linea in f:
+                if not linea.endswith(b"\n"):
+                    break
+                registro = json.loads(linea)
+                if registro["fase"] == "preparada":
+                    preparadas[registro["tx"]] = registro["operacion"]
+                else:
+                    preparadas.pop(registro["tx"], None)
+        return preparadas
+
+    def _anotar(self, registro, durable=False):
+        with open(self.preparadas_path, "ab") as f:
+            f.write((json.dumps(registro, ensure_ascii=False) + "\n").encode("utf-8"))
+            f.flush()
+            if durable:
+                os.fsync(f.fileno())
+
+        # Sin operaciones abiertas, el archivo se puede vaciar
+        if not self.preparadas and registro["fase"] != "preparada":
+            open(self.preparadas_path, "wb").close()
+
+    def preparar(self, tx, operacion):
+        """
+        Fase 1. `operacion` es {"rol": "debito" o "credito", "cuenta", "monto", ...}.
+        Valida que se pueda aplicar y la deja anotada de forma durable.
+        """
+        cuenta = self.cuenta_repo.obtener_por_numero(operacion["cuenta"])
+        if not cuenta:
+            raise Exception("Cuenta no encontrada")
+        if not cuenta.activa:
+            raise Exception("Una de las cuentas está bloqueada")
+        if operacion["monto"] <= 0:
+            raise ValueError("El monto debe ser mayor a 0")
+        if operacion["rol"] == "debito" and operacion["monto"] > cuenta.saldo:
+            raise Exception("Saldo insuficiente")
+
+        self.preparadas[tx] = operacion
+        self._anotar({"tx": tx, "fase": "preparada", "operacion": operacion}, durable=True)
+
+    def confirmar(self, tx):
+        """
+        Fase 2: aplica la operación preparada. Es idempotente: si la
+        transacción ya está en el archivo (por ejemplo, se aplicó y el proceso
+        se cayó antes de anotarlo), no se aplica de nuevo.
+        """
+        operacion = self.preparadas.get(tx)
+        if operacion is None:
+            return None
+
+        resultado = self._aplicar(operacion)
+
+        del self.preparadas[tx]
+        self._anotar({"tx": tx, "fase": "confirmada"})
+        return resultado
+
+    def _aplicar(self, operacion):
+        with self.bank_service.bloqueos.bloquear(operacion["cuenta"]):
+            self.registro.recuperar([operacion["cuenta"]])
+
+            # Se busca por cuenta (con el índice) y no con obtener_por_id: la
+            # fila se escribe recién al confirmar, así que puede haber quedado
+            # en el archivo muy lejos del instante de su id.
+            for t in self.transaccion_repo.iter_todas(cuenta_id=operacion["cuenta"]):
+                if t["id"] == operacion["transaccion_id"]:
+                    return None
+
+            cuenta = self.cuenta_repo.obtener_por_numero(operacion["cuenta"])
+
+            if operacion["rol"] == "debito":
+                trans = cuenta.retirar(operacion["monto"])
+            else:
+                trans = cuenta.depositar(operacion["monto"])
+            trans.id = operacion["transaccion_id"]
+
+            # La transferencia queda registrada en el shard de la cuenta origen
+            transferencias = []
+            if operacion["rol"] == "debito":
+                transferencia = Transferencia(
+                    operacion["cuenta"], operacion["destino"],
+                    operacion.get("tipo_cuenta") or cuenta.tipo, operacion["tipo_transaccion"], operacion["monto"]
+                )
+                transferencia.id = operacion["transferencia_id"]
+                transferencias.append(transferencia)
+
+            self.registro.confirmar([cuenta], [trans], transferencias)
+
+        return transferencias[0] if transferencias else trans
+
+    def abortar(self, tx):
+        if self.preparadas.pop(tx, None) is not None:
+            self._anotar({"tx": tx, "fase": "abortada"})
+
+    def pendientes(self):
+        """
+        Transferencias preparadas que todavía no se confirmaron ni abortaron.
+        """
+        return list(self.preparadas)
+
+
+def _trabajar(indice, directorio, pedidos, respuestas):
+    """
+    Bucle del proceso trabajador: atiende pedidos (id, método, args) en orden.
+    Si el shard no se puede abrir (por ejemplo, un registro dañado), avisa
+    con una respuesta de id None y termina.
+    """
+    try:
+        shard = Shard(indice, directorio)
+    except Exception as e:
+        respuestas.put((None, False, Exception(f"No se pudo abrir el shard {indice:02d}: {e!r}")))
+        return
+
+    while True:
+        pedido = pedidos.get()
+        if pedido is None:
+            break
+        pedido_id, metodo, args = pedido
+        try:
+            respuestas.put((pedido_id, True, getattr(shard, metodo)(*args)))
+        except Exception as e:
+            respuestas.put((pedido_id, False, _serializable(e)))
+
+
+def _serializable(error):
+    """
+    La excepción tal cual si se puede mandar al router; si no, una
+    Exception con su descripción (si no, el Future nunca se completaría).
+    """
+    try:
+        pickle.dumps(error)
+        return error
+    except Exception:
+        return Exception(repr(error))
+
+
+# ============================================================
+# ROUTER (corre en el proceso principal)
+# ============================================================
+
+class _ClienteShard:
+    """
+    Conexión con un proceso trabajador. llamar() devuelve un Future; un hilo
+    recibe las respuestas y completa el Future que corresponde.
+
+    Si el proceso no pudo abrir el shard o terminó, los Future pendientes y
+    los de llamadas posteriores fallan con ese error en vez de quedar
+    esperando para siempre.
+    """
+
+    def __init__(self, indice, directorio, contexto):
+        self.indice = indice
+        self.pedidos = contexto.Queue()
+        self.respuestas = contexto.Queue()
+        self.proceso = contexto.Process(
+            target=_trabajar, args=(indice, directorio, self.pedidos, self.respuestas),
+            name=f"shard-{indice:02d}", daemon=True
+        )
+        self.proceso.start()
+
+        self._esperando = {}
+        self._error = None
+        self._lock = threading.Lock()
+        self._receptor = threading.Thread(target=self._recibir, daemon=True)
+        self._receptor.start()
+
+    def llamar(self, metodo, *args):
+        futuro = Future()
+        pedido_id = uuid.uuid4().hex
+        with self._lock:
+            if self._error is not None:
+                futuro.set_exception(self._error)
+                return futuro
+            self._esperando[pedido_id] = futuro
+        self.pedidos.put((pedido_id, metodo, args))
+        return futuro
+
+    def _fallar(self, error):
+        with self._lock:
+            self._error = error
+            esperando, self._esperando = self._esperando, {}
+        for futuro in esperando.values():
+            futuro.set_exception(error)
+
+    def _recibir(self):
+        while True:
+            try:
+                respuesta = self.respuestas.get(timeout=ESPERA_RESPUESTA)
+            except queue.Empty:
+                if self.proceso.is_alive():
+                    continue
+                if self._error is None:
+                    self._fallar(Exception(
+                        f"El proceso del shard {self.indice:02d} terminó (código {self.proceso.exitcode})"
+                    ))
+                break
+            if respuesta is None:
+                break
+            pedido_id, ok, valor = respuesta
+            if pedido_id is None:
+                self._fallar(valor)
+                continue
+            with self._lock:
+                futuro = self._esperando.pop(pedido_id)
+            if ok:
+                futuro.set_result(valor)
+            else:
+                futuro.set_exception(valor)
+
+    def cerrar(self):
+        self.pedidos.put(None)
+        self.proceso.join()
+        self.respuestas.put(None)
+        self._receptor.join()
+
+
+class LedgerParticionado:
+    """
+    Modo de ejecución con las cuentas repartidas en N procesos trabajadores
+    (shards) según crc32(numero) % N. Cada shard escribe solo sus archivos, así
+    que las escrituras escalan con la cantidad de núcleos.
+
+    Tiene la misma interfaz que BankService (depositar, retirar, transferir,
+    procesar_lote, obtener_transacciones):
+    - depositar/retirar y las transferencias dentro de un mismo shard se
+      mandan directo al shard dueño.
+    - Las transferencias entre shards usan confirmación en dos fases: los dos
+      shards preparan (validan y anotan con fsync), el router anota la decisión
+      en coordinador.log con fsync y recién entonces pide confirmar. Si el
+      router se cae, al volver a arrancar confirma las que tienen decisión
+      anotada y aborta el resto.
+
+    El router bloquea las cuentas de cada operación (BloqueoCuentas) mientras
+    dura, así nada toca una cuenta entre la preparación y la confirmación.
+
+    La cantidad de shards queda fija en shards.json: cambiarla reubicaría las
+    cuentas. Para repartir los CSV actuales: python -m services.ledger_particionado N
+    """
+
+    def __init__(self, shards=None, directorio="data/shards"):
+        self.directorio = directorio
+        os.makedirs(directorio, exist_ok=True)
+        self.shards = self._fijar_shards(shards or os.cpu_count() or 1)
+
+        self.bloqueos = BloqueoCuentas(os.path.join(directorio, "bloqueos_router.lock"))
+        self.coordinador_path = os.path.join(directorio, "coordinador.log")
+
+        # "spawn" y no fork: el proceso principal ya tiene hilos (el receptor
+        # de cada shard, la compactación del journal, ...) y un fork copia sus
+        # bloqueos tal como estén en ese momento, quizás tomados para siempre.
+        contexto = multiprocessing.get_context("spawn")
+        self._clientes = [_ClienteShard(i, directorio, contexto) for i in range(self.shards)]
+        try:
+            self._recuperar()
+        except Exception:
+            # Un shard que no arrancó: se cierran los demás procesos
+            self.cerrar()
+            raise
+
+    def _fijar_shards(self, shards):
+        ruta = os.path.join(self.directorio, "shards.json")
+        if os.path.exists(ruta):
+            with open(ruta, "r", encoding="utf-8") as f:
+                existentes = json.load(f)["shards"]
+            if existentes != shards:
+                raise ValueError(
+                    f"{self.directorio} está repartido en {existentes} shards, no en {shards}"
+                )
+            return shards
+
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump({"shards": shards}, f)
+        return shards
+
+    def _cliente(self, numero):
+        return self._clientes[shard_de(numero, self.shards)]
+
+    def _llamar(self, numero, metodo, *args):
+        return self._cliente(numero).llamar(metodo, *args).result()
+
+    # ============================================================
+    # OPERACIONES
+    # ============================================================
+
+    def depositar(self, cuenta_num, monto):
+        with self.bloqueos.bloquear(cuenta_num):
+            return self._llamar(cuenta_num, "depositar", cuenta_num, monto)
+
+    def retirar(self, cuenta_num, monto):
+        with self.bloqueos.bloquear(cuenta_num):
+            return self._llamar(cuenta_num, "retirar", cuenta_num, monto)
+
+    def crear_cuenta(self, cuenta):
+        """
+        Agrega una cuenta (objeto Cuenta) en su shard, por el registro de
+        intenciones del shard. El cliente lo valida AdminService.
+        """
+        with self.bloqueos.bloquear(cuenta.numero):
+            return self._llamar(cuenta.numero, "crear_cuenta", cuenta)
+
+    def bloquear_cuenta(self, numero):
+        with self.bloqueos.bloquear(numero):
+            return self._llamar(numero, "bloquear_cuenta", numero)
+
+    def activar_cuenta(self, numero):
+        with self.bloqueos.bloquear(numero):
+            return self._llamar(numero, "activar_cuenta", numero)
+
+    def transferir(self, origen_num, destino_num, tipo_cuenta, tipo_transaccion, monto):
+        with self.bloqueos.bloquear(origen_num, destino_num):
+            if self._cliente(origen_num) is self._cliente(destino_num):
+                return self._llamar(
+                    origen_num, "transferir", origen_num, destino_num, tipo_cuenta, tipo_transaccion, monto
+                )
+            return self._transferir_entre_shards(origen_num, destino_num, tipo_cuenta, tipo_transaccion, monto)
+
+    def _transferir_entre_shards(self, origen_num, destino_num, tipo_cuenta, tipo_transaccion, monto):
+        tx = str(uuid.uuid4())
+        participantes = [
+            (self._cliente(origen_num), {
+                "rol": "debito", "cuenta": origen_num, "monto": monto,
+                "transaccion_id": nuevo_id(), "transferencia_id": nuevo_id(),
+                "destino": destino_num, "tipo_cuenta": tipo_cuenta, "tipo_transaccion": tipo_transaccion,
+            }),
+            (self._cliente(destino_num), {
+                "rol": "credito", "cuenta": destino_num, "monto": monto,
+                "transaccion_id": nuevo_id(),
+            }),
+        ]
+
+        # Fase 1: los dos shards preparan en paralelo
+        futuros = [cliente.llamar("preparar", tx, op) for cliente, op in participantes]
+        errores = [f.exception() for f in futuros]
+        if any(errores):
+            for cliente, _ in participantes:
+                cliente.llamar("abortar", tx).result()
+            raise next(e for e in errores if e)
+
+        # Punto de confirmación: desde acá la transferencia tiene que terminar
+        self._anotar_coordinador({"tx": tx, "decision": "confirmar"}, durable=True)
+
+        # Fase 2
+        futuros = [cliente.llamar("confirmar", tx) for cliente, _ in participantes]
+        transferencia = futuros[0].result()
+        futuros[1].result()
+
+        self._anotar_coordinador({"tx": tx, "fin": True})
+        return transferencia
+
+    def procesar_lote(self, operaciones):
+        """
+        Igual que BankService.procesar_lote. Las operaciones de cada shard se
+        mandan como un sub-lote y los shards las procesan en paralelo. Una
+        transferencia entre shards corta el lote en ese punto, para respetar
+        el orden de las operaciones de cada cuenta.
+        """
+        operaciones = list(operaciones)
+        resultados = [None] * len(operaciones)
+
+        numeros = set()
+        for op in operaciones:
+            numeros.add(op.get("cuenta"))
+            if op.get("tipo") == "transferencia":
+                numeros.add(op.get("destino"))
+        numeros.discard(None)
+
+        with self.bloqueos.bloquear(*numeros):
+            tramo = {}   # índice de shard → [(posición, operación)]
+            for posicion, op in enumerate(operaciones):
+                entre_shards = (
+                    op.get("tipo") == "transferencia"
+                    and self._cliente(op.get("cuenta")) is not self._cliente(op.get("destino"))
+                )
+                if not entre_shards:
+                    tramo.setdefault(shard_de(op.get("cuenta"), self.shards), []).append((posicion, op))
+                    continue
+
+                self._procesar_tramo(tramo, resultados)
+                tramo = {}
+                try:
+                    transferencia = self._transferir_entre_shards(
+                        op["cuenta"], op["destino"],
+                        op.get("tipo_cuenta"), op.get("tipo_transaccion", "transferencia"),
+                        op["monto"]
+                    )
+                    resultados[posicion] = {"ok": True, "resultado": transferencia}
+                except Exception as e:
+                    resultados[posicion] = {"ok": False, "error": str(e)}
+
+            self._procesar_tramo(tramo, resultados)
+
+        return resultados
+
+    def _procesar_tramo(self, tramo, resultados):
+        futuros = [
+            (items, self._clientes[indice].llamar("procesar_lote", [op for _, op in items]))
+            for indice, items in tramo.items()
+        ]
+        for items, futuro in futuros:
+            for (posicion, _), resultado in zip(items, futuro.result()):
+                resultados[posicion] = resultado
+
+    # ============================================================
+    # CONSULTAS Y CARGA
+    # ============================================================
+
+    def obtener_transacciones(self, numero_cuenta):
+        return self._llamar(numero_cuenta, "obtener_transacciones", numero_cuenta)
+
+    def obtener_cuenta(self, numero):
+        return self._llamar(numero, "obtener_cuenta", numero)
+
+    def cuantiles(self):
+        """
+        Sketches de cuantiles de todo el ledger: cada shard arma los suyos y
+        acá se fusionan (global y por cuenta).
+        """
+        futuros = [cliente.llamar("cuantiles") for cliente in self._clientes]
+        sketches = SketchesPorCuenta()
+        for futuro in futuros:
+            sketches.fusionar(SketchesPorCuenta.desde_dict(futuro.result()))
+        return sketches
+
+    def importar(self, cuenta_repo, transaccion_repo, transferencia_repo):
+        """
+        Reparte cuentas, transacciones y transferencias existentes entre los
+        shards. Pensado para correrse una vez sobre una carpeta vacía.
+        """
+        porciones = [([], [], []) for _ in range(self.shards)]
+        for cuenta in cuenta_repo.cargar_todas():
+            porciones[shard_de(cuenta.numero, self.shards)][0].append(cuenta)
+        for t in transaccion_repo.iter_todas():
+            porciones[shard_de(t["cuenta_id"], self.shards)][1].append(t)
+        for t in transferencia_repo.iter_todas():
+            porciones[shard_de(t["cuenta_origen"], self.shards)][2].append(t)
+
+        futuros = [cliente.llamar("importar", *porcion) for cliente, porcion in zip(self._clientes, porciones)]
+        for futuro in futuros:
+            futuro.result()
+
+    # ============================================================
+    # COORDINADOR Y RECUPERACIÓN
+    # ============================================================
+
+    def _anotar_coordinador(self, registro, durable=False):
+        with bloqueo_archivo(self.coordinador_path):
+            with open(self.coordinador_path, "ab") as f:
+                f.write((json.dumps(registro) + "\n").encode("utf-8"))
+                f.flush()
+                if durable:
+                    os.fsync(f.fileno())
+
+    def _recuperar(self):
+        """
+        Cierra las transferencias entre shards que quedaron a medias: confirma
+        las que tienen decisión anotada y aborta las demás.
+        """
+        with bloqueo_archivo(self.coordinador_path):
+            confirmadas = set()
+            if os.path.exists(self.coordinador_path):
+                with open(self.coordinador_path, "rb") as f:
+                    for linea in f:
+                        if not linea.endswith(b"\n"):
+                            break
+                        registro = json.loads(linea)
+                        if "decision" in registro:
+                            confirmadas.add(registro["tx"])
+
+            for cliente in self._clientes:
+                for tx in cliente.llamar("pendientes").result():
+                    if tx in confirmadas:
+                        cliente.llamar("confirmar", tx).result()
+                    else:
+                        cliente.llamar("abortar", tx).result()
+
+            # Todo quedó cerrado: el registro del coordinador ya no hace falta
+            open(self.coordinador_path, "wb").close()
+
+    def cerrar(self):
+        for cliente in self._clientes:
+            cliente.cerrar()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cerrar()
+        return False
+
+
+if __name__ == "__main__":
+    # Uso: python -m services.ledger_particionado [cantidad de shards]
+    from repositories.cuenta_repo import CuentaRepo
+
+    with LedgerParticionado(int(sys.argv[1]) if len(sys.argv) > 1 else None) as ledger:
+        ledger.importar(CuentaRepo(), TransaccionRepo(), TransferenciaRepo())
+        print(f"Datos repartidos en {ledger.shards} shards dentro de {ledger.directorio}")